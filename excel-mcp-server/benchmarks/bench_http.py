@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+HTTP接続の負荷テスト（ローカルのみ）
+
+run_server.py --transport http を起動し、同時セッション数を変えながら各セッションが
+ツール呼び出しを繰り返したときの秒間リクエスト数・レイテンシ（p50/p99）を計測する。
+全セッションが同じワークブックを読むため、1つのサーバーでキャッシュを共有する効果も含む。
+使い方: python benchmarks/bench_http.py --sessions 1 8 32 --requests 50 --output http.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# プロジェクトルートをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_write import make_data
+
+FILENAME = "bench_http.xlsx"
+SHEET_NAME = "データ"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(cwd, port):
+    """サーバーを起動し、/health が応答するまで待つ"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(project_root, "run_server.py"), "--transport", "http", "--port", str(port)],
+        cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                return process, json.load(response)
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("サーバーの起動に失敗しました")
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("サーバーが応答しません")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def run_session(url, requests, arguments, latencies):
+    """1セッション分：接続・初期化してからツール呼び出しを繰り返す"""
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamable_http_client
+
+    async with streamable_http_client(url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            for _ in range(requests):
+                start = time.perf_counter()
+                result = await session.call_tool("read_excel_data", arguments)
+                latencies.append(time.perf_counter() - start)
+                if result.isError or '"success":true' not in result.content[0].text:
+                    raise RuntimeError(result.content[0].text[:200])
+
+
+async def run_level(url, sessions, requests, arguments):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(url, requests, arguments, latencies) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "requests": len(latencies),
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP接続の負荷テスト")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32], help="同時セッション数")
+    parser.add_argument("--requests", type=int, default=50, help="1セッションあたりのツール呼び出し回数")
+    parser.add_argument("--rows", type=int, default=2000, help="読み込むシートの行数（毎回シート全体を読み込む）")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    from src.excel_operations import ExcelOperations
+
+    output = os.path.abspath(args.output) if args.output else None
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        result = ExcelOperations.write_excel_data(FILENAME, SHEET_NAME, make_data(args.rows, 10), write_only=True)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+
+        port = free_port()
+        process, _ = start_server(tmp, port)
+        try:
+            url = f"http://127.0.0.1:{port}/mcp"
+            arguments = {"filename": FILENAME, "sheet_name": SHEET_NAME}
+            # 初回の読み込み（インポート・ワークブックの解析）は計測から除く
+            asyncio.run(run_level(url, 1, 1, arguments))
+
+            print(f"{'セッション':>10} {'リクエスト/秒':>14} {'p50':>10} {'p99':>10}")
+            results = []
+            for sessions in args.sessions:
+                level = asyncio.run(run_level(url, sessions, args.requests, arguments))
+                results.append(level)
+                print(f"{sessions:>10} {level['requests_per_second']:>14.1f} "
+                      f"{level['p50_ms']:>8.1f}ms {level['p99_ms']:>8.1f}ms")
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as response:
+                health = json.load(response)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {"rows": args.rows, "requests_per_session": args.requests,
+              "results": results, "server": health}
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"結果を {output} に書き出しました")
+
+
+if __name__ == "__main__":
+    main()
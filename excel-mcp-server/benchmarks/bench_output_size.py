@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+出力ファイルサイズのベンチマーク
+
+同じデータを共有文字列なし（openpyxl標準のインライン文字列）と共有文字列ありで書き込み、
+ファイルサイズ・展開後のXMLサイズ・セル書式の数・書き込み時間・再読み込み時間を比較する。
+使い方: python benchmarks/bench_output_size.py --rows 50000 --cols 10
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+
+# プロジェクトルートをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+import src.locks
+from bench_write import make_data
+from src.excel_operations import ExcelOperations
+
+
+def inspect(filepath):
+    """ファイルサイズ・展開後のサイズ・共有文字列数・セル書式（cellXfs）の数を取得"""
+    with zipfile.ZipFile(filepath) as zf:
+        uncompressed = sum(info.file_size for info in zf.infolist())
+        styles = zf.read("xl/styles.xml")
+        match = re.search(rb'<cellXfs count="(\d+)"', styles)
+        shared = "xl/sharedStrings.xml" in zf.namelist()
+    return {
+        "size_kb": os.path.getsize(filepath) / 1024,
+        "uncompressed_kb": uncompressed / 1024,
+        "cell_formats": int(match.group(1)) if match else None,
+        "shared_strings": shared
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="出力ファイルサイズのベンチマーク")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--cols", type=int, default=10)
+    args = parser.parse_args()
+
+    data = make_data(args.rows, args.cols)
+    print(f"データ: {args.rows}行 x {args.cols}列")
+    print(f"{'出力形式':<20} {'サイズ':>10} {'展開後':>10} {'書式数':>6} {'書き込み':>8} {'再読み込み':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        results = {}
+        for label, shared in (("インライン文字列", False), ("共有文字列", True)):
+            src.locks.WRITE_SHARED_STRINGS = shared
+            filename = f"size_{int(shared)}"
+            start = time.perf_counter()
+            result = ExcelOperations.write_excel_data(filename, "データ", data, write_only=True)
+            write_seconds = time.perf_counter() - start
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+
+            filepath = result["path"]
+            start = time.perf_counter()
+            pd.read_excel(filepath, sheet_name="データ")
+            read_seconds = time.perf_counter() - start
+
+            info = inspect(filepath)
+            results[label] = info
+            print(f"{label:<20} {info['size_kb']:>8.0f}KB {info['uncompressed_kb']:>8.0f}KB "
+                  f"{info['cell_formats']:>6} {write_seconds:>7.2f}秒 {read_seconds:>9.2f}秒")
+
+        before, after = results["インライン文字列"], results["共有文字列"]
+        print(f"\nサイズ: {before['size_kb']:.0f}KB → {after['size_kb']:.0f}KB "
+              f"({after['size_kb'] / before['size_kb'] - 1:+.0%})、"
+              f"展開後: {before['uncompressed_kb']:.0f}KB → {after['uncompressed_kb']:.0f}KB "
+              f"({after['uncompressed_kb'] / before['uncompressed_kb'] - 1:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
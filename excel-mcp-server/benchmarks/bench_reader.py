@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+シート読み込み方法のベンチマーク
+
+同じファイルを pd.read_excel（openpyxl）と XMLから直接変換する読み込み（xlsx_reader）で読み、
+所要時間・ピークRSSを比較する。各読み込みは別プロセスで実行し、結果が一致することも確認する。
+使い方: python benchmarks/bench_reader.py --rows 100000 --cols 10 --repeat 3 --output reader.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# プロジェクトルートをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import _read_status_kb, _reset_peak_rss, _peak_rss_kb
+from bench_write import make_data
+
+ENGINES = ("openpyxl", "stream")
+
+
+def read_frame(engine, filepath):
+    import pandas as pd
+    from src.xlsx_reader import read_sheet_frame
+    if engine == "openpyxl":
+        return pd.read_excel(filepath, sheet_name="データ")
+    return read_sheet_frame(filepath, "データ")
+
+
+def run_engine(engine, filepath, repeat, queue):
+    """1つの読み込み方法を計測して結果をqueueに入れる（子プロセスで実行）"""
+    try:
+        import pandas  # noqa: F401  読み込み時間を計測に含めない
+        import src.xlsx_reader  # noqa: F401
+        rss_before = _read_status_kb("VmRSS")
+        peak_reset = _reset_peak_rss()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            df = read_frame(engine, filepath)
+            timings.append(time.perf_counter() - start)
+        peak = _peak_rss_kb()
+        df.to_pickle(filepath + f".{engine}.pkl")
+        queue.put({
+            "engine": engine,
+            "median_ms": round(statistics.median(timings) * 1000, 1),
+            "min_ms": round(min(timings) * 1000, 1),
+            "peak_rss_mb": round(peak / 1024, 1) if peak else None,
+            "peak_rss_delta_mb": round((peak - rss_before) / 1024, 1) if peak and rss_before else None,
+            "peak_rss_isolated": peak_reset
+        })
+    except Exception as e:
+        queue.put({"engine": engine, "error": str(e)})
+
+
+def run_isolated(engine, filepath, repeat):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_engine, args=(engine, filepath, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="シート読み込み方法のベンチマーク")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="各読み込み方法の繰り返し回数")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from src.excel_operations import ExcelOperations
+
+    output = os.path.abspath(args.output) if args.output else None
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        result = ExcelOperations.write_excel_data("reader", "データ", make_data(args.rows, args.cols), write_only=True)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+        filepath = result["path"]
+        print(f"データ: {args.rows}行 x {args.cols}列（{os.path.getsize(filepath) / 1024 / 1024:.1f}MB）")
+        print(f"{'読み込み方法':<10} {'中央値':>10} {'最小':>10} {'RSS増分':>8}")
+
+        results = []
+        for engine in ENGINES:
+            result = run_isolated(engine, filepath, args.repeat)
+            results.append(result)
+            if "error" in result:
+                print(f"{engine:<10} エラー: {result['error']}")
+                continue
+            print(f"{engine:<10} {result['median_ms']:>8.1f}ms {result['min_ms']:>8.1f}ms "
+                  f"{result['peak_rss_delta_mb']:>7.1f}M")
+
+        # 両方の結果がセル単位で一致することを確認
+        frames = [pd.read_pickle(f"{filepath}.{engine}.pkl") for engine in ENGINES
+                  if os.path.exists(f"{filepath}.{engine}.pkl")]
+        identical = len(frames) == 2 and frames[0].equals(frames[1]) and bool((frames[0].dtypes == frames[1].dtypes).all())
+        print(f"\n結果の一致: {'✅' if identical else '❌'}")
+        if len(results) == 2 and all("error" not in r for r in results):
+            print(f"速度: {results[0]['median_ms'] / results[1]['median_ms']:.1f}倍")
+
+    report = {"rows": args.rows, "cols": args.cols, "repeat": args.repeat, "identical": identical, "results": results}
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"結果を {output} に書き出しました")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+サーバー起動時間のベンチマーク
+
+run_server.py をstdioで起動し、プロセス起動から各応答までの時間を計測する。
+  initialize:  initializeへの応答（Claude Desktopの接続待ち時間）
+  list_tools:  tools/listへの応答
+  first_tool:  最初のツール呼び出し（list_excel_files）への応答（事前読み込みの効果を含む）
+比較用に、pandas・openpyxlを含むExcel操作モジュールの読み込み時間も計測する。
+
+使い方:
+    python benchmarks/bench_startup.py --repeat 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# プロジェクトルートをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+STAGES = ("initialize", "list_tools", "first_tool")
+
+
+class StdioClient:
+    """改行区切りのJSON-RPCでサーバーと通信する最小限のクライアント"""
+
+    def __init__(self, cwd):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(project_root, "run_server.py")],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=cwd, text=True, encoding="utf-8"
+        )
+        self._next_id = 0
+
+    def send(self, method, params=None, notification=False):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        if not notification:
+            self._next_id += 1
+            message["id"] = self._next_id
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def request(self, method, params=None):
+        """リクエストを送信して応答を待つ（通知など応答以外のメッセージは読み飛ばす）"""
+        self.send(method, params)
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"{method}の応答前にサーバーが終了しました")
+            message = json.loads(line)
+            if message.get("id") == self._next_id:
+                if "error" in message:
+                    raise RuntimeError(message["error"])
+                return message["result"]
+
+    def close(self):
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def measure_once():
+    """1回分の起動時間を計測（プロセス起動からの経過ミリ秒）"""
+    from mcp.types import LATEST_PROTOCOL_VERSION
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        client = StdioClient(tmp)
+        try:
+            elapsed = {}
+            client.request("initialize", {
+                "protocolVersion": LATEST_PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "bench_startup", "version": "1.0"}
+            })
+            elapsed["initialize"] = time.perf_counter() - start
+            client.send("notifications/initialized", notification=True)
+
+            client.request("tools/list")
+            elapsed["list_tools"] = time.perf_counter() - start
+
+            client.request("tools/call", {"name": "list_excel_files", "arguments": {}})
+            elapsed["first_tool"] = time.perf_counter() - start
+        finally:
+            client.close()
+    return {stage: seconds * 1000 for stage, seconds in elapsed.items()}
+
+
+def measure_import(module):
+    """新しいプロセスでモジュールの読み込み時間を計測（ミリ秒）"""
+    code = (
+        "import sys, time; sys.path.insert(0, sys.argv[1]); start = time.perf_counter(); "
+        f"import {module}; print((time.perf_counter() - start) * 1000)"
+    )
+    output = subprocess.run([sys.executable, "-c", code, project_root],
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="サーバー起動時間のベンチマーク")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.repeat)]
+    imports = {
+        module: statistics.median(measure_import(module) for _ in range(args.repeat))
+        for module in ("src.server", "src.excel_operations")
+    }
+
+    report = {
+        "repeat": args.repeat,
+        "median_ms": {stage: round(statistics.median(run[stage] for run in runs), 1) for stage in STAGES},
+        "min_ms": {stage: round(min(run[stage] for run in runs), 1) for stage in STAGES},
+        "import_ms": {module: round(value, 1) for module, value in imports.items()}
+    }
+
+    print(f"{'段階':<12} {'中央値':>10} {'最小':>10}")
+    for stage in STAGES:
+        print(f"{stage:<12} {report['median_ms'][stage]:>8.1f}ms {report['min_ms'][stage]:>8.1f}ms")
+    print("\nモジュール読み込み時間（中央値）")
+    for module, value in report["import_ms"].items():
+        print(f"  {module:<22} {value:>8.1f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果を {args.output} に書き出しました")
+
+
+if __name__ == "__main__":
+    main()
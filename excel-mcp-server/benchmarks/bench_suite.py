@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+ExcelOperations全体のベンチマーク
+
+日本語文字列・数値・日付を含む合成データ（1k / 100k / 1M セル、縦長・横長）で
+各操作のレイテンシ・スループット・ピークRSSを計測し、JSONで出力する。
+各ケースは別プロセスで実行する（キャッシュ・メモリ計測をケースごとに独立させるため）。
+
+使い方:
+    python benchmarks/bench_suite.py --sizes 1k,100k --output results.json
+    python benchmarks/bench_suite.py --compare results.json --threshold 0.2
+    （--compare指定時、基準より中央値が閾値を超えて遅いケースがあれば終了コード1）
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# プロジェクトルートをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_write import make_data
+
+# データサイズ（セル数）
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+# 形状ごとの列数（縦長: 列が少なく行が多い、横長: 列が多い）
+SHAPE_COLUMNS = {"tall": 10, "wide": 100}
+
+# 計測する操作
+CASES = (
+    "create_excel_file",
+    "write_excel_data",
+    "write_excel_data[write_only]",
+    "read_excel_data[full]",
+    "read_excel_data[range]",
+    "list_sheets",
+    "list_excel_files",
+    "call_tool[read_excel_data]",
+)
+# 範囲読み込みで読む行数
+RANGE_ROWS = 100
+# データを処理しない操作（スループットを算出しない）
+METADATA_CASES = ("create_excel_file", "list_sheets", "list_excel_files")
+
+
+def _read_status_kb(field):
+    """/proc/self/status の値（kB）を取得（Linux以外はNone）"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """ピークRSS（VmHWM）をリセット（Linuxのみ、失敗しても計測は続行）"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb():
+    peak = _read_status_kb("VmHWM")
+    if peak is None:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peak //= 1024
+    return peak
+
+
+def _call_tool_runner(name, arguments):
+    """インプロセスのMCPクライアント・サーバー間でcall_toolを実行する関数を返す"""
+    from mcp.shared.memory import create_connected_server_and_client_session
+    from src.server import server
+
+    async def call():
+        async with create_connected_server_and_client_session(server) as client:
+            result = await client.call_tool(name, arguments)
+            if result.isError:
+                raise RuntimeError(result.content[0].text)
+            return len(result.content[0].text)
+
+    return lambda: asyncio.run(call())
+
+
+def _prepare(case, data, rows, cols):
+    """計測対象の関数を用意（読み込み系は事前にファイルを作成）"""
+    from src.excel_operations import ExcelOperations
+    from openpyxl.utils import get_column_letter
+
+    counter = iter(range(1_000_000))
+    if case == "create_excel_file":
+        return lambda: ExcelOperations.create_excel_file(f"create_{next(counter)}", "データ")
+    if case == "write_excel_data":
+        return lambda: ExcelOperations.write_excel_data(f"write_{next(counter)}", "データ", data)
+    if case == "write_excel_data[write_only]":
+        return lambda: ExcelOperations.write_excel_data(
+            f"write_only_{next(counter)}", "データ", data, write_only=True)
+
+    result = ExcelOperations.write_excel_data("bench", "データ", data, write_only=True)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    if case == "read_excel_data[full]":
+        return lambda: ExcelOperations.read_excel_data("bench", "データ")
+    if case == "read_excel_data[range]":
+        range_cells = f"A1:{get_column_letter(cols)}{min(rows, RANGE_ROWS) + 1}"
+        return lambda: ExcelOperations.read_excel_data("bench", "データ", range_cells=range_cells)
+    if case == "list_sheets":
+        return lambda: ExcelOperations.list_sheets("bench")
+    if case == "list_excel_files":
+        return lambda: ExcelOperations.list_excel_files()
+    if case == "call_tool[read_excel_data]":
+        return _call_tool_runner("read_excel_data", {"filename": "bench", "sheet_name": "データ"})
+    raise ValueError(f"不明なケース: {case}")
+
+
+def run_case(case, size, shape, repeat, queue):
+    """1ケースを計測して結果をqueueに入れる（子プロセスで実行）"""
+    try:
+        cells = SIZES[size]
+        cols = min(SHAPE_COLUMNS[shape], cells)
+        rows = max(1, cells // cols)
+        data = make_data(rows, cols)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            func = _prepare(case, data, rows, cols)
+            rss_before = _read_status_kb("VmRSS")
+            peak_reset = _reset_peak_rss()
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func()
+                timings.append(time.perf_counter() - start)
+                if isinstance(result, dict) and not result.get("success", False):
+                    raise RuntimeError(result.get("error"))
+            peak = _peak_rss_kb()
+
+        median = statistics.median(timings)
+        if case in METADATA_CASES:
+            processed = None
+        elif case == "read_excel_data[range]":
+            processed = min(rows, RANGE_ROWS) * cols
+        else:
+            processed = rows * cols
+        queue.put({
+            "case": case,
+            "size": size,
+            "shape": shape,
+            "rows": rows,
+            "cols": cols,
+            "cells": rows * cols,
+            "repeat": repeat,
+            "latency_ms": {
+                "first": round(timings[0] * 1000, 2),
+                "median": round(median * 1000, 2),
+                "min": round(min(timings) * 1000, 2)
+            },
+            "throughput_cells_per_s": round(processed / median) if processed and median else None,
+            "peak_rss_mb": round(peak / 1024, 1) if peak else None,
+            # 計測中に増えたメモリ（VmHWMをリセットできない環境では準備処理の分も含む）
+            "peak_rss_delta_mb": round((peak - rss_before) / 1024, 1) if peak and rss_before else None,
+            "peak_rss_isolated": peak_reset
+        })
+    except Exception as e:
+        queue.put({"case": case, "size": size, "shape": shape, "error": str(e)})
+
+
+def run_isolated(case, size, shape, repeat):
+    """ケースを別プロセスで実行して結果を取得"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_case, args=(case, size, shape, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def environment():
+    """結果を比較するための実行環境情報"""
+    import openpyxl
+    import pandas as pd
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "openpyxl": openpyxl.__version__,
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """基準結果と比較し、中央値が閾値を超えて遅くなったケースを返す
+
+    1ms未満で終わる操作は揺らぎが大きいため、増加がmin_delta_ms未満なら遅延とみなさない
+    """
+    base = {(r["case"], r["size"], r["shape"]): r for r in baseline["results"] if "error" not in r}
+    regressions = []
+    print(f"\n=== 基準との比較（{baseline['environment'].get('commit')}、閾値 +{threshold:.0%}） ===")
+    for result in results:
+        key = (result["case"], result["size"], result["shape"])
+        if "error" in result or key not in base:
+            continue
+        before = base[key]["latency_ms"]["median"]
+        after = result["latency_ms"]["median"]
+        ratio = after / before if before else 1.0
+        regressed = ratio > 1 + threshold and after - before >= min_delta_ms
+        mark = "❌" if regressed else "✅"
+        print(f"{mark} {key[0]:<30} {key[1]:>5} {key[2]:<5} {before:10.1f} → {after:10.1f} ms ({ratio - 1:+.0%})")
+        if regressed:
+            regressions.append({"case": key[0], "size": key[1], "shape": key[2],
+                                "baseline_ms": before, "current_ms": after})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ExcelOperationsベンチマーク")
+    parser.add_argument("--sizes", default="1k,100k", help=f"セル数（{', '.join(SIZES)} をカンマ区切り）")
+    parser.add_argument("--shapes", default="tall,wide", help=f"形状（{', '.join(SHAPE_COLUMNS)}）")
+    parser.add_argument("--cases", default=",".join(CASES), help="計測する操作（カンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=3, help="各ケースの繰り返し回数")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--compare", help="比較する基準の結果JSONファイル")
+    parser.add_argument("--threshold", type=float, default=0.2, help="遅延とみなす中央値の増加率（0.2 = 20%%）")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="遅延とみなす中央値の最小増加量（ミリ秒）")
+    args = parser.parse_args()
+
+    sizes = args.sizes.split(",")
+    shapes = args.shapes.split(",")
+    cases = args.cases.split(",")
+    for name, values, known in (("size", sizes, SIZES), ("shape", shapes, SHAPE_COLUMNS), ("case", cases, CASES)):
+        unknown = [value for value in values if value not in known]
+        if unknown:
+            parser.error(f"不明な{name}: {unknown}")
+
+    results = []
+    print(f"{'操作':<30} {'サイズ':>5} {'形状':<5} {'初回':>10} {'中央値':>10} {'セル/秒':>12} {'RSS増分':>8}")
+    for size in sizes:
+        for shape in shapes:
+            for case in cases:
+                result = run_isolated(case, size, shape, args.repeat)
+                results.append(result)
+                if "error" in result:
+                    print(f"{case:<30} {size:>5} {shape:<5} エラー: {result['error']}")
+                    continue
+                latency = result["latency_ms"]
+                rss = result["peak_rss_delta_mb"]
+                throughput = result["throughput_cells_per_s"]
+                print(f"{case:<30} {size:>5} {shape:<5} {latency['first']:10.1f} {latency['median']:10.1f} "
+                      f"{'-' if throughput is None else f'{throughput:,}':>12} "
+                      f"{'-' if rss is None else f'{rss:.1f}M':>8}")
+
+    report = {"environment": environment(), "threshold": args.threshold, "results": results}
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["baseline"] = baseline["environment"]
+        report["regressions"] = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if report["regressions"]:
+            print(f"\n❌ {len(report['regressions'])}件のケースが基準より遅くなりました")
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果を {args.output} に書き出しました")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
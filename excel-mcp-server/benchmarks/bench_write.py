@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+書き込み処理のベンチマーク
+
+旧実装（セル単位で書式オブジェクトを生成）と一括書き込み・書き込み専用モードを比較する。
+使い方: python benchmarks/bench_write.py --rows 100000 --cols 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# プロジェクトルートをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import openpyxl
+import pandas as pd
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from src.excel_operations import ExcelOperations
+
+
+def legacy_write(filepath, df):
+    """旧実装の書き込み処理（比較用）"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+
+    def border():
+        return Border(left=Side(style='thin'), right=Side(style='thin'),
+                      top=Side(style='thin'), bottom=Side(style='thin'))
+
+    for col, header in enumerate(df.columns):
+        cell = ws.cell(row=1, column=1 + col, value=header)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center")
+        cell.border = border()
+    for row_idx, row_data in df.iterrows():
+        for col_idx, value in enumerate(row_data):
+            cell = ws.cell(row=2 + row_idx, column=1 + col_idx, value=value)
+            cell.border = border()
+            cell.alignment = Alignment(horizontal="left")
+    for column in ws.columns:
+        max_length = max(len(str(cell.value)) for cell in column)
+        ws.column_dimensions[column[0].column_letter].width = min(max_length + 2, 50)
+    wb.save(filepath)
+
+
+def make_data(rows, cols):
+    """日本語文字列・数値・日付を含むテストデータを生成"""
+    data = []
+    for i in range(rows):
+        record = {}
+        for c in range(cols):
+            kind = c % 3
+            if kind == 0:
+                record[f"列{c}"] = f"カテゴリ{i % 50}"
+            elif kind == 1:
+                record[f"列{c}"] = i * 1.5 + c
+            else:
+                record[f"列{c}"] = pd.Timestamp("2024-01-01") + pd.Timedelta(days=i % 365)
+        data.append(record)
+    return data
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:8.2f} 秒")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="書き込みベンチマーク")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--skip-legacy", action="store_true", help="旧実装の計測を省略")
+    args = parser.parse_args()
+
+    data = make_data(args.rows, args.cols)
+    print(f"=== 書き込みベンチマーク: {args.rows}行 x {args.cols}列 ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        results = {}
+        if not args.skip_legacy:
+            results["legacy"] = timed("旧実装", lambda: legacy_write(
+                os.path.join(tmp, "legacy.xlsx"), pd.DataFrame(data)))
+        results["bulk"] = timed("一括書き込み", lambda: ExcelOperations.write_excel_data(
+            "bulk", "Sheet1", data))
+        results["write_only"] = timed("書き込み専用モード", lambda: ExcelOperations.write_excel_data(
+            "write_only", "Sheet1", data, write_only=True))
+
+        if "legacy" in results:
+            for key in ("bulk", "write_only"):
+                print(f"{key}: 旧実装比 {results['legacy'] / results[key]:.1f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 """
 Excel MCP Server 実行スクリプト
+
+使い方:
+    python run_server.py                       # stdio接続（Claude Desktopなどから起動）
+    python run_server.py --transport http      # HTTP接続（1つのサーバーを複数のクライアントで共有）
 """
+import argparse
 import sys
 import os
 
@@ -9,9 +14,25 @@ import os
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
-# サーバーを起動
-from src.server import main
-import asyncio
+from src.config import HTTP_HOST, HTTP_PORT
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Excel MCP Server")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio",
+                        help="接続方式（http: Streamable HTTPを /mcp、SSEを /sse で待ち受け）")
+    parser.add_argument("--host", default=HTTP_HOST, help="HTTP接続で待ち受けるアドレス")
+    parser.add_argument("--port", type=int, default=HTTP_PORT, help="HTTP接続で待ち受けるポート")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    if args.transport == "http":
+        from src.http_server import run_http
+        run_http(args.host, args.port)
+    else:
+        # サーバーを起動
+        from src.server import main
+        import asyncio
+        asyncio.run(main())
@@ -8,11 +8,17 @@ setup(
     author="Your Name",
     packages=find_packages(),
     install_requires=[
-        "mcp>=1.0.0",
+        "mcp>=1.30.0,<2",
         "openpyxl>=3.1.0",
         "pandas>=2.0.0",
         "pytest>=7.0.0",
     ],
+    extras_require={
+        # ディスクキャッシュをParquet形式で保存する場合
+        "parquet": ["pyarrow>=14.0.0"],
+        # 応答JSONの高速化
+        "fast-json": ["orjson>=3.9.0"],
+    },
     entry_points={
         "console_scripts": [
             "excel-mcp-server=src.server:main",
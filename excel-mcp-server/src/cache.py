@@ -0,0 +1,278 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from .config import WORKBOOK_CACHE_ENABLED, WORKBOOK_CACHE_MAX_MB, ESTIMATED_BYTES_PER_CELL
+
+
+def file_signature(filepath: str) -> Tuple[int, int, int]:
+    """ファイルの変更検知用シグネチャ (mtime, size, inode) を取得"""
+    st = os.stat(filepath)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def estimate_workbook_bytes(wb) -> int:
+    """ワークブックのメモリ使用量をセル数から概算"""
+    total = 0
+    for ws in wb.worksheets:
+        total += (ws.max_row or 0) * (ws.max_column or 0) * ESTIMATED_BYTES_PER_CELL
+    return total
+
+
+def estimate_frame_bytes(df) -> int:
+    """DataFrameのメモリ使用量を取得"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class _CacheEntry:
+    """キャッシュ1件分（ワークブック本体とシート別DataFrame）"""
+
+    __slots__ = ("signature", "workbook", "workbook_bytes", "frames", "extras")
+
+    def __init__(self, signature: Tuple[int, int, int]):
+        self.signature = signature
+        self.workbook = None
+        self.workbook_bytes = 0
+        # (sheet_name, has_header) -> (DataFrame, bytes)
+        self.frames: Dict[Tuple[str, bool], Tuple[Any, int]] = {}
+        # (sheet_name, 種別, ...) -> (付随データ, bytes)  例: upsert用のキー索引
+        self.extras: Dict[Tuple, Tuple[Any, int]] = {}
+
+    @property
+    def size_bytes(self) -> int:
+        return (self.workbook_bytes
+                + sum(size for _, size in self.frames.values())
+                + sum(size for _, size in self.extras.values()))
+
+
+class WorkbookCache:
+    """解析済みワークブックのプロセス共通キャッシュ
+
+    キーは解決済みパス、有効性は (mtime, size, inode) で判定する。
+    メモリ上限を超えた場合はLRU順に追い出す。
+    """
+
+    def __init__(self, max_bytes: int, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(filepath: str) -> str:
+        return os.path.realpath(filepath)
+
+    def _get_valid_entry(self, key: str, signature) -> Optional[_CacheEntry]:
+        """シグネチャが一致するエントリを取得（不一致なら破棄）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.signature != signature:
+            self._remove(key)
+            self.invalidations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _get_or_create_entry(self, key: str, signature) -> _CacheEntry:
+        entry = self._get_valid_entry(key, signature)
+        if entry is None:
+            entry = _CacheEntry(signature)
+            self._entries[key] = entry
+        return entry
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._current_bytes -= entry.size_bytes
+
+    def _account(self, key: str, delta: int):
+        """サイズ変化を反映し、上限を超えていればLRUで追い出す"""
+        self._current_bytes += delta
+        while self._current_bytes > self.max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            if oldest_key == key and len(self._entries) == 1:
+                # 単独で上限を超えるエントリは保持しない
+                self._remove(oldest_key)
+                self.evictions += 1
+                break
+            if oldest_key == key:
+                self._entries.move_to_end(key)
+                continue
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def get_workbook(self, filepath: str, loader: Callable[[str], Any]):
+        """ワークブックを取得（キャッシュになければloaderで読み込み）"""
+        if not self.enabled:
+            return loader(filepath)
+        key = self._key(filepath)
+        with self._lock:
+            signature = file_signature(filepath)
+            entry = self._get_valid_entry(key, signature)
+            if entry is not None and entry.workbook is not None:
+                self.hits += 1
+                return entry.workbook
+            self.misses += 1
+        # 読み込み中も他のファイルのキャッシュを使えるようロックの外で読み込む
+        wb = loader(filepath)
+        with self._lock:
+            if file_signature(filepath) != signature:
+                # 読み込み中にファイルが更新された場合はキャッシュしない
+                return wb
+            entry = self._get_valid_entry(key, signature)
+            if entry is not None and entry.workbook is not None:
+                # 同時に読み込んだ他の呼び出しのワークブックを共有する
+                return entry.workbook
+            self._set_workbook(key, signature, wb)
+            return wb
+
+    def peek_workbook(self, filepath: str):
+        """キャッシュ済みのワークブックのみ返す（読み込みは行わない）"""
+        if not self.enabled:
+            return None
+        key = self._key(filepath)
+        with self._lock:
+            entry = self._get_valid_entry(key, file_signature(filepath))
+            if entry is not None and entry.workbook is not None:
+                self.hits += 1
+                return entry.workbook
+            return None
+
+    def store_workbook(self, filepath: str, wb, modified_sheets=None):
+        """保存直後のワークブックをキャッシュに反映（再解析を不要にする）"""
+        if not self.enabled:
+            return
+        key = self._key(filepath)
+        with self._lock:
+            signature = file_signature(filepath)
+            entry = self._entries.get(key)
+            if entry is not None and entry.workbook is wb:
+                # 同一オブジェクトへの書き込み: シグネチャを更新し、変更シートの派生データのみ破棄
+                entry.signature = signature
+                before = entry.size_bytes
+                for derived in (entry.frames, entry.extras):
+                    for derived_key in list(derived):
+                        if modified_sheets is None or derived_key[0] in modified_sheets:
+                            del derived[derived_key]
+                entry.workbook_bytes = estimate_workbook_bytes(wb)
+                self._entries.move_to_end(key)
+                self._account(key, entry.size_bytes - before)
+            else:
+                self._remove(key)
+                self._set_workbook(key, signature, wb)
+
+    def _set_workbook(self, key: str, signature, wb):
+        entry = self._get_or_create_entry(key, signature)
+        before = entry.size_bytes
+        entry.workbook = wb
+        entry.workbook_bytes = estimate_workbook_bytes(wb)
+        self._account(key, entry.size_bytes - before)
+
+    def get_frame(self, filepath: str, sheet_name: str, has_header: bool,
+                  loader: Callable[[], Any]):
+        """シート単位のDataFrameを取得（キャッシュになければloaderで生成）"""
+        if not self.enabled:
+            return loader()
+        key = self._key(filepath)
+        frame_key = (sheet_name, has_header)
+        with self._lock:
+            signature = file_signature(filepath)
+            entry = self._get_valid_entry(key, signature)
+            if entry is not None and frame_key in entry.frames:
+                self.hits += 1
+                return entry.frames[frame_key][0]
+            self.misses += 1
+        df = loader()
+        with self._lock:
+            if file_signature(filepath) != signature:
+                # 読み込み中にファイルが更新された場合はキャッシュしない
+                return df
+            entry = self._get_or_create_entry(key, signature)
+            size = estimate_frame_bytes(df)
+            before = entry.size_bytes
+            entry.frames[frame_key] = (df, size)
+            self._account(key, entry.size_bytes - before)
+        return df
+
+    def peek_frame(self, filepath: str, sheet_name: str, has_header: bool):
+        """キャッシュ済みのDataFrameのみ返す（読み込みは行わない）"""
+        if not self.enabled:
+            return None
+        key = self._key(filepath)
+        with self._lock:
+            entry = self._get_valid_entry(key, file_signature(filepath))
+            if entry is not None and (sheet_name, has_header) in entry.frames:
+                self.hits += 1
+                return entry.frames[(sheet_name, has_header)][0]
+            return None
+
+    def get_extra(self, filepath: str, extra_key: Tuple):
+        """シートに紐付く付随データを取得（未登録ならNone）"""
+        if not self.enabled:
+            return None
+        key = self._key(filepath)
+        with self._lock:
+            entry = self._get_valid_entry(key, file_signature(filepath))
+            if entry is not None and extra_key in entry.extras:
+                self.hits += 1
+                return entry.extras[extra_key][0]
+            self.misses += 1
+            return None
+
+    def put_extra(self, filepath: str, extra_key: Tuple, value, size_bytes: int = 0):
+        """付随データを現在のファイル状態に紐付けて登録（extra_key[0]はシート名）"""
+        if not self.enabled:
+            return
+        key = self._key(filepath)
+        with self._lock:
+            entry = self._get_or_create_entry(key, file_signature(filepath))
+            before = entry.size_bytes
+            entry.extras[extra_key] = (value, size_bytes)
+            self._account(key, entry.size_bytes - before)
+
+    def shrink(self, target_bytes: int) -> int:
+        """古い順に追い出して使用量をtarget_bytes以下にする（解放した推定バイト数を返す）"""
+        with self._lock:
+            before = self._current_bytes
+            while self._current_bytes > target_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return before - self._current_bytes
+
+    def invalidate(self, filepath: str):
+        """指定ファイルのキャッシュを破棄"""
+        key = self._key(filepath)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        """全キャッシュを破棄"""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュ統計を取得"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "current_bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+# プロセス共通のキャッシュインスタンス
+workbook_cache = WorkbookCache(WORKBOOK_CACHE_MAX_MB * 1024 * 1024, enabled=WORKBOOK_CACHE_ENABLED)
@@ -2,9 +2,97 @@ import os
 
 # 設定値
 EXCEL_FOLDER_NAME = "excel"
-MAX_FILE_SIZE_MB = 50
+MAX_FILE_SIZE_MB = 50                 # これより大きいファイルは全体を読み込まない（読み込みはページ単位、編集は拒否）
 SUPPORTED_EXTENSIONS = ['.xlsx']
 
+# ワークブックキャッシュ設定
+WORKBOOK_CACHE_ENABLED = True
+WORKBOOK_CACHE_MAX_MB = 256           # キャッシュ全体のメモリ上限
+ESTIMATED_BYTES_PER_CELL = 200        # openpyxlのセル1個あたりの推定メモリ使用量
+
+# メモリ管理設定（読み込み前に推定メモリ使用量を求め、受け付け・縮退・拒否を判断）
+MEMORY_OPERATION_BUDGET_MB = 512      # 1操作で読み込むデータの推定メモリ使用量の上限（超える読み込みはページ単位、編集は拒否）
+MEMORY_SOFT_LIMIT_MB = 1024           # プロセスのRSSがこれを超えている間は新しい読み込みを待たせる（キャッシュも縮小）
+MEMORY_HARD_LIMIT_MB = 2048           # RSSと推定使用量の合計がこれを超える読み込みは縮退・拒否
+MEMORY_QUEUE_TIMEOUT_SECONDS = 30     # ソフト上限を超えている間に待つ最大秒数（超えたら拒否）
+ESTIMATED_FRAME_BYTES_PER_CELL = 80   # DataFrameのセル1個あたりの推定メモリ使用量
+ESTIMATED_XML_BYTES_PER_CELL = 40     # <dimension>がないシートのセル数をXMLのサイズから推定する際の1セルあたりのバイト数
+
+# ディスクキャッシュ設定（シートを列指向形式で excel/.cache/ に保存）
+SIDECAR_CACHE_ENABLED = True
+SIDECAR_DIR_NAME = ".cache"           # 保存先（excelフォルダ内）
+SIDECAR_MIN_CELLS = 10000             # このセル数未満のシートは保存しない（解析の方が速いため）
+
+# 列幅自動調整設定
+MAX_COLUMN_WIDTH = 50                     # 列幅の上限
+AUTO_WIDTH_SAMPLE_THRESHOLD_ROWS = 10000  # この行数を超える書き込みは抽出した行から列幅を推定
+AUTO_WIDTH_SAMPLE_ROWS = 1000             # 列幅推定に使う行数
+
+# 出力ファイル設定
+WRITE_SHARED_STRINGS = True           # 保存時に文字列を共有文字列テーブルにまとめる（繰り返しの多いデータを小さくする）
+
+# 数式再計算設定（書き込み後に数式セルを計算し、計算結果をファイルに書き込む）
+FORMULA_RECALC_ENABLED = True         # 数式を再計算する（Excelで開き直さなくても数式セルの値を読めるようにする）
+FORMULA_MAX_CELLS = 200000            # この数を超える数式セルを持つワークブックは再計算しない
+
+# シート読み込み設定
+SHEET_READER_ENGINE = "stream"        # シート全体の解析方法（stream: zip内のXMLから列単位で直接変換、未対応のシートはopenpyxl / openpyxl: 常にpd.read_excel）
+
+# ページ読み込み設定
+DEFAULT_PAGE_SIZE = 1000              # limit省略時の1ページあたりの行数
+RESOURCE_PAGE_SIZE = 500              # リソース読み込み時の1ページあたりの行数
+PAGINATION_MAX_OPEN_STREAMS = 16      # 再利用のために保持する行イテレータの最大数
+PAGINATION_STREAM_IDLE_SECONDS = 300  # 未使用の行イテレータを閉じるまでの秒数
+
+# ツール実行設定
+EXECUTOR_THREAD_WORKERS = 4           # 操作を実行するスレッド数
+EXECUTOR_PROCESS_WORKERS = 0          # 解析中心の読み込みに使うプロセス数（0ならスレッドで実行）
+EXECUTOR_MAX_CONCURRENCY = 8          # 同時に実行する操作数の上限（超過分は待機）
+TOOL_TIMEOUT_SECONDS = 120            # 1操作あたりのタイムアウト秒数
+PREWARM_IMPORTS = True                # 初期化完了後にpandas・openpyxlをバックグラウンドで読み込む
+
+# HTTP接続設定（run_server.py --transport http で複数のクライアントが1つのサーバーを共有）
+HTTP_HOST = "127.0.0.1"               # 待ち受けるアドレス（既定はローカルからの接続のみ）
+HTTP_PORT = 8000                      # 待ち受けるポート
+HTTP_MAX_SESSIONS = 64                # 同時に開けるセッション数の上限（超過した接続は503）
+HTTP_SESSION_IDLE_SECONDS = 1800      # 操作のないセッションを閉じるまでの秒数
+HTTP_KEEP_ALIVE_SECONDS = 75          # HTTP接続のキープアライブ秒数
+SESSION_MAX_CONCURRENCY = 4           # 1セッションで同時に実行するツール呼び出しの上限（超過分は待機）
+
+# 応答設定
+RESPONSE_JSON_INDENT = None           # 応答JSONのインデント幅（Noneなら空白・改行なしの圧縮形式）
+
+# 集計クエリ設定
+QUERY_CHUNK_ROWS = 50000              # 絞り込みを適用する単位の行数（この行数ごとにDataFrame化する）
+
+# 一括読み込み設定（read_many）
+READ_MANY_PROCESS_WORKERS = 4         # 複数ファイルを並列に解析するプロセス数（0なら1ファイルずつ順に読み込む）
+READ_MANY_MAX_TARGETS = 500           # 1回で読み込む対象（ファイル×シート）の上限
+READ_MANY_MAX_CELLS = 1000000         # 1回の応答に含めるセル数の上限（超過分はカーソルで続きを取得）
+
+# 検索設定（search_excel）
+SEARCH_INDEX_DIR_NAME = ".search"     # 検索インデックス（SQLite）の保存先（excelフォルダ内）
+SEARCH_NGRAM = 2                      # 文字n-gramの長さ（日本語など単語区切りのない文字列も部分一致で検索）
+SEARCH_INDEX_NUMBERS = False          # 数値・日付・真偽値のセルも検索対象にする（Falseなら文字列のセルのみ）
+SEARCH_MAX_CELL_CHARS = 2000          # n-gramを作成するセルの先頭文字数（長い文章のセルでインデックスが膨らまないようにする）
+SEARCH_MAX_RESULTS = 50               # max_results省略時に返す件数
+
+# CSV・NDJSON入出力設定
+STREAM_CHUNK_ROWS = 10000             # 取り込み・書き出しを処理する単位の行数（進捗もこの単位で通知）
+
+# 計測設定
+METRICS_ENABLED = True                # ツール・処理段階ごとの所要時間を集計（server_metricsで取得）
+METRICS_PROMETHEUS_FILE = None        # Prometheus形式で書き出すファイルのパス（Noneなら書き出さない）
+METRICS_DUMP_INTERVAL_SECONDS = 15    # Prometheus形式ファイルの更新間隔
+
+# 同時書き込み設定
+LOCK_DIR_NAME = ".locks"              # プロセス間ロック用ファイルの保存先（excelフォルダ内）
+WRITE_COALESCE_WINDOW_MS = 5          # 同一ファイルへの書き込みをまとめるために待つ時間
+
+# リソース一覧設定
+RESOURCE_LIST_PAGE_SIZE = 200         # list_resourcesの1ページあたりのリソース数
+DIRECTORY_WATCH_INTERVAL_SECONDS = 0  # excelフォルダの監視間隔（0なら一覧取得のたびに差分確認）
+
 def get_excel_directory():
     """現在のディレクトリにexcelフォルダを作成・取得"""
     current_dir = os.getcwd()
@@ -0,0 +1,115 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from .workbook_xml import read_sheet_names
+
+
+class _IndexEntry:
+    """ファイル1件分の索引（シグネチャとシート名）"""
+
+    __slots__ = ("signature", "size", "sheets", "error")
+
+    def __init__(self, signature, size: int, sheets: List[str], error: Optional[str] = None):
+        self.signature = signature
+        self.size = size
+        self.sheets = sheets
+        self.error = error
+
+
+class DirectoryIndex:
+    """excelフォルダ内のファイルとシート名の索引
+
+    (mtime, size, inode) が変わったファイルのみzip内のworkbook.xmlを読み直す。
+    監視スレッドを起動した場合は一定間隔で差分更新する。
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _IndexEntry] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.directory: Optional[str] = None
+        self.parsed = 0
+        self.reused = 0
+
+    def refresh(self, directory: str) -> List[Dict[str, Any]]:
+        """フォルダを走査して変更分のみ更新し、ファイル名順の一覧を返す"""
+        seen = {}
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.xlsx') and not entry.name.startswith('.~'):
+                    st = entry.stat()
+                    seen[entry.name] = ((st.st_mtime_ns, st.st_size, st.st_ino), st.st_size)
+
+        with self._lock:
+            current = dict(self._entries) if directory == self.directory else {}
+
+        updated = {}
+        for name, (signature, size) in seen.items():
+            entry = current.get(name)
+            if entry is not None and entry.signature == signature:
+                self.reused += 1
+                updated[name] = entry
+                continue
+            try:
+                sheets, error = read_sheet_names(os.path.join(directory, name)), None
+            except Exception as e:
+                sheets, error = [], str(e)
+            self.parsed += 1
+            updated[name] = _IndexEntry(signature, size, sheets, error)
+
+        with self._lock:
+            self._entries = updated
+            self.directory = directory
+        return self._to_list(updated)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """直近の索引を取得（フォルダは走査しない）"""
+        with self._lock:
+            return self._to_list(self._entries)
+
+    @staticmethod
+    def _to_list(entries: Dict[str, _IndexEntry]) -> List[Dict[str, Any]]:
+        return [
+            {"filename": name, "size_bytes": entry.size, "sheets": entry.sheets, "error": entry.error}
+            for name, entry in sorted(entries.items())
+        ]
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def start_watcher(self, directory: str, interval: float):
+        """一定間隔で差分更新する監視スレッドを起動"""
+        if self.watching:
+            return
+        self._stop.clear()
+        self.refresh(directory)
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh(directory)
+                except Exception:
+                    # 一時的な読み込み失敗は次回の走査で再試行
+                    pass
+
+        self._watcher = threading.Thread(target=watch, name="excel-dir-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """監視スレッドを停止"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def stats(self) -> Dict[str, Any]:
+        """索引の統計を取得"""
+        with self._lock:
+            files = len(self._entries)
+        return {"files": files, "parsed": self.parsed, "reused": self.reused, "watching": self.watching}
+
+
+# プロセス共通の索引
+directory_index = DirectoryIndex()
@@ -1,9 +1,115 @@
 import pandas as pd
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+import csv
+import datetime
+import fnmatch
 import os
-from typing import List, Dict, Any, Optional
-from .config import get_excel_filepath, get_excel_directory
+import re
+import tempfile
+import time
+import operator
+from collections import deque
+from copy import copy
+from itertools import count
+from typing import List, Dict, Any, Callable, Optional
+from .config import (
+    get_excel_filepath, get_excel_directory, DEFAULT_PAGE_SIZE,
+    AUTO_WIDTH_SAMPLE_THRESHOLD_ROWS, AUTO_WIDTH_SAMPLE_ROWS, MAX_COLUMN_WIDTH,
+    QUERY_CHUNK_ROWS, STREAM_CHUNK_ROWS, READ_MANY_MAX_TARGETS, READ_MANY_MAX_CELLS,
+    SHEET_READER_ENGINE, SEARCH_MAX_RESULTS, FORMULA_RECALC_ENABLED, FORMULA_MAX_CELLS
+)
+from .cache import workbook_cache
+from .ranges import CellRange, parse_range, parse_start_cell
+from .pagination import row_stream_registry, encode_cursor, decode_cursor
+from .locks import file_locks, write_coalescer, atomic_save, PendingWrite
+from .workbook_xml import read_workbook_info, read_sheet_names
+from .executor import executor
+from .sidecar import sidecar_cache
+from .search_index import search_index
+from .formulas import FormulaGraph, GRAPH_CACHE_KEY
+from .memory import memory_governor, MemoryLimitError
+from .xlsx_reader import XlsxReader, UnsupportedSheet
+from .serialization import check_format, dumps, frame_payload
+from .metrics import metrics
+
+# 書き込み時に共有する名前付きスタイル
+HEADER_STYLE_NAME = "excel_mcp_header"
+BODY_STYLE_NAME = "excel_mcp_body"
+BODY_DATE_STYLE_NAME = "excel_mcp_body_date"          # 本文の日付（表示形式 yyyy-mm-dd）
+BODY_DATETIME_STYLE_NAME = "excel_mcp_body_datetime"  # 本文の日時（表示形式 yyyy-mm-dd hh:mm:ss）
+
+# 一括操作で利用できる操作の種類
+BATCH_OPERATION_TYPES = ("create_sheet", "write", "append", "read", "list_sheets")
+
+# 集計クエリで利用できる比較演算子・集計関数
+QUERY_FILTER_OPERATORS = ("==", "!=", ">", ">=", "<", "<=", "in", "not_in",
+                          "contains", "startswith", "is_null", "not_null")
+QUERY_AGGREGATIONS = ("sum", "mean", "count", "min", "max")
+_COMPARISON_OPERATORS = {
+    "==": operator.eq, "!=": operator.ne, ">": operator.gt,
+    ">=": operator.ge, "<": operator.lt, "<=": operator.le
+}
+
+# CSV・NDJSON入出力で扱う形式と拡張子
+DATA_FILE_FORMATS = ("csv", "ndjson")
+DATA_FILE_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+# 全角（表示幅2）として数える文字（CJK・かな・ハングル・全角英数記号など）
+_WIDE_CHAR_PATTERN = re.compile(
+    "[\u1100-\u115F\u2E80-\uA4CF\uAC00-\uD7A3\uF900-\uFAFF\uFE10-\uFE19"
+    "\uFE30-\uFE6F\uFF00-\uFF60\uFFE0-\uFFE6\U00020000-\U0003FFFD]"
+)
+
+# 型推定で数値・日付として扱う文字列（例: 1,234 / -0.5 / 2024-01-31 / 2024/1/31 12:00）
+_NUMBER_TEXT_PATTERN = r"^\s*[+-]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?\s*$"
+_DATE_TEXT_PATTERN = r"^\s*\d{4}[-/]\d{1,2}[-/]\d{1,2}(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?\s*$"
+
+
+class _BatchStepError(Exception):
+    """一括操作のステップ失敗（失敗したステップ番号を保持）"""
+    
+    def __init__(self, index: int, cause: Exception):
+        super().__init__(str(cause))
+        self.index = index
+        self.cause = cause
+
+
+class _WriteTarget:
+    """まとめ書き込み中のワークブックと変更内容"""
+    
+    def __init__(self, wb):
+        self.wb = wb
+        self.is_new = wb is None
+        self.modified_sheets = set()
+        # キー索引のキャッシュキー -> 索引（保存後にキャッシュへ登録）
+        self.key_indexes: Dict[tuple, Dict[tuple, int]] = {}
+    
+    def sheet(self, sheet_name: str):
+        """書き込み先シートを取得（新規ファイル・未作成シートは作成）"""
+        if self.wb is None:
+            # 新規ファイル作成
+            self.wb = openpyxl.Workbook()
+            self.wb.active.title = sheet_name
+        elif sheet_name not in self.wb.sheetnames:
+            self.wb.create_sheet(sheet_name)
+        self.modified_sheets.add(sheet_name)
+        return self.wb[sheet_name]
+    
+    def get_sheet(self, sheet_name: str):
+        """読み込み用にシートを取得（変更扱いにしない）"""
+        if self.wb is None or sheet_name not in self.wb.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return self.wb[sheet_name]
+    
+    def drop_key_indexes(self, sheet_name: str):
+        """シートが変更されるため、そのシートのキー索引を破棄"""
+        for index_key in [k for k in self.key_indexes if k[0] == sheet_name]:
+            del self.key_indexes[index_key]
+
+
 class ExcelOperations:
     
     @staticmethod
@@ -12,22 +118,23 @@ class ExcelOperations:
         try:
             filepath = get_excel_filepath(filename)
             
-            # 既存ファイルの確認
-            if os.path.exists(filepath):
-                return {
-                    "success": False,
-                    "error": f"ファイル '{filename}' は既に存在します",
-                    "filename": filename,
-                    "path": filepath
-                }
-            
-            # 新規ワークブック作成
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = sheet_name
-            
-            # ファイル保存
-            wb.save(filepath)
+            with file_locks.write(filepath):
+                # 既存ファイルの確認
+                if os.path.exists(filepath):
+                    return {
+                        "success": False,
+                        "error": f"ファイル '{filename}' は既に存在します",
+                        "filename": filename,
+                        "path": filepath
+                    }
+                
+                # 新規ワークブック作成
+                wb = openpyxl.Workbook()
+                ws = wb.active
+                ws.title = sheet_name
+                
+                # ファイル保存（一時ファイル経由で置き換え）
+                atomic_save(wb, filepath)
             
             return {
                 "success": True,
@@ -46,90 +153,490 @@ class ExcelOperations:
     
     @staticmethod
     def write_excel_data(filename: str, sheet_name: str, data: List[Dict[str, Any]], 
-                        start_cell: str = "A1", include_header: bool = True) -> Dict[str, Any]:
-        """Excelファイルに表データを書き込み"""
+                        start_cell: str = "A1", include_header: bool = True,
+                        write_only: bool = False, auto_width: str = "auto",
+                        mode: str = "replace", key_columns: Optional[List[str]] = None,
+                        infer_types: bool = False) -> Dict[str, Any]:
+        """Excelファイルに表データを書き込み（write_only=Trueかつ新規ファイルならストリーミング書き込み）
+        
+        auto_width: 列幅の自動調整方法（auto / full / sample / none）
+        mode: replace（シートを置き換え） / append（末尾に追加） / upsert（key_columnsが一致する行を更新、なければ追加）
+        infer_types: 数値・日付を表す文字列の列を数値・日付として書き込む
+        """
         try:
-            if not data:
+            error = ExcelOperations._validate_write_args(data, mode, key_columns)
+            if error:
                 return {
                     "success": False,
-                    "error": "書き込むデータが空です"
+                    "error": error
                 }
             
             filepath = get_excel_filepath(filename)
             
             # DataFrameに変換
-            df = pd.DataFrame(data)
+            with metrics.span("convert"):
+                df = pd.DataFrame(data)
+                if infer_types:
+                    df = ExcelOperations._infer_types(df)
             
-            # 既存ファイルがあるかチェック
-            if os.path.exists(filepath):
-                # 既存ファイルを開く
-                wb = openpyxl.load_workbook(filepath)
-                
-                # シートが存在するかチェック
-                if sheet_name not in wb.sheetnames:
-                    wb.create_sheet(sheet_name)
-                
-                ws = wb[sheet_name]
-                # 既存データをクリア
-                ws.delete_rows(1, ws.max_row)
-            else:
-                # 新規ファイル作成
-                wb = openpyxl.Workbook()
-                ws = wb.active
-                ws.title = sheet_name
-            
-            # データをワークシートに書き込み
-            ExcelOperations._write_data_to_worksheet(ws, df, start_cell, include_header)
+            # 新規ファイルは書き込み専用モードで直接ストリーミング
+            if write_only and not os.path.exists(filepath):
+                with file_locks.write(filepath):
+                    created = not os.path.exists(filepath)
+                    if created:
+                        ExcelOperations._write_new_file_write_only(
+                            filepath, sheet_name, df, start_cell, include_header, auto_width
+                        )
+                        workbook_cache.invalidate(filepath)
+                if created:
+                    return {
+                        "success": True,
+                        "filename": filename,
+                        "sheet_name": sheet_name,
+                        "rows_written": len(data),
+                        "columns": len(df.columns),
+                        "headers": list(df.columns) if include_header else [],
+                        "path": filepath,
+                        "write_only": True,
+                        "mode": mode,
+                        "rows_appended": len(data),
+                        "rows_updated": 0,
+                        "file_size_bytes": os.path.getsize(filepath),
+                        "message": f"'{sheet_name}'シートに{len(data)}行のデータを書き込みました"
+                    }
             
-            # ファイル保存
-            wb.save(filepath)
+            def apply(target: "_WriteTarget") -> Dict[str, Any]:
+                appended, updated = ExcelOperations._apply_write(
+                    target, filepath, sheet_name, df, start_cell, include_header, auto_width, mode, key_columns
+                )
+                return {
+                    "success": True,
+                    "filename": filename,
+                    "sheet_name": sheet_name,
+                    "rows_written": len(data),
+                    "columns": len(df.columns),
+                    "headers": list(df.columns) if include_header else [],
+                    "path": filepath,
+                    "mode": mode,
+                    "rows_appended": appended,
+                    "rows_updated": updated,
+                    "message": f"'{sheet_name}'シートに{len(data)}行のデータを書き込みました"
+                               f"（追加: {appended}行, 更新: {updated}行）"
+                }
             
-            return {
-                "success": True,
-                "filename": filename,
-                "sheet_name": sheet_name,
-                "rows_written": len(data),
-                "columns": len(df.columns),
-                "headers": list(df.columns) if include_header else [],
-                "path": filepath,
-                "message": f"'{sheet_name}'シートに{len(data)}行のデータを書き込みました"
-            }
+            # 同じファイルへの同時書き込みはまとめて1回の読み込み・保存で処理
+            result = write_coalescer.submit(filepath, apply, ExcelOperations._run_write_batch)
+            if result.get("success"):
+                result["file_size_bytes"] = os.path.getsize(filepath)
+            return result
             
         except Exception as e:
             return {
                 "success": False,
                 "error": f"データ書き込みエラー: {str(e)}",
                 "filename": filename,
-                "sheet_name": sheet_name
+                "sheet_name": sheet_name,
+                **ExcelOperations._memory_details(e)
             }
     
     @staticmethod
-    def _write_data_to_worksheet(ws, df: pd.DataFrame, start_cell: str, include_header: bool):
+    def _validate_write_args(data: List[Dict[str, Any]], mode: str,
+                             key_columns: Optional[List[str]]) -> Optional[str]:
+        """書き込み引数を検証（問題があればエラーメッセージを返す）"""
+        if not data:
+            return "書き込むデータが空です"
+        if mode not in ("replace", "append", "upsert"):
+            return f"無効な書き込みモードです: '{mode}'"
+        if mode == "upsert" and not key_columns:
+            return "upsertモードではkey_columnsを指定してください"
+        return None
+    
+    @staticmethod
+    def _apply_write(target: "_WriteTarget", filepath: str, sheet_name: str, df: pd.DataFrame,
+                     start_cell: str, include_header: bool, auto_width: str, mode: str,
+                     key_columns: Optional[List[str]]):
+        """読み込み済みワークブックに書き込みを適用 (追加行数, 更新行数) を返す"""
+        index_key = None
+        if mode == "upsert":
+            index_key = ExcelOperations._key_index_cache_key(sheet_name, start_cell, include_header, key_columns)
+        
+        # 同じまとめ書き込み内で先に変更されたシートのキャッシュ済み索引は使わない
+        use_cached_index = not target.is_new and sheet_name not in target.modified_sheets
+        ws = target.sheet(sheet_name)
+        key_index = None
+        if mode == "upsert":
+            key_index = target.key_indexes.get(index_key)
+            if key_index is None and use_cached_index:
+                key_index = workbook_cache.get_extra(filepath, index_key)
+        target.drop_key_indexes(sheet_name)
+        
+        # データをワークシートに書き込み
+        if mode == "replace":
+            # 既存データをクリア
+            ws.delete_rows(1, ws.max_row)
+            ExcelOperations._write_data_to_worksheet(ws, df, start_cell, include_header, auto_width)
+            return len(df), 0
+        
+        appended, updated, key_index = ExcelOperations._merge_data_into_worksheet(
+            ws, df, start_cell, include_header, auto_width, key_columns, key_index
+        )
+        if key_index is not None:
+            target.key_indexes[index_key] = key_index
+        return appended, updated
+    
+    @staticmethod
+    def _run_write_batch(filepath: str, batch: List[PendingWrite]):
+        """排他ロック下でまとめ書き込みを適用し、1回だけ保存（失敗した操作は除外してやり直す）"""
+        remaining = list(batch)
+        while remaining:
+            # 既存ファイルを開く（キャッシュ済みならそれを使用）
+            wb = workbook_cache.get_workbook(filepath, ExcelOperations._load_workbook) if os.path.exists(filepath) else None
+            target = _WriteTarget(wb)
+            
+            failed = None
+            for pending in remaining:
+                try:
+                    pending.result = pending.apply(target)
+                except Exception as e:
+                    pending.error = e
+                    failed = pending
+                    break
+            
+            if failed is not None:
+                # 途中まで変更されたワークブックを破棄し、失敗した操作を除いて最初から適用し直す
+                workbook_cache.invalidate(filepath)
+                remaining = [pending for pending in remaining if pending is not failed]
+                for pending in remaining:
+                    pending.result = None
+                continue
+            
+            if not target.modified_sheets:
+                # 読み込みのみの場合は保存しない
+                return
+            
+            # 変更の影響を受ける数式だけを再計算し、計算結果を保存するファイルに書き込む
+            graph, formula_stats = ExcelOperations._recalculate_formulas(filepath, target)
+            
+            try:
+                # ファイル保存（一時ファイル経由で置き換え）
+                atomic_save(target.wb, filepath, graph.sheet_values() if graph is not None else None)
+            except Exception as e:
+                # 書き込み途中のワークブックがキャッシュに残らないよう破棄
+                workbook_cache.invalidate(filepath)
+                for pending in remaining:
+                    pending.result = None
+                    pending.error = e
+                raise
+            
+            # 保存後のワークブックをキャッシュに反映（次回読み込み時の再解析を回避）
+            workbook_cache.store_workbook(filepath, target.wb, modified_sheets=target.modified_sheets)
+            for index_key, key_index in target.key_indexes.items():
+                # 更新後のキー索引を保持し、次回のupsertで再構築しない
+                workbook_cache.put_extra(filepath, index_key, key_index, len(key_index) * 200)
+            # 数式グラフを保持し、次回の書き込みでは変更の影響を受ける数式だけを再計算
+            workbook_cache.put_extra(filepath, GRAPH_CACHE_KEY, graph,
+                                     graph.estimated_bytes() if graph is not None else 0)
+            if formula_stats is not None and (formula_stats.get("formulas") or "skipped" in formula_stats):
+                for pending in remaining:
+                    if isinstance(pending.result, dict):
+                        pending.result["formulas"] = formula_stats
+            return
+    
+    @staticmethod
+    def _recalculate_formulas(filepath: str, target: "_WriteTarget"):
+        """変更されたシートの影響を受ける数式を再計算 (数式グラフ, 統計) を返す（再計算しない場合はNone）"""
+        if not FORMULA_RECALC_ENABLED:
+            return None, None
+        graph = None if target.is_new else workbook_cache.get_extra(filepath, GRAPH_CACHE_KEY)
+        if graph is None:
+            # 初回（またはキャッシュから外れた後）はすべての数式を計算
+            graph = FormulaGraph()
+        start = time.perf_counter()
+        try:
+            with metrics.span("formulas"):
+                stats = graph.recalculate(target.wb, target.modified_sheets,
+                                          max_formulas=FORMULA_MAX_CELLS)
+        except ValueError as e:
+            return None, {"skipped": str(e)}
+        stats["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        # 他のシートの数式の値が変わった場合も、そのシートのキャッシュ済みデータを破棄する
+        target.modified_sheets.update(graph.changed_sheets)
+        return graph, stats
+    
+    @staticmethod
+    def _write_data_to_worksheet(ws, df: pd.DataFrame, start_cell: str, include_header: bool,
+                                 auto_width: str = "auto"):
         """ワークシートにデータと書式を適用"""
         # 開始位置の解析
-        start_col = ord(start_cell[0].upper()) - ord('A') + 1
-        start_row = int(start_cell[1:])
+        start_col, start_row = parse_start_cell(start_cell)
+        ExcelOperations._ensure_named_styles(ws.parent)
         
         # ヘッダー行の書き込みと書式設定
         if include_header:
-            for col, header in enumerate(df.columns):
-                cell = ws.cell(row=start_row, column=start_col + col, value=header)
-                # ヘッダーの書式設定
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
-                cell.border = ExcelOperations._get_border()
+            ExcelOperations._write_rows(ws, [list(df.columns)], start_row, start_col, HEADER_STYLE_NAME)
             start_row += 1
         
         # データ行の書き込みと書式設定
-        for row_idx, row_data in df.iterrows():
-            for col_idx, value in enumerate(row_data):
-                cell = ws.cell(row=start_row + row_idx, column=start_col + col_idx, value=value)
-                cell.border = ExcelOperations._get_border()
-                cell.alignment = Alignment(horizontal="left")
+        ExcelOperations._write_rows(ws, ExcelOperations._frame_rows(df), start_row, start_col, BODY_STYLE_NAME)
+        
+        # 列幅の自動調整（書き込んだデータのみから算出し、シート全体は走査しない）
+        widths = ExcelOperations._column_widths_from_frame(df, include_header, auto_width)
+        ExcelOperations._apply_column_widths(ws, widths, range(start_col, start_col + len(widths)), merge=False)
+    
+    @staticmethod
+    def _merge_data_into_worksheet(ws, df: pd.DataFrame, start_cell: str, include_header: bool,
+                                   auto_width: str, key_columns: Optional[List[str]],
+                                   key_index: Optional[Dict[tuple, int]]):
+        """既存データを残したまま追加・更新（key_columns指定時はupsert）
+        
+        戻り値: (追加行数, 更新行数, 更新後のキー索引)
+        """
+        start_col, header_row = parse_start_cell(start_cell)
+        if key_columns:
+            missing = [key for key in key_columns if key not in df.columns]
+            if missing:
+                raise ValueError(f"キー列がデータに存在しません: {missing}")
+        ExcelOperations._ensure_named_styles(ws.parent)
+        
+        # 列の対応付け（ヘッダーにない列は右端に追加）
+        if include_header:
+            columns = ExcelOperations._resolve_header_columns(ws, df, header_row, start_col)
+            data_start = header_row + 1
+        else:
+            columns = list(range(start_col, start_col + len(df.columns)))
+            data_start = header_row
+        next_row = max(ExcelOperations._last_used_row(ws) + 1, data_start)
+        rows = ExcelOperations._frame_rows(df)
+        
+        if key_columns:
+            positions = [list(df.columns).index(key) for key in key_columns]
+            if key_index is None:
+                key_index = ExcelOperations._build_key_index(
+                    ws, [columns[p] for p in positions], data_start
+                )
+            
+            # 既存キーは同じ行を更新、新しいキーは末尾に追加
+            targets = []
+            appended = 0
+            for values in rows:
+                key = tuple(values[p] for p in positions)
+                row_idx = key_index.get(key)
+                if row_idx is None:
+                    row_idx = next_row
+                    next_row += 1
+                    key_index[key] = row_idx
+                    appended += 1
+                targets.append(row_idx)
+            updated = len(rows) - appended
+        else:
+            targets = range(next_row, next_row + len(rows))
+            appended, updated = len(rows), 0
+        
+        ExcelOperations._write_rows(ws, rows, None, None, BODY_STYLE_NAME, row_indices=targets, columns=columns)
+        
+        widths = ExcelOperations._column_widths_from_frame(df, include_header, auto_width)
+        ExcelOperations._apply_column_widths(ws, widths, columns, merge=True)
+        return appended, updated, key_index
+    
+    @staticmethod
+    def _resolve_header_columns(ws, df: pd.DataFrame, header_row: int, start_col: int) -> List[int]:
+        """既存ヘッダーからDataFrameの各列の書き込み先列番号を取得"""
+        header_values = next(ws.iter_rows(min_row=header_row, max_row=header_row,
+                                          min_col=start_col, values_only=True), ())
+        positions = {name: start_col + i for i, name in enumerate(header_values) if name is not None}
+        next_col = start_col + len(header_values)
+        while next_col > start_col and header_values[next_col - start_col - 1] is None:
+            next_col -= 1
+        
+        columns = []
+        new_headers = []
+        for name in df.columns:
+            if name not in positions:
+                positions[name] = next_col
+                new_headers.append((next_col, name))
+                next_col += 1
+            columns.append(positions[name])
+        
+        if new_headers:
+            ExcelOperations._write_rows(
+                ws, [[name for _, name in new_headers]], None, None, HEADER_STYLE_NAME,
+                row_indices=[header_row], columns=[col for col, _ in new_headers]
+            )
+        return columns
+    
+    @staticmethod
+    def _last_used_row(ws) -> int:
+        """最終使用行を取得（空のシートは0）"""
+        if ws.max_row == 1 and all(value is None for value in next(ws.iter_rows(max_row=1, values_only=True))):
+            return 0
+        return ws.max_row
+    
+    @staticmethod
+    def _build_key_index(ws, key_cols: List[int], data_start: int) -> Dict[tuple, int]:
+        """キー列の値 -> 行番号 の索引を作成"""
+        index = {}
+        min_col, max_col = min(key_cols), max(key_cols)
+        offsets = [col - min_col for col in key_cols]
+        for row_idx, values in enumerate(ws.iter_rows(min_row=data_start, min_col=min_col,
+                                                      max_col=max_col, values_only=True), data_start):
+            key = tuple(values[o] for o in offsets)
+            if any(value is not None for value in key):
+                index[key] = row_idx
+        return index
+    
+    @staticmethod
+    def _key_index_cache_key(sheet_name: str, start_cell: str, include_header: bool,
+                             key_columns: List[str]) -> tuple:
+        """キー索引のキャッシュキー（先頭要素はシート名）"""
+        return (sheet_name, "key_index", start_cell.upper(), include_header, tuple(key_columns))
+    
+    @staticmethod
+    def _infer_types(df: pd.DataFrame) -> pd.DataFrame:
+        """すべての値が数値・日付を表す文字列の列を数値・日時の列に変換（それ以外の列はそのまま）"""
+        converted = {}
+        for position, (column, series) in enumerate(df.items()):
+            if series.dtype != object and not pd.api.types.is_string_dtype(series):
+                continue
+            values = series.dropna()
+            if values.empty or not all(isinstance(value, str) for value in values):
+                continue
+            if values.str.fullmatch(_NUMBER_TEXT_PATTERN).all():
+                converted[position] = pd.to_numeric(series.str.replace(",", "", regex=False).str.strip())
+            elif values.str.fullmatch(_DATE_TEXT_PATTERN).all():
+                converted[position] = pd.to_datetime(
+                    series.str.strip().str.replace("/", "-", regex=False), format="mixed"
+                )
+        if not converted:
+            return df
+        df = df.copy()
+        for position, series in converted.items():
+            df.isetitem(position, series)
+        return df
+    
+    @staticmethod
+    @metrics.timed("load")
+    def _load_workbook(filepath: str):
+        """編集用にワークブック全体を読み込み（推定メモリ使用量が上限を超える場合はMemoryLimitError）"""
+        decision = memory_governor.require(filepath, load="workbook")
+        with memory_governor.reserve(decision["estimated_bytes"]):
+            metrics.count_file_bytes("bytes_read", filepath)
+            return openpyxl.load_workbook(filepath)
+    
+    @staticmethod
+    @metrics.timed("style")
+    def _write_rows(ws, rows, start_row: Optional[int], start_col: Optional[int], style_name: str,
+                    row_indices=None, columns=None):
+        """行単位でまとめて書き込み、名前付きスタイルを範囲に適用
+        
+        row_indices / columns を指定すると各行・各列の書き込み先を個別に指定できる
+        """
+        styles = {}
+        dated = style_name == BODY_STYLE_NAME
+        if row_indices is None:
+            row_indices = count(start_row)
+        for row_idx, values in zip(row_indices, rows):
+            col_indices = columns if columns is not None else count(start_col)
+            for col_idx, value in zip(col_indices, values):
+                cell = ws.cell(row=row_idx, column=col_idx, value=value)
+                name = ExcelOperations._date_style_name(value) if dated and isinstance(value, datetime.date) else style_name
+                style_array = styles.get(name)
+                if style_array is None:
+                    # スタイルの解決はスタイルごとに最初の1セルのみ、以降は同じスタイル情報をコピー
+                    cell.style = name
+                    styles[name] = cell._style
+                else:
+                    cell._style = copy(style_array)
+    
+    @staticmethod
+    def _write_new_file_write_only(filepath: str, sheet_name: str, df: pd.DataFrame,
+                                   start_cell: str, include_header: bool, auto_width: str = "auto"):
+        """書き込み専用モードで新規ファイルを作成（セルを保持せずに直接出力）"""
+        start_col, start_row = parse_start_cell(start_cell)
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_name)
+        ExcelOperations._ensure_named_styles(wb)
+        
+        # 列幅は行の出力前に設定する必要がある
+        widths = ExcelOperations._column_widths_from_frame(df, include_header, auto_width)
+        ExcelOperations._apply_column_widths(ws, widths, range(start_col, start_col + len(widths)), merge=False)
+        
+        for _ in range(start_row - 1):
+            ws.append([])
+        
+        styled_row = ExcelOperations._styled_row_factory(ws, start_col)
+        with metrics.span("style"):
+            if include_header:
+                ws.append(styled_row(df.columns, HEADER_STYLE_NAME))
+            for values in ExcelOperations._frame_rows(df):
+                ws.append(styled_row(values, BODY_STYLE_NAME))
+        
+        atomic_save(wb, filepath)
+    
+    @staticmethod
+    def _styled_row_factory(ws, start_col: int = 1):
+        """書き込み専用シート用に、値のリストを書式付きセルの行に変換する関数を返す"""
+        padding = [None] * (start_col - 1)
+        styles = {}
+        
+        def styled_row(values, style_name):
+            cells = []
+            dated = style_name == BODY_STYLE_NAME
+            for value in values:
+                cell = WriteOnlyCell(ws, value=value)
+                name = ExcelOperations._date_style_name(value) if dated and isinstance(value, datetime.date) else style_name
+                if name not in styles:
+                    cell.style = name
+                    styles[name] = cell._style
+                else:
+                    # 書き込み専用セルは出力後に変更されないためスタイル情報を共有
+                    cell._style = styles[name]
+                cells.append(cell)
+            return padding + cells
         
-        # 列幅の自動調整
-        ExcelOperations._auto_adjust_column_width(ws)
+        return styled_row
+    
+    @staticmethod
+    def _date_style_name(value: datetime.date) -> str:
+        """日付・日時の値に使う本文スタイル名（時刻が0時ちょうどなら日付）"""
+        if isinstance(value, datetime.datetime) and value.time() != datetime.time(0):
+            return BODY_DATETIME_STYLE_NAME
+        return BODY_DATE_STYLE_NAME
+    
+    @staticmethod
+    def _frame_rows(df: pd.DataFrame):
+        """DataFrameの各行をPythonの値のリストとして取得（欠損値はNone）"""
+        values = df.to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = None
+        return values.tolist()
+    
+    @staticmethod
+    @metrics.timed("style")
+    def _ensure_named_styles(wb):
+        """ヘッダー・本文用の名前付きスタイルを登録（登録済みなら再利用）"""
+        registered = set(wb.named_styles)
+        if HEADER_STYLE_NAME not in registered:
+            wb.add_named_style(NamedStyle(
+                name=HEADER_STYLE_NAME,
+                font=Font(bold=True),
+                fill=PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid"),
+                alignment=Alignment(horizontal="center"),
+                border=ExcelOperations._get_border()
+            ))
+        if BODY_STYLE_NAME not in registered:
+            wb.add_named_style(NamedStyle(
+                name=BODY_STYLE_NAME,
+                alignment=Alignment(horizontal="left"),
+                border=ExcelOperations._get_border()
+            ))
+        for name, number_format in ((BODY_DATE_STYLE_NAME, "yyyy-mm-dd"),
+                                    (BODY_DATETIME_STYLE_NAME, "yyyy-mm-dd hh:mm:ss")):
+            if name not in registered:
+                wb.add_named_style(NamedStyle(
+                    name=name,
+                    alignment=Alignment(horizontal="left"),
+                    border=ExcelOperations._get_border(),
+                    number_format=number_format
+                ))
     
     @staticmethod
     def _get_border():
@@ -142,26 +649,377 @@ class ExcelOperations:
         )
     
     @staticmethod
-    def _auto_adjust_column_width(ws):
-        """列幅を自動調整"""
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
+    def _text_widths(values: pd.Series) -> pd.Series:
+        """文字列の表示幅を一括計算（全角文字は2として数える）"""
+        strings = values.astype(str)
+        return strings.str.len() + strings.str.count(_WIDE_CHAR_PATTERN.pattern)
+    
+    @staticmethod
+    @metrics.timed("autosize")
+    def _column_widths_from_frame(df: pd.DataFrame, include_header: bool,
+                                  auto_width: str = "auto") -> List[Optional[float]]:
+        """書き込むデータから列幅を算出（auto_width="none"なら調整しない）"""
+        if auto_width not in ("auto", "full", "sample", "none"):
+            raise ValueError(f"無効なauto_width指定です: '{auto_width}'")
+        if auto_width == "none":
+            return [None] * len(df.columns)
+        
+        if auto_width == "sample" or (auto_width == "auto" and len(df) > AUTO_WIDTH_SAMPLE_THRESHOLD_ROWS):
+            # 大量データは一部の行のみから推定
+            if len(df) > AUTO_WIDTH_SAMPLE_ROWS:
+                df = df.sample(n=AUTO_WIDTH_SAMPLE_ROWS, random_state=0)
+        
+        widths = []
+        for position, column in enumerate(df.columns):
+            # 同じ値の繰り返しが多いため、重複を除いてから幅を計算
+            values = df.iloc[:, position].dropna().drop_duplicates()
+            max_length = int(ExcelOperations._text_widths(values).max()) if len(values) else 0
+            if include_header:
+                max_length = max(max_length, int(ExcelOperations._text_widths(pd.Series([column])).iloc[0]))
+            widths.append(min(max_length + 2, MAX_COLUMN_WIDTH))
+        return widths
+    
+    @staticmethod
+    @metrics.timed("autosize")
+    def _apply_column_widths(ws, widths: List[Optional[float]], columns, merge: bool):
+        """列幅を設定（merge=Trueならシートに保存済みの幅より狭くしない）"""
+        for col_idx, width in zip(columns, widths):
+            if width is None:
+                continue
+            dimension = ws.column_dimensions[get_column_letter(col_idx)]
+            if merge and dimension.width:
+                width = max(width, dimension.width)
+            dimension.width = width
+    
+    @staticmethod
+    def read_excel_data(filename: str, sheet_name: str, range_cells: Optional[str] = None, 
+                       has_header: bool = True, offset: int = 0, limit: Optional[int] = None,
+                       cursor: Optional[str] = None, output_format: str = "records") -> Dict[str, Any]:
+        """Excelファイルから表データを読み込み（offset/limit/cursor指定時はページ単位）"""
+        try:
+            filepath = get_excel_filepath(filename)
+            check_format(output_format)
             
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
+            if not os.path.exists(filepath):
+                return {
+                    "success": False,
+                    "error": f"ファイル '{filename}' が見つかりません"
+                }
+            
+            # 読み込み中に他の書き込みで置き換えられないよう共有ロックを取得
+            with file_locks.read(filepath):
+                if cursor or limit is not None or offset:
+                    return ExcelOperations._read_excel_page(
+                        filename, filepath, sheet_name, range_cells, has_header, offset, limit, cursor,
+                        output_format
+                    )
+                
+                # 読み込み前に推定メモリ使用量を確認（キャッシュ済みのシートは読み込まないため不要）
+                decision = None
+                if range_cells:
+                    cell_range = parse_range(range_cells)
+                    decision = memory_governor.assess(filepath, sheet_name, "rows", cell_range.cell_count())
+                elif workbook_cache.peek_frame(filepath, sheet_name, has_header) is None:
+                    decision = memory_governor.assess(filepath, sheet_name, "frame")
+                if decision is not None and decision["action"] != "allow":
+                    # 全体を読み込まず先頭ページのみ返す（続きはnext_cursorで取得）
+                    result = ExcelOperations._read_excel_page(
+                        filename, filepath, sheet_name, range_cells, has_header, 0, None, None, output_format
+                    )
+                    result["memory"] = memory_governor.downgrade(decision, "pagination")
+                    return result
+                
+                with memory_governor.reserve(decision["estimated_bytes"] if decision else 0) as reservation:
+                    if range_cells:
+                        # 指定範囲の行のみを読み込み
+                        rows = ExcelOperations._read_sheet_rows(filepath, sheet_name, cell_range)
+                        df = ExcelOperations._frame_from_rows(rows, has_header)
+                    else:
+                        # pandasでデータ読み込み（シート単位のキャッシュを利用）
+                        df = workbook_cache.get_frame(
+                            filepath, sheet_name, has_header,
+                            lambda: ExcelOperations._load_sheet_frame(filepath, sheet_name, has_header)
+                        )
+            
+            result = {
+                "success": True,
+                **frame_payload(df, output_format, has_header),
+                "rows": len(df),
+                "columns": len(df.columns),
+                "headers": list(df.columns) if has_header else [],
+                "filename": filename,
+                "sheet_name": sheet_name,
+                "range": range_cells
+            }
+            if reservation["queued_ms"]:
+                # メモリ使用量がソフト上限を超えていたため待ってから実行した
+                result["memory"] = {"action": "queued", "queued_ms": reservation["queued_ms"]}
+            return result
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"データ読み込みエラー: {str(e)}",
+                "filename": filename,
+                "sheet_name": sheet_name,
+                **ExcelOperations._memory_details(e)
+            }
+    
+    @staticmethod
+    def _memory_details(e: Exception) -> Dict[str, Any]:
+        """メモリ上限による拒否の場合は判断内容を応答に含める"""
+        return {"memory": e.decision} if isinstance(e, MemoryLimitError) else {}
+    
+    @staticmethod
+    def _read_excel_page(filename: str, filepath: str, sheet_name: str, range_cells: Optional[str],
+                         has_header: bool, offset: int, limit: Optional[int],
+                         cursor: Optional[str], output_format: str = "records") -> Dict[str, Any]:
+        """シートを1ページ分だけ読み込み、次ページのカーソルを返す"""
+        if cursor:
+            position = decode_cursor(cursor)
+            if position.get("f") != filename or position.get("s") != sheet_name:
+                raise ValueError("カーソルが対象のファイル・シートと一致しません")
+            range_cells = position["r"]
+            has_header = position["h"]
+            limit = limit or position["l"]
+        limit = limit or DEFAULT_PAGE_SIZE
+        if limit <= 0 or offset < 0:
+            raise ValueError("offsetは0以上、limitは1以上で指定してください")
+        
+        cell_range = parse_range(range_cells) if range_cells else CellRange(1, 1, None, None)
+        data_start = cell_range.min_row + (1 if has_header else 0)
+        start_row = position["n"] if cursor else data_start + offset
+        
+        frame = None if range_cells else ExcelOperations._cached_sheet_frame(filepath, sheet_name, has_header)
+        if frame is not None:
+            # キャッシュ済みのDataFrameから該当ページを切り出す（XMLを解析しない）
+            begin = start_row - data_start
+            df = frame.iloc[begin:begin + limit]
+            next_row = start_row + limit
+            total_rows = len(frame)
+            has_more = begin + limit < total_rows
+        else:
+            # ヘッダー行（先頭1行のみ読み込むため軽量）
+            header_rows = []
+            if has_header:
+                header_range = CellRange(cell_range.min_row, cell_range.min_col,
+                                         cell_range.min_row, cell_range.max_col)
+                header_rows = ExcelOperations._read_sheet_rows(filepath, sheet_name, header_range)[:1]
+                if header_rows and cell_range.max_col is None:
+                    # 列範囲をヘッダーの列数に固定してページ間で列がずれないようにする
+                    cell_range = cell_range._replace(max_col=cell_range.min_col + len(header_rows[0]) - 1)
+            
+            page_end = start_row + limit - 1
+            if cell_range.max_row is not None:
+                page_end = min(page_end, cell_range.max_row)
+            
+            rows = None
+            wb = workbook_cache.peek_workbook(filepath)
+            if wb is not None:
+                # キャッシュ済みワークブックはメモリ上で切り出す
+                ws = ExcelOperations._get_sheet(wb, sheet_name)
+                # 使用範囲の外は読まない（編集用シートにセルを作成しない）
+                last_row = min(ws.max_row, cell_range.max_row) if cell_range.max_row else ws.max_row
+                page_end = min(page_end, last_row)
+                rows = ExcelOperations._worksheet_values(
+                    ws, min_row=start_row, max_row=page_end,
+                    min_col=cell_range.min_col, max_col=cell_range.max_col
+                ) if start_row <= page_end else []
+                next_row = start_row + limit
+            if rows is None:
+                # 前ページの続きから行イテレータを再開
+                bounds = (data_start, cell_range.min_col, cell_range.max_row, cell_range.max_col)
+                with metrics.span("parse"):
+                    rows, next_row, last_row = row_stream_registry.read_page(
+                        filepath, sheet_name, bounds, start_row, limit
+                    )
             
-            adjusted_width = min(max_length + 2, 50)  # 最大幅を50に制限
-            ws.column_dimensions[column_letter].width = adjusted_width
+            df = ExcelOperations._frame_from_rows(header_rows + list(rows), has_header)
+            
+            total_rows = max(0, last_row - data_start + 1) if last_row is not None else None
+            has_more = len(rows) == limit and (last_row is None or next_row <= last_row)
+        next_cursor = encode_cursor({
+            "f": filename, "s": sheet_name, "r": range_cells, "h": has_header,
+            "n": next_row, "l": limit
+        }) if has_more else None
+        
+        return {
+            "success": True,
+            **frame_payload(df, output_format, has_header),
+            "rows": len(df),
+            "columns": len(df.columns),
+            "headers": list(df.columns) if has_header else [],
+            "filename": filename,
+            "sheet_name": sheet_name,
+            "range": range_cells,
+            "offset": start_row - data_start,
+            "limit": limit,
+            "total_rows": total_rows,
+            "has_more": has_more,
+            "next_cursor": next_cursor
+        }
     
     @staticmethod
-    def read_excel_data(filename: str, sheet_name: str, range_cells: Optional[str] = None, 
-                       has_header: bool = True) -> Dict[str, Any]:
-        """Excelファイルから表データを読み込み"""
+    def _load_sheet_frame(filepath: str, sheet_name: str, has_header: bool) -> pd.DataFrame:
+        """シートをDataFrameとして読み込み（キャッシュ済みワークブックがあれば再解析しない）"""
+        wb = workbook_cache.peek_workbook(filepath)
+        if wb is not None:
+            rows = ExcelOperations._worksheet_values(ExcelOperations._get_sheet(wb, sheet_name))
+            if rows is not None:
+                return ExcelOperations._frame_from_rows(rows, has_header)
+        
+        # 列指向形式のディスクキャッシュがあればXMLを解析しない
+        df = sidecar_cache.load(filepath, sheet_name, has_header)
+        if df is not None:
+            return df
+        
+        metrics.count_file_bytes("bytes_read", filepath)
+        with metrics.span("parse"):
+            df = ExcelOperations._parse_sheet_frame(filepath, sheet_name, has_header)
+        sidecar_cache.store(filepath, sheet_name, has_header, df)
+        return df
+    
+    @staticmethod
+    def _parse_sheet_frame(filepath: str, sheet_name: str, has_header: bool,
+                           reader: Optional[XlsxReader] = None) -> pd.DataFrame:
+        """シート全体をDataFrameに変換（設定に応じてXMLから直接変換し、未対応のシートはpd.read_excel）
+        
+        readerを渡すと同じファイルの複数シートでzip・共有文字列の読み込みを共有する
+        """
+        if SHEET_READER_ENGINE == "stream":
+            try:
+                if reader is not None:
+                    return reader.read_frame(sheet_name, has_header)
+                with XlsxReader(filepath) as own_reader:
+                    return own_reader.read_frame(sheet_name, has_header)
+            except UnsupportedSheet:
+                metrics.count("stream_reader_fallbacks")
+        return pd.read_excel(filepath, sheet_name=sheet_name, header=0 if has_header else None)
+    
+    @staticmethod
+    def _cached_sheet_frame(filepath: str, sheet_name: str, has_header: bool,
+                            columns: Optional[List[Any]] = None) -> Optional[pd.DataFrame]:
+        """メモリ・ディスクのキャッシュ済みDataFrameのみ取得（なければNone、シートの解析は行わない）"""
+        df = workbook_cache.peek_frame(filepath, sheet_name, has_header)
+        if df is not None:
+            if columns is None:
+                return df
+            return df[columns] if all(column in df.columns for column in columns) else None
+        return sidecar_cache.load(filepath, sheet_name, has_header, columns)
+    
+    @staticmethod
+    @metrics.timed("parse")
+    def _read_sheet_rows(filepath: str, sheet_name: str, cell_range: CellRange) -> List[tuple]:
+        """指定範囲の値を行単位で読み込み（終了行を過ぎたら解析を打ち切る）"""
+        bounds = {
+            "min_row": cell_range.min_row,
+            "max_row": cell_range.max_row,
+            "min_col": cell_range.min_col,
+            "max_col": cell_range.max_col
+        }
+        
+        # キャッシュ済みワークブックがあればメモリ上から取得
+        wb = workbook_cache.peek_workbook(filepath)
+        if wb is not None:
+            rows = ExcelOperations._worksheet_values(ExcelOperations._get_sheet(wb, sheet_name), **bounds)
+            if rows is not None:
+                return rows
+        
+        # 読み取り専用モードで必要な行だけをストリーミング読み込み
+        metrics.count_file_bytes("bytes_read", filepath)
+        wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            ws = ExcelOperations._get_sheet(wb, sheet_name)
+            rows = list(ws.iter_rows(values_only=True, **bounds))
+        finally:
+            wb.close()
+        
+        ExcelOperations._trim_empty_rows(rows)
+        return rows
+    
+    @staticmethod
+    def _get_sheet(wb, sheet_name: str):
+        """ワークブックからシートを取得"""
+        if sheet_name not in wb.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return wb[sheet_name]
+    
+    @staticmethod
+    def _worksheet_values(ws, min_row: Optional[int] = None, max_row: Optional[int] = None,
+                          min_col: Optional[int] = None, max_col: Optional[int] = None) -> Optional[List[tuple]]:
+        """キャッシュ済みワークシートの値を取得
+        
+        編集用のワークシートのiter_rowsは存在しない位置にセルを作成し、シートの使用範囲が
+        広がってしまう（次の保存でファイルにも残る）ため、セルの辞書から直接読む。
+        行は使用範囲の最終行までとし、列は指定どおりの幅で返す（読み取り専用モードと同じ）。
+        数式セルは計算結果を保持していないため、含まれる場合はNoneを返す
+        """
+        last_row = ws.max_row if max_row is None else min(max_row, ws.max_row)
+        last_col = ws.max_column if max_col is None else max_col
+        columns = range(min_col or 1, last_col + 1)
+        cells = ws._cells
+        rows = []
+        for row in range(min_row or 1, last_row + 1):
+            values = []
+            for col in columns:
+                cell = cells.get((row, col))
+                if cell is None:
+                    values.append(None)
+                    continue
+                if cell.data_type == 'f':
+                    return None
+                values.append(cell.value)
+            rows.append(tuple(values))
+        
+        ExcelOperations._trim_empty_rows(rows)
+        return rows
+    
+    @staticmethod
+    def _trim_empty_rows(rows: List[tuple]):
+        """末尾の空行を除去（pd.read_excelと同じ挙動）"""
+        while rows and all(value is None for value in rows[-1]):
+            rows.pop()
+    
+    @staticmethod
+    @metrics.timed("convert")
+    def _frame_from_rows(rows: List[tuple], has_header: bool) -> pd.DataFrame:
+        """行データからDataFrameを生成"""
+        if not has_header:
+            return pd.DataFrame(rows)
+        if not rows:
+            return pd.DataFrame()
+        
+        return pd.DataFrame(rows[1:], columns=ExcelOperations._header_names(rows[0]))
+    
+    @staticmethod
+    def _header_names(header: tuple) -> List[Any]:
+        """ヘッダー行を列名に変換（pd.read_excelと同じく空欄は「Unnamed: 列番号」、重複は「列名.N」）"""
+        names = []
+        counts: Dict[Any, int] = {}
+        for i, name in enumerate(header):
+            if name is None:
+                name = f"Unnamed: {i}"
+            count = counts.get(name, 0)
+            while count:
+                counts[name] = count + 1
+                name = f"{name}.{count}"
+                count = counts.get(name, 0)
+            counts[name] = 1
+            names.append(name)
+        return names
+    
+    @staticmethod
+    def query_excel_data(filename: str, sheet_name: str, columns: Optional[List[str]] = None,
+                         filters: Optional[List[Dict[str, Any]]] = None,
+                         group_by: Optional[List[str]] = None,
+                         aggregations: Optional[List[Dict[str, Any]]] = None,
+                         sort: Optional[List[Any]] = None, limit: Optional[int] = None,
+                         range_cells: Optional[str] = None,
+                         output_format: str = "records") -> Dict[str, Any]:
+        """シートに絞り込み・集計・並べ替えを適用し、結果のみを返す
+        
+        必要な列だけをDataFrame化し、絞り込みは読み込みと並行してチャンク単位で行う
+        """
         try:
             filepath = get_excel_filepath(filename)
             
@@ -171,40 +1029,999 @@ class ExcelOperations:
                     "error": f"ファイル '{filename}' が見つかりません"
                 }
             
-            # pandasでデータ読み込み
-            if range_cells:
-                # 特定範囲の読み込み（実装簡略化のため全体読み込み後に範囲指定）
-                df = pd.read_excel(filepath, sheet_name=sheet_name, header=0 if has_header else None)
+            check_format(output_format)
+            filters = [dict(f, op=f.get("op", "==")) if isinstance(f, dict) else f for f in (filters or [])]
+            group_by = list(group_by or [])
+            sort = [{"column": key} if isinstance(key, str) else key for key in (sort or [])]
+            agg_specs = ExcelOperations._validate_query(filters, group_by, aggregations or [], sort, limit)
+            
+            # 読み込む列（射影・絞り込み・集計・並べ替えの対象のみ）
+            aliases = {alias for alias, _, _ in agg_specs}
+            if agg_specs:
+                source_columns = group_by + [column for _, column, _ in agg_specs if column is not None]
             else:
-                df = pd.read_excel(filepath, sheet_name=sheet_name, header=0 if has_header else None)
+                source_columns = columns
+            needed = None
+            if source_columns is not None:
+                needed = list(dict.fromkeys(
+                    source_columns
+                    + [f["column"] for f in filters]
+                    + [key["column"] for key in sort if key["column"] not in aliases]
+                ))
             
-            # NaN値を空文字に変換
-            df = df.fillna("")
+            # 並べ替え・集計がなければ上位N件に達した時点で読み込みを打ち切る
+            stop_after = limit if not (sort or agg_specs) else None
             
-            # 辞書形式に変換
-            data = df.to_dict('records')
+            with file_locks.read(filepath):
+                df, scanned = ExcelOperations._scan_filtered_frame(
+                    filepath, sheet_name, range_cells, needed, filters, stop_after
+                )
+            matched = len(df)
+            
+            if agg_specs:
+                df = ExcelOperations._aggregate_frame(df, group_by, agg_specs)
+            elif columns:
+                df = df[columns]
+            
+            if sort:
+                ExcelOperations._check_columns(list(df.columns), [key["column"] for key in sort])
+                df = df.sort_values(
+                    by=[key["column"] for key in sort],
+                    ascending=[not key.get("descending", False) for key in sort],
+                    kind="stable", na_position="last"
+                )
+            if limit is not None:
+                df = df.head(limit)
             
             return {
                 "success": True,
-                "data": data,
+                **frame_payload(df, output_format),
                 "rows": len(df),
                 "columns": len(df.columns),
-                "headers": list(df.columns) if has_header else [],
+                "headers": list(df.columns),
+                "scanned_rows": scanned,
+                "matched_rows": matched,
+                "filename": filename,
+                "sheet_name": sheet_name,
+                "range": range_cells
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"クエリ実行エラー: {str(e)}",
                 "filename": filename,
                 "sheet_name": sheet_name
             }
+    
+    @staticmethod
+    def _validate_query(filters: List[Dict[str, Any]], group_by: List[str],
+                        aggregations: List[Dict[str, Any]], sort: List[Dict[str, Any]],
+                        limit: Optional[int]) -> List[tuple]:
+        """クエリ引数を検証し、集計を (出力列名, 対象列, 関数) のリストに変換"""
+        for f in filters:
+            if not isinstance(f, dict) or "column" not in f:
+                raise ValueError("filtersの各要素にはcolumnを指定してください")
+            if f["op"] not in QUERY_FILTER_OPERATORS:
+                raise ValueError(
+                    f"不明な比較演算子です: {f['op']}（{', '.join(QUERY_FILTER_OPERATORS)} のいずれか）"
+                )
+            if f["op"] not in ("is_null", "not_null") and "value" not in f:
+                raise ValueError(f"比較演算子 '{f['op']}' にはvalueを指定してください")
+        
+        for key in sort:
+            if not isinstance(key, dict) or "column" not in key:
+                raise ValueError("sortの各要素には列名またはcolumnを指定してください")
+        
+        if limit is not None and limit <= 0:
+            raise ValueError("limitは1以上で指定してください")
+        
+        specs = []
+        for aggregation in aggregations:
+            func = aggregation.get("func")
+            column = aggregation.get("column")
+            if func not in QUERY_AGGREGATIONS:
+                raise ValueError(f"不明な集計関数です: {func}（{', '.join(QUERY_AGGREGATIONS)} のいずれか）")
+            if column is None and func != "count":
+                raise ValueError(f"集計関数 '{func}' にはcolumnを指定してください")
+            alias = aggregation.get("alias") or (f"{column}_{func}" if column is not None else "count")
+            specs.append((alias, column, func))
+        
+        # グループ化のみ指定された場合は件数を集計
+        if group_by and not specs:
+            specs.append(("count", None, "count"))
+        return specs
+    
+    @staticmethod
+    def _check_columns(available: List[Any], requested: List[Any]):
+        """指定された列がすべて存在するか確認"""
+        missing = [column for column in requested if column not in available]
+        if missing:
+            raise ValueError(f"列が見つかりません: {missing}")
+    
+    @staticmethod
+    def _scan_filtered_frame(filepath: str, sheet_name: str, range_cells: Optional[str],
+                             needed: Optional[List[str]], filters: List[Dict[str, Any]],
+                             stop_after: Optional[int]):
+        """必要な列のみを読み込んで絞り込み、(DataFrame, 走査行数) を返す"""
+        if not range_cells:
+            # シート全体のDataFrameがキャッシュ済みなら必要な列のみ取り出す
+            df = ExcelOperations._cached_sheet_frame(filepath, sheet_name, True, needed)
+            if df is not None:
+                scanned = len(df)
+                df = ExcelOperations._apply_filters(df, filters)
+                return (df.head(stop_after) if stop_after is not None else df), scanned
+        
+        cell_range = parse_range(range_cells) if range_cells else CellRange(1, 1, None, None)
+        rows = ExcelOperations._iter_range_rows(filepath, sheet_name, cell_range)
+        try:
+            header = next(rows, None)
+            headers = [] if header is None else ExcelOperations._header_names(header)
+            names = needed if needed is not None else headers
+            ExcelOperations._check_columns(headers, names)
+            positions = [headers.index(name) for name in names]
+            
+            parts = []
+            chunk = []
+            scanned = 0
+            matched = 0
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                chunk.append(tuple(row[i] if i < len(row) else None for i in positions))
+                if len(chunk) >= QUERY_CHUNK_ROWS:
+                    part = ExcelOperations._apply_filters(pd.DataFrame(chunk, columns=names), filters)
+                    scanned += len(chunk)
+                    matched += len(part)
+                    parts.append(part)
+                    chunk = []
+                    if stop_after is not None and matched >= stop_after:
+                        break
+            if chunk:
+                scanned += len(chunk)
+                parts.append(ExcelOperations._apply_filters(pd.DataFrame(chunk, columns=names), filters))
+        finally:
+            rows.close()
+        
+        if not parts:
+            return pd.DataFrame(columns=names), scanned
+        df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+        return (df.head(stop_after) if stop_after is not None else df), scanned
+    
+    @staticmethod
+    def _iter_range_rows(filepath: str, sheet_name: str, cell_range: CellRange):
+        """指定範囲の値を1行ずつ返す（キャッシュ済みワークブックがなければ読み取り専用で解析）"""
+        bounds = {
+            "min_row": cell_range.min_row,
+            "max_row": cell_range.max_row,
+            "min_col": cell_range.min_col,
+            "max_col": cell_range.max_col
+        }
+        
+        wb = workbook_cache.peek_workbook(filepath)
+        if wb is not None:
+            rows = ExcelOperations._worksheet_values(ExcelOperations._get_sheet(wb, sheet_name), **bounds)
+            if rows is not None:
+                yield from rows
+                return
+        
+        metrics.count_file_bytes("bytes_read", filepath)
+        wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            ws = ExcelOperations._get_sheet(wb, sheet_name)
+            yield from ws.iter_rows(values_only=True, **bounds)
+        finally:
+            wb.close()
+    
+    @staticmethod
+    def _apply_filters(df: pd.DataFrame, filters: List[Dict[str, Any]]) -> pd.DataFrame:
+        """絞り込み条件（AND）をベクトル演算で適用"""
+        if not filters or df.empty:
+            return df
+        
+        mask = pd.Series(True, index=df.index)
+        for f in filters:
+            series = df[f["column"]]
+            op = f["op"]
+            value = f.get("value")
+            if op == "is_null":
+                condition = series.isna()
+            elif op == "not_null":
+                condition = series.notna()
+            elif op in ("in", "not_in"):
+                condition = series.isin(value if isinstance(value, list) else [value])
+                if op == "not_in":
+                    condition = ~condition
+            elif op in ("contains", "startswith"):
+                text = series.astype("string")
+                if op == "contains":
+                    condition = text.str.contains(str(value), regex=False)
+                else:
+                    condition = text.str.startswith(str(value))
+            else:
+                left, right = ExcelOperations._comparable(series, value)
+                condition = _COMPARISON_OPERATORS[op](left, right)
+            mask &= condition.fillna(False).astype(bool)
+        return df[mask]
+    
+    @staticmethod
+    def _comparable(series: pd.Series, value: Any):
+        """比較値の型に合わせて列を変換（数値以外の値は比較対象外としてNaNにする）"""
+        if isinstance(value, bool) or value is None:
+            return series, value
+        if isinstance(value, (int, float)):
+            return pd.to_numeric(series, errors="coerce"), value
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series, pd.Timestamp(value)
+        return series.astype("string"), str(value)
+    
+    @staticmethod
+    def _aggregate_frame(df: pd.DataFrame, group_by: List[str], specs: List[tuple]) -> pd.DataFrame:
+        """グループごとに集計（合計・平均は数値に変換して計算）"""
+        sources = {}
+        for i, (alias, column, func) in enumerate(specs):
+            if column is None:
+                continue
+            series = df[column]
+            if func in ("sum", "mean"):
+                series = pd.to_numeric(series, errors="coerce")
+            sources[i] = series
+        
+        if not group_by:
+            record = {
+                alias: len(df) if column is None else getattr(sources[i], func)()
+                for i, (alias, column, func) in enumerate(specs)
+            }
+            return pd.DataFrame([record], columns=[alias for alias, _, _ in specs])
+        
+        work = df[group_by].copy()
+        named = {}
+        for i, (alias, column, func) in enumerate(specs):
+            if column is None:
+                named[alias] = pd.NamedAgg(group_by[0], "size")
+            else:
+                work[f"__value{i}"] = sources[i]
+                named[alias] = pd.NamedAgg(f"__value{i}", func)
+        return work.groupby(group_by, dropna=False).agg(**named).reset_index()
+    
+    @staticmethod
+    def read_many(targets: Optional[List[Dict[str, Any]]] = None, pattern: Optional[str] = None,
+                  sheet_name: Optional[str] = None, range_cells: Optional[str] = None,
+                  has_header: bool = True, concat: bool = False, source_column: str = "_source",
+                  max_cells: Optional[int] = None, cursor: Optional[str] = None,
+                  output_format: str = "records") -> Dict[str, Any]:
+        """複数のファイル・シート・範囲をまとめて読み込み
+        
+        targets（{filename, sheet_name, range}のリスト）またはファイル名のパターンで対象を指定する。
+        sheet_name省略時はすべてのシートが対象。ファイルごとにzipを1回だけ開いて全対象シートを読み、
+        複数ファイルはプロセスプールで並列に解析する。応答のセル数がmax_cellsを超える分は
+        next_cursorを指定して続きを取得する。
+        """
+        try:
+            check_format(output_format)
+            limit_cells = max_cells or READ_MANY_MAX_CELLS
+            if limit_cells <= 0:
+                raise ValueError("max_cellsは1以上で指定してください")
+            
+            entries = ExcelOperations._resolve_read_targets(targets, pattern, sheet_name, range_cells)
+            position = decode_cursor(cursor) if cursor else {"t": 0, "r": 0}
+            if cursor and position.get("n") != len(entries):
+                raise ValueError("カーソルが対象のファイル・シートと一致しません")
+            
+            # 同じファイルの対象をまとめ、最初に現れた順にファイル単位で読み込む
+            # 推定メモリ使用量が上限を超える対象は解析せず、対象ごとのエラーとして返す
+            groups: Dict[str, List[tuple]] = {}
+            pending: Dict[int, tuple] = {}
+            for index, entry in enumerate(entries):
+                if index < position["t"]:
+                    continue
+                if entry.get("error"):
+                    pending[index] = (None, entry["error"])
+                    continue
+                decision = ExcelOperations._assess_read_target(entry, has_header)
+                if decision is not None and decision["action"] != "allow":
+                    rejection = memory_governor.reject(decision)
+                    entry["memory"] = rejection.decision
+                    pending[index] = (None, f"{rejection}（read_excel_dataのlimitでページ単位に読み込んでください）")
+                    continue
+                groups.setdefault(entry["path"], []).append((index, entry["sheet_name"], entry["range"]))
+            
+            parts = []
+            remaining = limit_cells
+            index, row_offset = position["t"], position["r"]
+            next_cursor = None
+            stream = ExcelOperations._iter_file_results(groups, has_header)
+            try:
+                while index < len(entries):
+                    while index not in pending:
+                        pending.update((i, (df, error)) for i, df, error in next(stream))
+                    df, error = pending.pop(index)
+                    if error is not None:
+                        parts.append((entries[index], None, error, 0))
+                        index, row_offset = index + 1, 0
+                        continue
+                    
+                    rest = df.iloc[row_offset:]
+                    width = max(1, len(rest.columns))
+                    if len(rest) * width <= remaining:
+                        take = len(rest)
+                    else:
+                        # 上限を超える分は次のページに回す（1行も返せない場合は進めるため1行だけ返す）
+                        taken_any = remaining < limit_cells
+                        take = remaining // width or (0 if taken_any else 1)
+                    if take or not len(rest):
+                        parts.append((entries[index], rest.iloc[:take], None, row_offset))
+                    remaining -= take * width
+                    if take < len(rest):
+                        next_cursor = encode_cursor({"t": index, "r": row_offset + take, "n": len(entries)})
+                        break
+                    index, row_offset = index + 1, 0
+            finally:
+                stream.close()
+            
+            result = {
+                "success": True,
+                "targets": len(entries),
+                "files": len({entry["filename"] for entry in entries}),
+                "rows": sum(len(df) for _, df, _, _ in parts if df is not None),
+                "cells": limit_cells - remaining,
+                "has_more": next_cursor is not None,
+                "next_cursor": next_cursor
+            }
+            if concat:
+                result.update(ExcelOperations._concat_read_results(parts, source_column, output_format, has_header))
+            else:
+                result["results"] = [
+                    ExcelOperations._read_result_entry(entry, df, error, offset, output_format, has_header)
+                    for entry, df, error, offset in parts
+                ]
+            return result
             
         except Exception as e:
             return {
                 "success": False,
-                "error": f"データ読み込みエラー: {str(e)}",
+                "error": f"一括読み込みエラー: {str(e)}"
+            }
+    
+    @staticmethod
+    def _resolve_read_targets(targets: Optional[List[Dict[str, Any]]], pattern: Optional[str],
+                              sheet_name: Optional[str], range_cells: Optional[str]) -> List[Dict[str, Any]]:
+        """読み込み対象を（ファイル, シート, 範囲）の一覧に展開（シート省略時はすべてのシート）"""
+        if (targets is None) == (pattern is None):
+            raise ValueError("targetsとpatternのどちらか一方を指定してください")
+        
+        if pattern is not None:
+            if "/" in pattern or "\\" in pattern:
+                raise ValueError("patternにはexcelフォルダ直下のファイル名のパターンを指定してください")
+            names = sorted(
+                name for name in os.listdir(get_excel_directory())
+                if name.endswith(".xlsx") and fnmatch.fnmatchcase(name, pattern)
+            )
+            targets = [{"filename": name, "sheet_name": sheet_name, "range": range_cells} for name in names]
+        
+        entries = []
+        sheet_names: Dict[str, List[str]] = {}
+        for target in targets:
+            if not isinstance(target, dict) or not target.get("filename"):
+                raise ValueError("targetsの各要素にはfilenameを指定してください")
+            filename = target["filename"]
+            filepath = get_excel_filepath(filename)
+            sheets = [target["sheet_name"]] if target.get("sheet_name") is not None else None
+            if sheets is None:
+                if not os.path.exists(filepath):
+                    entries.append({"filename": filename, "sheet_name": None, "range": None,
+                                    "error": f"ファイル '{filename}' が見つかりません"})
+                    continue
+                if filepath not in sheet_names:
+                    with file_locks.read(filepath):
+                        sheet_names[filepath] = read_sheet_names(filepath)
+                sheets = sheet_names[filepath]
+            for name in sheets:
+                entry = {"filename": filename, "path": filepath, "sheet_name": name, "range": target.get("range")}
+                if not os.path.exists(filepath):
+                    entry["error"] = f"ファイル '{filename}' が見つかりません"
+                entries.append(entry)
+        
+        if len(entries) > READ_MANY_MAX_TARGETS:
+            raise ValueError(f"読み込み対象（ファイル×シート）は{READ_MANY_MAX_TARGETS}件以下にしてください（{len(entries)}件）")
+        return entries
+    
+    @staticmethod
+    def _assess_read_target(entry: Dict[str, Any], has_header: bool) -> Optional[Dict[str, Any]]:
+        """対象1件の読み込み前の推定メモリ使用量（キャッシュ済みのシートや見積もれない対象はNone）"""
+        try:
+            if entry["range"]:
+                cell_range = parse_range(entry["range"])
+                return memory_governor.assess(entry["path"], entry["sheet_name"], "rows", cell_range.cell_count())
+            if workbook_cache.peek_frame(entry["path"], entry["sheet_name"], has_header) is not None:
+                return None
+            return memory_governor.assess(entry["path"], entry["sheet_name"], "frame")
+        except Exception:
+            # 存在しないシートなどは読み込み時のエラーとして返す
+            return None
+    
+    @staticmethod
+    def _iter_file_results(groups: Dict[str, List[tuple]], has_header: bool):
+        """ファイル単位の読み込み結果を登録順に返す（複数ファイルはプロセスプールで並列に解析）
+        
+        先読みするファイル数をプロセス数の2倍までに抑え、未取得の結果がメモリに溜まらないようにする
+        """
+        items = list(groups.items())
+        pool = executor.fan_out_pool() if len(items) > 1 else None
+        if pool is None:
+            for filepath, targets in items:
+                yield ExcelOperations._read_file_targets(filepath, targets, has_header)
+            return
+        
+        window = max(2, executor.fan_out_workers * 2)
+        futures = deque()
+        try:
+            for filepath, targets in items:
+                futures.append(pool.submit(ExcelOperations._read_file_targets, filepath, targets, has_header))
+                if len(futures) >= window:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            # 上限に達して途中で打ち切った場合は未着手の読み込みを取り消す
+            for future in futures:
+                future.cancel()
+    
+    @staticmethod
+    def _read_file_targets(filepath: str, targets: List[tuple], has_header: bool) -> List[tuple]:
+        """1つのファイルの複数シート・範囲を読み込み（zipはファイルごとに開き直さない、子プロセスでも実行される）
+        
+        戻り値は (対象の番号, DataFrame, エラー) のリスト
+        """
+        results = []
+        book = None
+        reader = None
+        try:
+            with file_locks.read(filepath):
+                for index, sheet_name, range_cells in targets:
+                    try:
+                        if range_cells:
+                            if book is None:
+                                metrics.count_file_bytes("bytes_read", filepath)
+                                book = pd.ExcelFile(filepath, engine="openpyxl")
+                            cell_range = parse_range(range_cells)
+                            ws = ExcelOperations._get_sheet(book.book, sheet_name)
+                            with metrics.span("parse"):
+                                rows = list(ws.iter_rows(
+                                    values_only=True, min_row=cell_range.min_row, max_row=cell_range.max_row,
+                                    min_col=cell_range.min_col, max_col=cell_range.max_col
+                                ))
+                            ExcelOperations._trim_empty_rows(rows)
+                            df = ExcelOperations._frame_from_rows(rows, has_header)
+                        else:
+                            df = ExcelOperations._cached_sheet_frame(filepath, sheet_name, has_header)
+                            if df is None:
+                                if reader is None:
+                                    metrics.count_file_bytes("bytes_read", filepath)
+                                    reader = XlsxReader(filepath)
+                                with metrics.span("parse"):
+                                    df = ExcelOperations._parse_sheet_frame(filepath, sheet_name, has_header, reader)
+                                sidecar_cache.store(filepath, sheet_name, has_header, df)
+                        results.append((index, df, None))
+                    except Exception as e:
+                        results.append((index, None, str(e)))
+        finally:
+            if book is not None:
+                book.close()
+            if reader is not None:
+                reader.close()
+        return results
+    
+    @staticmethod
+    def _read_result_entry(entry: Dict[str, Any], df: Optional[pd.DataFrame], error: Optional[str],
+                           offset: int, output_format: str, has_header: bool) -> Dict[str, Any]:
+        """対象1件分の応答を作成"""
+        result = {"filename": entry["filename"], "sheet_name": entry["sheet_name"], "range": entry["range"]}
+        if error is not None:
+            if "memory" in entry:
+                result["memory"] = entry["memory"]
+            return dict(result, success=False, error=error)
+        return dict(
+            result,
+            success=True,
+            **frame_payload(df, output_format, has_header),
+            rows=len(df),
+            columns=len(df.columns),
+            headers=list(df.columns) if has_header else [],
+            offset=offset
+        )
+    
+    @staticmethod
+    def _concat_read_results(parts: List[tuple], source_column: str, output_format: str,
+                             has_header: bool) -> Dict[str, Any]:
+        """読み込み結果を1つの表に連結（先頭列に「ファイル名/シート名」を追加）"""
+        frames = []
+        sources = []
+        for entry, df, error, offset in parts:
+            source = {"filename": entry["filename"], "sheet_name": entry["sheet_name"], "range": entry["range"]}
+            if error is not None:
+                if "memory" in entry:
+                    source["memory"] = entry["memory"]
+                sources.append(dict(source, success=False, error=error))
+                continue
+            sources.append(dict(source, success=True, rows=len(df), offset=offset))
+            if len(df):
+                df = df.copy()
+                df.insert(0, source_column, f"{entry['filename']}/{entry['sheet_name']}")
+                frames.append(df)
+        
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return {
+            **frame_payload(df, output_format, has_header),
+            "columns": len(df.columns),
+            "headers": list(df.columns) if has_header else [],
+            "sources": sources
+        }
+    
+    @staticmethod
+    def search_excel(query: str, pattern: Optional[str] = None, sheet_name: Optional[str] = None,
+                     max_results: Optional[int] = None, refresh: bool = True) -> Dict[str, Any]:
+        """excelフォルダ内の全ブックからセルの値を検索（転置インデックスを使用）
+        
+        検索語は大文字・小文字、全角・半角を区別しない部分一致で、空白で区切るとすべてを含むセルを返す。
+        refreshがTrueなら検索前に更新されたブックだけを索引し直す。
+        """
+        try:
+            start = time.perf_counter()
+            limit = SEARCH_MAX_RESULTS if max_results is None else max_results
+            if limit <= 0:
+                raise ValueError("max_resultsは1以上で指定してください")
+            
+            excel_dir = get_excel_directory()
+            index = search_index.refresh(excel_dir, pattern) if refresh else None
+            found = search_index.search(excel_dir, query, pattern, sheet_name, limit)
+            for hit in found["hits"]:
+                hit["cell"] = f"{get_column_letter(hit['column'])}{hit['row']}"
+            
+            result = {
+                "success": True,
+                "query": query,
+                "hits": found["hits"],
+                "count": len(found["hits"]),
+                "total_matches": found["total_matches"],
+                "truncated": found["total_matches"] > len(found["hits"]),
+                "sheets": found["sheets"],
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+            }
+            if index is not None:
+                result["index"] = index
+            if found["unreadable_files"]:
+                result["unreadable_files"] = found["unreadable_files"]
+            return result
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"検索エラー: {str(e)}",
+                "query": query
+            }
+    
+    @staticmethod
+    def batch_excel_operations(filename: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """1つのワークブックに対する複数の操作を1回の読み込み・保存で実行
+        
+        すべての操作が成功した場合のみ保存する（1つでも失敗すれば何も保存しない）。
+        操作の種類: create_sheet / write / append / read / list_sheets
+        """
+        try:
+            if not operations:
+                return {
+                    "success": False,
+                    "error": "実行する操作が空です"
+                }
+            
+            filepath = get_excel_filepath(filename)
+            started = time.perf_counter()
+            
+            # 書き込みデータの変換と検証は読み込み前に行う
+            prepared = []
+            for index, operation in enumerate(operations):
+                op_type = operation.get("type")
+                if op_type not in BATCH_OPERATION_TYPES:
+                    raise ValueError(f"操作{index}: 不明な操作です: '{op_type}'")
+                if op_type in ("write", "append"):
+                    mode = "append" if op_type == "append" else operation.get("mode", "replace")
+                    error = ExcelOperations._validate_write_args(
+                        operation.get("data"), mode, operation.get("key_columns")
+                    )
+                    if error:
+                        raise ValueError(f"操作{index}: {error}")
+                    df = pd.DataFrame(operation["data"])
+                    if operation.get("infer_types", False):
+                        df = ExcelOperations._infer_types(df)
+                    prepared.append((operation, mode, df))
+                else:
+                    prepared.append((operation, None, None))
+            
+            steps = []
+            
+            def apply(target: "_WriteTarget") -> List[Dict[str, Any]]:
+                steps.clear()
+                for index, (operation, mode, df) in enumerate(prepared):
+                    step_started = time.perf_counter()
+                    step = {"index": index, "type": operation["type"]}
+                    try:
+                        step.update(ExcelOperations._apply_batch_step(target, filepath, operation, mode, df))
+                        step["success"] = True
+                    except Exception as e:
+                        step.update({"success": False, "error": str(e)})
+                        raise _BatchStepError(index, e)
+                    finally:
+                        step["elapsed_ms"] = round((time.perf_counter() - step_started) * 1000, 2)
+                        steps.append(step)
+                return steps
+            
+            try:
+                write_coalescer.submit(filepath, apply, ExcelOperations._run_write_batch)
+            except _BatchStepError as e:
+                return {
+                    "success": False,
+                    "error": f"操作{e.index}でエラーが発生したため、すべての変更を取り消しました: {e.cause}",
+                    "filename": filename,
+                    "failed_step": e.index,
+                    "steps": steps,
+                    "saved": False
+                }
+            
+            saved = any(step["type"] in ("write", "append") or step.get("created") for step in steps)
+            return {
+                "success": True,
+                "filename": filename,
+                "path": filepath,
+                "steps": steps,
+                "saved": saved,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+                "message": f"{len(steps)}件の操作を実行しました"
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"一括操作エラー: {str(e)}",
+                "filename": filename,
+                **ExcelOperations._memory_details(e)
+            }
+    
+    @staticmethod
+    def _apply_batch_step(target: "_WriteTarget", filepath: str, operation: Dict[str, Any],
+                          mode: Optional[str], df: Optional[pd.DataFrame]) -> Dict[str, Any]:
+        """一括操作の1ステップを実行"""
+        op_type = operation["type"]
+        
+        if op_type == "list_sheets":
+            sheets = target.wb.sheetnames if target.wb is not None else []
+            return {"sheets": sheets, "count": len(sheets)}
+        
+        sheet_name = operation.get("sheet_name")
+        if not sheet_name:
+            raise ValueError("sheet_nameを指定してください")
+        
+        if op_type == "create_sheet":
+            created = target.wb is None or sheet_name not in target.wb.sheetnames
+            if created:
+                target.sheet(sheet_name)
+            return {"sheet_name": sheet_name, "created": created}
+        
+        if op_type in ("write", "append"):
+            include_header = operation.get("include_header", True)
+            appended, updated = ExcelOperations._apply_write(
+                target, filepath, sheet_name, df,
+                operation.get("start_cell", "A1"), include_header,
+                operation.get("auto_width", "auto"), mode, operation.get("key_columns")
+            )
+            return {
+                "sheet_name": sheet_name,
+                "mode": mode,
+                "rows_written": len(df),
+                "rows_appended": appended,
+                "rows_updated": updated
+            }
+        
+        # read: 同じ一括操作内の変更を反映したメモリ上のワークブックから読み込む
+        has_header = operation.get("has_header", True)
+        range_cells = operation.get("range")
+        cell_range = parse_range(range_cells) if range_cells else CellRange(1, 1, None, None)
+        bounds = {
+            "min_row": cell_range.min_row,
+            "max_row": cell_range.max_row,
+            "min_col": cell_range.min_col,
+            "max_col": cell_range.max_col
+        }
+        rows = ExcelOperations._worksheet_values(target.get_sheet(sheet_name), **bounds)
+        if rows is None:
+            # 数式セルを含む場合は保存済みの計算結果をファイルから読み込む
+            rows = ExcelOperations._read_sheet_rows(filepath, sheet_name, cell_range)
+        df = ExcelOperations._frame_from_rows(rows, has_header)
+        return {
+            "sheet_name": sheet_name,
+            "range": range_cells,
+            **frame_payload(df, operation.get("format", "records"), has_header),
+            "rows": len(df),
+            "columns": len(df.columns),
+            "headers": list(df.columns) if has_header else []
+        }
+    
+    @staticmethod
+    def recalculate_formulas(filename: str) -> Dict[str, Any]:
+        """ワークブックのすべての数式を計算し、計算結果をファイルに書き込む
+        
+        書き込み時は変更の影響を受ける数式だけを自動で再計算するため、通常は不要。
+        Excel以外で作成されたファイルなど、数式セルに計算結果がないファイルを読めるようにする。
+        """
+        try:
+            filepath = get_excel_filepath(filename)
+            
+            if not os.path.exists(filepath):
+                return {
+                    "success": False,
+                    "error": f"ファイル '{filename}' が見つかりません"
+                }
+            if not FORMULA_RECALC_ENABLED:
+                return {
+                    "success": False,
+                    "error": "数式の再計算が無効です（FORMULA_RECALC_ENABLED）"
+                }
+            
+            def apply(target: "_WriteTarget") -> Dict[str, Any]:
+                # すべてのシートを変更扱いにして、参照先が変わった数式を再計算・保存
+                target.modified_sheets.update(target.wb.sheetnames)
+                return {"formulas": {"formulas": 0}}
+            
+            started = time.perf_counter()
+            result = write_coalescer.submit(filepath, apply, ExcelOperations._run_write_batch)
+            stats = result["formulas"]
+            if "skipped" in stats:
+                return {
+                    "success": False,
+                    "error": stats["skipped"],
+                    "filename": filename
+                }
+            return {
+                "success": True,
+                "filename": filename,
+                "formulas": stats,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+                "message": f"{stats['formulas']}個の数式を確認し、{stats.get('evaluated', 0)}個を計算しました"
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"数式再計算エラー: {str(e)}",
+                "filename": filename,
+                **ExcelOperations._memory_details(e)
+            }
+    
+    @staticmethod
+    def import_csv(filename: str, sheet_name: str, source: str, source_format: Optional[str] = None,
+                   has_header: bool = True, delimiter: str = ",", encoding: str = "utf-8",
+                   overwrite: bool = False, auto_width: str = "auto",
+                   progress: Optional[Callable[[float, Optional[float]], None]] = None) -> Dict[str, Any]:
+        """CSV/NDJSONファイルをチャンク単位で読み込み、書き込み専用モードで新規ファイルに出力
+        
+        ファイル全体をメモリに載せないため、大きなファイルも一定のメモリで取り込める
+        """
+        try:
+            filepath = get_excel_filepath(filename)
+            source_path = ExcelOperations._resolve_data_path(source)
+            fmt = ExcelOperations._data_file_format(source_path, source_format)
+            if not os.path.exists(source_path):
+                return {
+                    "success": False,
+                    "error": f"ファイル '{source}' が見つかりません"
+                }
+            
+            total_bytes = os.path.getsize(source_path)
+            with file_locks.write(filepath):
+                if os.path.exists(filepath) and not overwrite:
+                    return {
+                        "success": False,
+                        "error": f"ファイル '{filename}' は既に存在します（置き換える場合はoverwriteを指定）",
+                        "filename": filename
+                    }
+                
+                wb = openpyxl.Workbook(write_only=True)
+                ws = wb.create_sheet(sheet_name)
+                ExcelOperations._ensure_named_styles(wb)
+                styled_row = ExcelOperations._styled_row_factory(ws)
+                
+                rows = 0
+                columns = None
+                ignored_columns = []
+                with open(source_path, "rb") as f:
+                    if fmt == "csv":
+                        reader = pd.read_csv(f, sep=delimiter, encoding=encoding, chunksize=STREAM_CHUNK_ROWS,
+                                             header=0 if has_header else None)
+                    else:
+                        # JSONの値の型をそのまま使う（真偽値・日付らしい文字列を変換しない）
+                        reader = pd.read_json(f, lines=True, encoding=encoding, chunksize=STREAM_CHUNK_ROWS,
+                                              dtype=False, convert_dates=False)
+                    
+                    for chunk in reader:
+                        if columns is None:
+                            # 列幅は行の出力前に設定する必要があるため最初のチャンクから算出
+                            columns = list(chunk.columns)
+                            widths = ExcelOperations._column_widths_from_frame(chunk, has_header, auto_width)
+                            ExcelOperations._apply_column_widths(ws, widths, range(1, len(widths) + 1), merge=False)
+                            if has_header:
+                                ws.append(styled_row(columns, HEADER_STYLE_NAME))
+                        elif list(chunk.columns) != columns:
+                            # NDJSONで後から現れたキーは見出しを追加できないため取り込まない
+                            ignored_columns.extend(c for c in chunk.columns if c not in columns and c not in ignored_columns)
+                            chunk = chunk.reindex(columns=columns)
+                        
+                        for values in ExcelOperations._frame_rows(chunk):
+                            ws.append(styled_row(values, BODY_STYLE_NAME))
+                        rows += len(chunk)
+                        if progress is not None:
+                            progress(min(f.tell(), total_bytes), total_bytes)
+                
+                atomic_save(wb, filepath)
+            
+            return {
+                "success": True,
+                "filename": filename,
+                "sheet_name": sheet_name,
+                "source": source,
+                "format": fmt,
+                "rows_written": rows,
+                "columns": len(columns or []),
+                "ignored_columns": ignored_columns,
+                "message": f"'{source}' から {rows}行を取り込みました"
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"取り込みエラー: {str(e)}",
+                "filename": filename,
+                "source": source
+            }
+    
+    @staticmethod
+    def export_sheet(filename: str, sheet_name: str, destination: str, destination_format: Optional[str] = None,
+                     range_cells: Optional[str] = None, has_header: bool = True, delimiter: str = ",",
+                     encoding: str = "utf-8", overwrite: bool = False,
+                     progress: Optional[Callable[[float, Optional[float]], None]] = None) -> Dict[str, Any]:
+        """シートを1行ずつ読み込み、CSV/NDJSONファイルに書き出し（シート全体をメモリに載せない）"""
+        try:
+            filepath = get_excel_filepath(filename)
+            destination_path = ExcelOperations._resolve_data_path(destination)
+            fmt = ExcelOperations._data_file_format(destination_path, destination_format)
+            
+            if not os.path.exists(filepath):
+                return {
+                    "success": False,
+                    "error": f"ファイル '{filename}' が見つかりません"
+                }
+            if os.path.exists(destination_path) and not overwrite:
+                return {
+                    "success": False,
+                    "error": f"ファイル '{destination}' は既に存在します（置き換える場合はoverwriteを指定）",
+                    "filename": filename
+                }
+            
+            cell_range = parse_range(range_cells) if range_cells else CellRange(1, 1, None, None)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(destination_path), prefix=".~", suffix=".tmp")
+            try:
+                with file_locks.read(filepath), \
+                        os.fdopen(fd, "w", encoding=encoding, newline="") as out:
+                    metrics.count_file_bytes("bytes_read", filepath)
+                    wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+                    try:
+                        ws = ExcelOperations._get_sheet(wb, sheet_name)
+                        last_row = ws.max_row if cell_range.max_row is None else cell_range.max_row
+                        total = max(0, last_row - cell_range.min_row + 1) if last_row else None
+                        rows = ws.iter_rows(values_only=True, min_row=cell_range.min_row,
+                                            max_row=cell_range.max_row, min_col=cell_range.min_col,
+                                            max_col=cell_range.max_col)
+                        written = ExcelOperations._write_data_rows(
+                            out, rows, fmt, has_header, delimiter, cell_range.min_col, progress, total
+                        )
+                    finally:
+                        wb.close()
+                os.replace(temp_path, destination_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            
+            return {
+                "success": True,
+                "filename": filename,
+                "sheet_name": sheet_name,
+                "destination": destination,
+                "format": fmt,
+                "rows_written": written,
+                "size_bytes": os.path.getsize(destination_path),
+                "message": f"{written}行を '{destination}' に書き出しました"
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"書き出しエラー: {str(e)}",
                 "filename": filename,
                 "sheet_name": sheet_name
             }
     
+    @staticmethod
+    def _write_data_rows(out, rows, fmt: str, has_header: bool, delimiter: str, min_col: int,
+                         progress: Optional[Callable[[float, Optional[float]], None]],
+                         total: Optional[int]) -> int:
+        """行イテレータをCSV/NDJSONとして出力し、書き出したデータ行数を返す"""
+        header = next(rows, None) if has_header else None
+        writer = csv.writer(out, delimiter=delimiter) if fmt == "csv" else None
+        keys = None
+        if header is not None:
+            keys = ExcelOperations._header_names(header)
+            if writer is not None:
+                writer.writerow(keys)
+        
+        written = 0
+        scanned = 1 if header is not None else 0
+        pending_empty = 0
+        for row in rows:
+            scanned += 1
+            if all(value is None for value in row):
+                # 末尾の空行は出力しない（途中の空行は次の行を出力する時点で書き出す）
+                pending_empty += 1
+                continue
+            if writer is None and keys is None:
+                # ヘッダーがない場合は列記号をキーにする
+                keys = [get_column_letter(min_col + i) for i in range(len(row))]
+            for _ in range(pending_empty):
+                ExcelOperations._write_data_row(out, writer, keys, [None] * len(row))
+            written += pending_empty + 1
+            pending_empty = 0
+            ExcelOperations._write_data_row(out, writer, keys, row)
+            if progress is not None and written % STREAM_CHUNK_ROWS == 0:
+                progress(scanned, total)
+        
+        if progress is not None:
+            progress(scanned, total or scanned)
+        return written
+    
+    @staticmethod
+    def _write_data_row(out, writer, keys: Optional[List[Any]], row):
+        """1行分をCSV行またはJSON行として出力（日時はISO 8601）"""
+        values = [value.isoformat() if isinstance(value, (datetime.datetime, datetime.date, datetime.time))
+                  else value for value in row]
+        if writer is not None:
+            writer.writerow(values)
+            return
+        out.write(dumps(dict(zip(keys, values)), indent=None))
+        out.write("\n")
+    
+    @staticmethod
+    def _resolve_data_path(name: str) -> str:
+        """excelフォルダ内のデータファイルのパスを取得（フォルダ外は指定不可）"""
+        excel_dir = os.path.realpath(get_excel_directory())
+        path = os.path.realpath(os.path.join(excel_dir, name))
+        if os.path.dirname(path) != excel_dir:
+            raise ValueError("excelフォルダ直下のファイル名を指定してください")
+        return path
+    
+    @staticmethod
+    def _data_file_format(path: str, fmt: Optional[str]) -> str:
+        """データファイルの形式を取得（省略時は拡張子から判定）"""
+        if fmt is None:
+            fmt = DATA_FILE_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+            if fmt is None:
+                raise ValueError(
+                    f"拡張子から形式を判定できません（{', '.join(DATA_FILE_EXTENSIONS)} のいずれか、またはformatを指定）"
+                )
+        if fmt not in DATA_FILE_FORMATS:
+            raise ValueError(f"formatは {', '.join(DATA_FILE_FORMATS)} のいずれかで指定してください")
+        return fmt
+    
     @staticmethod
     def list_sheets(filename: str) -> Dict[str, Any]:
-        """Excelファイル内のシート一覧を取得"""
+        """Excelファイル内のシート一覧と各シートの使用範囲を取得"""
         try:
             filepath = get_excel_filepath(filename)
             
@@ -214,13 +2031,15 @@ class ExcelOperations:
                     "error": f"ファイル '{filename}' が見つかりません"
                 }
             
-            wb = openpyxl.load_workbook(filepath)
-            sheets = wb.sheetnames
+            with file_locks.read(filepath):
+                # workbook.xmlと各シートの<dimension>のみを読む（セルデータは解析しない）
+                info = read_workbook_info(filepath, include_header=False, scan_missing=False)
             
             return {
                 "success": True,
-                "sheets": sheets,
-                "count": len(sheets),
+                "sheets": [sheet["name"] for sheet in info["sheets"]],
+                "details": info["sheets"],
+                "count": len(info["sheets"]),
                 "filename": filename
             }
             
@@ -231,6 +2050,45 @@ class ExcelOperations:
                 "filename": filename
             }
     
+    @staticmethod
+    def get_workbook_info(filename: str, sheet_name: Optional[str] = None,
+                          include_header: bool = True) -> Dict[str, Any]:
+        """シート構成・使用範囲・行数・列数・先頭行・ファイルのプロパティを取得
+        
+        zip内のXMLのみを読むため、ファイルの大きさによらず短時間・一定のメモリで済む
+        """
+        try:
+            filepath = get_excel_filepath(filename)
+            
+            if not os.path.exists(filepath):
+                return {
+                    "success": False,
+                    "error": f"ファイル '{filename}' が見つかりません"
+                }
+            
+            with file_locks.read(filepath):
+                stat = os.stat(filepath)
+                info = read_workbook_info(
+                    filepath, [sheet_name] if sheet_name is not None else None, include_header
+                )
+            
+            return {
+                "success": True,
+                "filename": filename,
+                "size_bytes": stat.st_size,
+                "file_modified": datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+                "properties": info["properties"],
+                "sheets": info["sheets"],
+                "count": len(info["sheets"])
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"ブック情報取得エラー: {str(e)}",
+                "filename": filename
+            }
+    
     @staticmethod
     def list_excel_files() -> Dict[str, Any]:
         """利用可能なExcelファイル一覧を取得"""
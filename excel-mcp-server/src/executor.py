@@ -0,0 +1,179 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from .config import (
+    EXECUTOR_THREAD_WORKERS, EXECUTOR_PROCESS_WORKERS,
+    EXECUTOR_MAX_CONCURRENCY, TOOL_TIMEOUT_SECONDS, READ_MANY_PROCESS_WORKERS
+)
+
+
+class OperationTimeoutError(Exception):
+    """操作がタイムアウトした場合の例外"""
+    pass
+
+
+class OperationExecutor:
+    """同期的なExcel操作をワーカープールで実行し、イベントループを止めない
+
+    同時実行数はセマフォで制限し、超過分は待ち行列に入る。
+    解析中心の読み込みはプロセスプールに振り分けることでGILを回避できる。
+    """
+
+    def __init__(self, thread_workers: int, process_workers: int,
+                 max_concurrency: int, timeout: float, fan_out_workers: int = 0):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.fan_out_workers = fan_out_workers
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._fan_out_pool: Optional[ProcessPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        # 待ち行列・実行状況の統計
+        self.waiting = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def _get_pool(self, cpu_bound: bool):
+        """実行先のプールを取得（初回利用時に生成）"""
+        with self._lock:
+            if cpu_bound and self.process_workers > 0:
+                if self._process_pool is None:
+                    self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+                return self._process_pool
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.thread_workers, thread_name_prefix="excel-op"
+                )
+            return self._thread_pool
+
+    def fan_out_pool(self) -> Optional[ProcessPoolExecutor]:
+        """複数ファイルを並列に解析するプロセスプールを取得（初回利用時に生成、無効ならNone）
+
+        CPUが1つしかない環境では並列化の効果がなく結果の受け渡しの分だけ遅くなるため使わない。
+        ワーカースレッドから呼ばれるため、forkではなくspawnで子プロセスを起動する
+        （他のスレッドが保持中のロックを子プロセスに引き継がないようにするため）
+        """
+        workers = min(self.fan_out_workers, os.cpu_count() or 1)
+        if workers <= 1:
+            return None
+        with self._lock:
+            if self._fan_out_pool is None:
+                self._fan_out_pool = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._fan_out_pool
+
+    async def run(self, func: Callable, *args, cpu_bound: bool = False,
+                  timeout: Optional[float] = None, writes: bool = False, **kwargs) -> Any:
+        """操作をワーカーで実行して結果を待つ
+
+        クライアントのキャンセル（CancelledError）は未開始の操作にも伝播する。
+        実行中のスレッドは中断できないため、同時実行数の枠はタイムアウト・キャンセル後も
+        実際に処理が終わるまで解放しない。
+        writes=True（ファイルを変更する操作）はタイムアウトさせない。応答を返した後も書き込みは
+        続いて確定するため、失敗として返すと再試行で同じ変更が二重に適用される。
+        """
+        self.waiting += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        except asyncio.CancelledError:
+            # 待機中にキャンセルされた操作は実行しない
+            self.cancelled += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            pool = self._get_pool(cpu_bound)
+            call = functools.partial(func, *args, **kwargs)
+            if pool is self._thread_pool:
+                # 呼び出し元のコンテキスト（計測値のラベルなど）をワーカースレッドに引き継ぐ
+                call = functools.partial(contextvars.copy_context().run, call)
+            future = pool.submit(call)
+        except BaseException:
+            self._finish()
+            raise
+        future.add_done_callback(self._finish_callback(asyncio.get_running_loop()))
+
+        limit = None if writes else (timeout or self.timeout)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), limit)
+        except asyncio.TimeoutError:
+            # 開始前なら実行を取り消す（実行中のスレッドは完了を待たずに応答する）
+            future.cancel()
+            self.timeouts += 1
+            raise OperationTimeoutError(f"{limit}秒以内に完了しませんでした")
+        except asyncio.CancelledError:
+            future.cancel()
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    def _finish(self):
+        """実行が終わった操作の枠を解放"""
+        self.running -= 1
+        self._semaphore.release()
+
+    def _finish_callback(self, loop: asyncio.AbstractEventLoop) -> Callable:
+        """ワーカーの処理が終わったらイベントループ上で枠を解放するコールバックを作成"""
+        def callback(_future):
+            try:
+                loop.call_soon_threadsafe(self._finish)
+            except RuntimeError:
+                # イベントループが既に終了している
+                pass
+        return callback
+
+    def metrics(self) -> Dict[str, Any]:
+        """待ち行列の深さ・実行数などの統計を取得"""
+        return {
+            "waiting": self.waiting,
+            "running": self.running,
+            "max_queue_depth": self.max_queue_depth,
+            "max_concurrency": self.max_concurrency,
+            "thread_workers": self.thread_workers,
+            "process_workers": self.process_workers,
+            "fan_out_workers": self.fan_out_workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled
+        }
+
+    def shutdown(self):
+        """ワーカープールを停止"""
+        with self._lock:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=False, cancel_futures=True)
+                self._thread_pool = None
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+            if self._fan_out_pool is not None:
+                self._fan_out_pool.shutdown(wait=False, cancel_futures=True)
+                self._fan_out_pool = None
+
+
+# プロセス共通の実行器
+executor = OperationExecutor(
+    EXECUTOR_THREAD_WORKERS, EXECUTOR_PROCESS_WORKERS,
+    EXECUTOR_MAX_CONCURRENCY, TOOL_TIMEOUT_SECONDS, READ_MANY_PROCESS_WORKERS
+)
@@ -0,0 +1,929 @@
+import datetime
+import math
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from openpyxl.utils.cell import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import to_excel
+
+# セルの位置（シート名, 行, 列）
+Key = Tuple[str, int, int]
+# 参照範囲（シート名, 開始行, 開始列, 終了行, 終了列）  列全体の参照は終了行がNone
+Region = Tuple[str, int, int, Optional[int], int]
+
+# ワークブックキャッシュに数式グラフを登録するキー（シート名の位置は空文字列＝シートの変更で破棄しない）
+GRAPH_CACHE_KEY = ("", "formula_graph")
+# 数式グラフのメモリ使用量の概算（数式セル1個あたり）
+ESTIMATED_BYTES_PER_FORMULA = 600
+
+_ERROR_CODES = ("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A")
+
+
+class ExcelError(Exception):
+    """数式のエラー値（#DIV/0! など）。セルの値として保持し、参照した数式へ伝播する"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+    def __eq__(self, other):
+        return isinstance(other, ExcelError) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+    def __repr__(self):
+        return f"ExcelError({self.code!r})"
+
+
+class UnsupportedFormula(Exception):
+    """この評価器で扱えない数式（未対応の関数・名前付き範囲・配列数式など）"""
+    pass
+
+
+class _UnknownValue(Exception):
+    """参照先の値が計算できない（未対応・循環参照の数式を参照している）"""
+    pass
+
+
+class _Range:
+    """セル範囲の値（行ごとのリスト）"""
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: List[List[Any]]):
+        self.rows = rows
+
+    def values(self) -> Iterator[Any]:
+        for row in self.rows:
+            yield from row
+
+    def vector(self) -> List[Any]:
+        """1行または1列の範囲を1次元のリストとして取得"""
+        if len(self.rows) == 1:
+            return list(self.rows[0])
+        if all(len(row) == 1 for row in self.rows):
+            return [row[0] for row in self.rows]
+        raise ExcelError("#N/A")
+
+
+# ---------------------------------------------------------------------------
+# 字句解析・構文解析
+# ---------------------------------------------------------------------------
+
+_SHEET = r"(?:'(?P<qsheet>(?:[^']|'')+)'|(?P<sheet>[^\W\d][\w.]*))!"
+_STRING_PATTERN = re.compile(r'"((?:[^"]|"")*)"')
+_ERROR_PATTERN = re.compile(r"#(?:NULL!|DIV/0!|VALUE!|REF!|NAME\?|NUM!|N/A)")
+_FUNCTION_PATTERN = re.compile(r"(?:_xlfn\.)?([A-Za-z][A-Za-z0-9_.]*)\s*\(")
+_REF_PATTERN = re.compile(
+    rf"(?:{_SHEET})?\$?(?P<c1>[A-Za-z]{{1,3}})\$?(?P<r1>[0-9]+)"
+    rf"(?::\$?(?P<c2>[A-Za-z]{{1,3}})\$?(?P<r2>[0-9]+))?(?![\w(])"
+)
+_COLUMNS_PATTERN = re.compile(rf"(?:{_SHEET})?\$?(?P<c1>[A-Za-z]{{1,3}}):\$?(?P<c2>[A-Za-z]{{1,3}})(?![\w(])")
+_BOOL_PATTERN = re.compile(r"(TRUE|FALSE)(?![\w(])", re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r"[0-9]+(?:\.[0-9]*)?(?:[eE][+-]?[0-9]+)?|\.[0-9]+(?:[eE][+-]?[0-9]+)?")
+_OPERATORS = ("<>", "<=", ">=", "+", "-", "*", "/", "^", "&", "=", "<", ">", "%", "(", ")", ",")
+_COMPARISONS = ("=", "<>", "<", ">", "<=", ">=")
+
+
+def _tokenize(text: str) -> List[Tuple[str, Any]]:
+    """数式（先頭の=を除く）を字句に分割"""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        if text[pos].isspace():
+            pos += 1
+            continue
+        match = _STRING_PATTERN.match(text, pos)
+        if match:
+            tokens.append(("lit", match.group(1).replace('""', '"')))
+        elif (match := _ERROR_PATTERN.match(text, pos)):
+            tokens.append(("lit", ExcelError(match.group(0))))
+        elif (match := _FUNCTION_PATTERN.match(text, pos)):
+            tokens.append(("func", match.group(1).upper()))
+        elif (match := _REF_PATTERN.match(text, pos)):
+            tokens.append(("ref", match))
+        elif (match := _COLUMNS_PATTERN.match(text, pos)):
+            tokens.append(("columns", match))
+        elif (match := _BOOL_PATTERN.match(text, pos)):
+            tokens.append(("lit", match.group(1).upper() == "TRUE"))
+        elif (match := _NUMBER_PATTERN.match(text, pos)):
+            tokens.append(("lit", float(match.group(0))))
+        else:
+            op = next((op for op in _OPERATORS if text.startswith(op, pos)), None)
+            if op is None:
+                raise UnsupportedFormula(f"解析できない字句: {text[pos:pos + 20]}")
+            tokens.append(("op", op))
+            pos += len(op)
+            continue
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """数式を構文木（タプル）に変換し、参照するセル範囲を集める
+
+    演算子の優先順位はExcelと同じ（比較 < & < +- < */ < ^ < % < 単項の-）。
+    """
+
+    def __init__(self, text: str, sheet: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.sheet = sheet
+        self.regions: List[Region] = []
+
+    def parse(self):
+        node = self._comparison()
+        if self.pos != len(self.tokens):
+            raise UnsupportedFormula("数式の末尾を解析できません")
+        return node
+
+    def _peek(self, *ops) -> bool:
+        if self.pos < len(self.tokens):
+            kind, value = self.tokens[self.pos]
+            return kind == "op" and value in ops
+        return False
+
+    def _take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _binary(self, ops, operand: Callable):
+        node = operand()
+        while self._peek(*ops):
+            _, op = self._take()
+            node = ("bin", op, node, operand())
+        return node
+
+    def _comparison(self):
+        return self._binary(_COMPARISONS, self._concat)
+
+    def _concat(self):
+        return self._binary(("&",), self._additive)
+
+    def _additive(self):
+        return self._binary(("+", "-"), self._term)
+
+    def _term(self):
+        return self._binary(("*", "/"), self._power)
+
+    def _power(self):
+        return self._binary(("^",), self._percent)
+
+    def _percent(self):
+        node = self._unary()
+        while self._peek("%"):
+            self._take()
+            node = ("bin", "/", node, ("lit", 100.0))
+        return node
+
+    def _unary(self):
+        if self._peek("-"):
+            self._take()
+            return ("neg", self._unary())
+        if self._peek("+"):
+            self._take()
+            return self._unary()
+        return self._primary()
+
+    def _sheet_name(self, match) -> str:
+        if match.group("qsheet") is not None:
+            return match.group("qsheet").replace("''", "'")
+        return match.group("sheet") or self.sheet
+
+    def _primary(self):
+        if self.pos >= len(self.tokens):
+            raise UnsupportedFormula("数式が途中で終わっています")
+        kind, value = self._take()
+        if kind == "lit":
+            return ("lit", value)
+        if kind == "ref":
+            sheet = self._sheet_name(value)
+            row1, col1 = int(value.group("r1")), column_index_from_string(value.group("c1").upper())
+            if value.group("c2") is None:
+                self.regions.append((sheet, row1, col1, row1, col1))
+                return ("ref", sheet, row1, col1)
+            row2, col2 = int(value.group("r2")), column_index_from_string(value.group("c2").upper())
+            region = (sheet, min(row1, row2), min(col1, col2), max(row1, row2), max(col1, col2))
+            self.regions.append(region)
+            return ("range",) + region
+        if kind == "columns":
+            sheet = self._sheet_name(value)
+            col1 = column_index_from_string(value.group("c1").upper())
+            col2 = column_index_from_string(value.group("c2").upper())
+            region = (sheet, 1, min(col1, col2), None, max(col1, col2))
+            self.regions.append(region)
+            return ("range",) + region
+        if kind == "func":
+            if value not in _FUNCTIONS:
+                raise UnsupportedFormula(f"未対応の関数: {value}")
+            args = []
+            if not self._peek(")"):
+                while True:
+                    # 省略された引数（例: IF(A1,,1)）
+                    args.append(("blank",) if self._peek(",", ")") else self._comparison())
+                    if not self._peek(","):
+                        break
+                    self._take()
+            if not self._peek(")"):
+                raise UnsupportedFormula("関数の括弧が閉じていません")
+            self._take()
+            return ("call", value, args)
+        if kind == "op" and value == "(":
+            node = self._comparison()
+            if not self._peek(")"):
+                raise UnsupportedFormula("括弧が閉じていません")
+            self._take()
+            return node
+        raise UnsupportedFormula(f"予期しない字句: {value}")
+
+
+def parse_formula(formula: str, sheet: str) -> Tuple[tuple, List[Region]]:
+    """数式（=から始まる文字列）を構文木と参照範囲のリストに変換"""
+    parser = _Parser(formula[1:] if formula.startswith("=") else formula, sheet)
+    return parser.parse(), parser.regions
+
+
+# ---------------------------------------------------------------------------
+# 値の変換・比較
+# ---------------------------------------------------------------------------
+
+def _cell_value(cell) -> Any:
+    """数式以外のセルの値を評価用の値に変換（日時はシリアル値、エラーセルはExcelError）"""
+    value = cell.value
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return ExcelError(value) if cell.data_type == "e" and value in _ERROR_CODES else value
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds() / 86400
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return float(to_excel(value))
+    return str(value)
+
+
+def _check(value: Any) -> Any:
+    if isinstance(value, ExcelError):
+        raise value
+    return value
+
+
+def _scalar(value: Any) -> Any:
+    """1セルの範囲は値に変換（複数セルの範囲は #VALUE!）"""
+    if isinstance(value, _Range):
+        if len(value.rows) == 1 and len(value.rows[0]) == 1:
+            return _check(value.rows[0][0])
+        raise ExcelError("#VALUE!")
+    return _check(value)
+
+
+def _number(value: Any) -> float:
+    value = _scalar(value)
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value.strip())
+    except ValueError:
+        raise ExcelError("#VALUE!")
+
+
+def _text(value: Any) -> str:
+    value = _scalar(value)
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return _number_text(value)
+    return value
+
+
+def _number_text(value: float) -> str:
+    """数値をExcelの表示に近い文字列に変換（有効桁数15桁、整数値は小数点なし）"""
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return format(value, ".15g")
+
+
+def _truthy(value: Any) -> bool:
+    value = _scalar(value)
+    if value is None:
+        return False
+    if isinstance(value, (bool, int, float)):
+        return bool(value)
+    if value.upper() in ("TRUE", "FALSE"):
+        return value.upper() == "TRUE"
+    raise ExcelError("#VALUE!")
+
+
+def _type_rank(value: Any) -> int:
+    # Excelの比較順: 数値 < 文字列 < 論理値
+    if isinstance(value, bool):
+        return 2
+    if isinstance(value, str):
+        return 1
+    return 0
+
+
+def _compare(a: Any, b: Any) -> int:
+    """Excelの規則で比較（文字列は大文字・小文字を区別しない、空セルは相手の型の空値）"""
+    a, b = _scalar(a), _scalar(b)
+    if a is None:
+        a = "" if isinstance(b, str) else False if isinstance(b, bool) else 0.0
+    if b is None:
+        b = "" if isinstance(a, str) else False if isinstance(a, bool) else 0.0
+    rank_a, rank_b = _type_rank(a), _type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a == 1:
+        a, b = a.casefold(), b.casefold()
+    return (a > b) - (a < b)
+
+
+def _lookup_matcher(lookup: Any) -> Callable[[Any], bool]:
+    """完全一致の検索条件（文字列は大文字・小文字を区別せず、* ? のワイルドカードに対応）"""
+    if isinstance(lookup, str):
+        if "*" in lookup or "?" in lookup:
+            pattern = re.compile("".join(
+                ".*" if ch == "*" else "." if ch == "?" else re.escape(ch) for ch in lookup
+            ), re.IGNORECASE | re.DOTALL)
+            return lambda value: isinstance(value, str) and pattern.fullmatch(value) is not None
+        folded = lookup.casefold()
+        return lambda value: isinstance(value, str) and value.casefold() == folded
+    if isinstance(lookup, bool):
+        return lambda value: isinstance(value, bool) and value == lookup
+    return lambda value: isinstance(value, (int, float)) and not isinstance(value, bool) and value == lookup
+
+
+def _approximate_position(values: List[Any], lookup: Any, descending: bool = False) -> Optional[int]:
+    """昇順（descendingなら降順）に並んだ値から、lookup以下（以上）で最も近い値の位置を取得"""
+    found = None
+    rank = _type_rank(lookup)
+    for i, value in enumerate(values):
+        if value is None or isinstance(value, ExcelError) or _type_rank(value) != rank:
+            continue
+        order = _compare(value, lookup)
+        if (order > 0) if not descending else (order < 0):
+            break
+        found = i
+        if order == 0:
+            break
+    return found
+
+
+# ---------------------------------------------------------------------------
+# 関数
+# ---------------------------------------------------------------------------
+
+def _numbers(args: List[Any]) -> Iterator[float]:
+    """集計関数の引数から数値を取り出す（範囲内の文字列・論理値・空セルは無視、直接指定の値は数値に変換）"""
+    for arg in args:
+        if isinstance(arg, _Range):
+            for value in arg.values():
+                _check(value)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield value
+        elif arg is not None:
+            yield _number(arg)
+
+
+def _fn_sum(args):
+    return float(math.fsum(_numbers(args)))
+
+
+def _fn_average(args):
+    values = list(_numbers(args))
+    if not values:
+        raise ExcelError("#DIV/0!")
+    return math.fsum(values) / len(values)
+
+
+def _fn_min(args):
+    return min(_numbers(args), default=0.0)
+
+
+def _fn_max(args):
+    return max(_numbers(args), default=0.0)
+
+
+def _fn_count(args):
+    count = 0
+    for arg in args:
+        if isinstance(arg, _Range):
+            count += sum(1 for value in arg.values()
+                         if isinstance(value, (int, float)) and not isinstance(value, bool))
+        else:
+            try:
+                _number(arg)
+                count += arg is not None
+            except ExcelError:
+                pass
+    return float(count)
+
+
+def _fn_counta(args):
+    count = 0
+    for arg in args:
+        values = arg.values() if isinstance(arg, _Range) else [arg]
+        count += sum(1 for value in values if value is not None and value != "")
+    return float(count)
+
+
+def _fn_round(args):
+    if len(args) != 2:
+        raise ExcelError("#VALUE!")
+    value, digits = _number(args[0]), int(_number(args[1]))
+    # Excelと同じく0.5は0から遠い方へ丸める
+    rounded = Decimal(repr(value)).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP)
+    return float(rounded)
+
+
+def _fn_abs(args):
+    if len(args) != 1:
+        raise ExcelError("#VALUE!")
+    return abs(_number(args[0]))
+
+
+def _logical_values(args) -> List[bool]:
+    values = []
+    for arg in args:
+        if isinstance(arg, _Range):
+            for value in arg.values():
+                _check(value)
+                if isinstance(value, (bool, int, float)):
+                    values.append(bool(value))
+        elif arg is not None:
+            values.append(_truthy(arg))
+    if not values:
+        raise ExcelError("#VALUE!")
+    return values
+
+
+def _fn_and(args):
+    return all(_logical_values(args))
+
+
+def _fn_or(args):
+    return any(_logical_values(args))
+
+
+def _fn_not(args):
+    if len(args) != 1:
+        raise ExcelError("#VALUE!")
+    return not _truthy(args[0])
+
+
+def _table_rows(arg) -> List[List[Any]]:
+    if not isinstance(arg, _Range):
+        raise ExcelError("#VALUE!")
+    return arg.rows
+
+
+def _fn_vlookup(args):
+    if len(args) not in (3, 4):
+        raise ExcelError("#VALUE!")
+    lookup = _scalar(args[0])
+    rows = _table_rows(args[1])
+    col = int(_number(args[2]))
+    approximate = True if len(args) == 3 or args[3] is None else _truthy(args[3])
+    if col < 1:
+        raise ExcelError("#VALUE!")
+    if rows and col > len(rows[0]):
+        raise ExcelError("#REF!")
+    keys = [row[0] if row else None for row in rows]
+    if approximate:
+        position = _approximate_position(keys, lookup)
+    else:
+        matcher = _lookup_matcher(lookup)
+        position = next((i for i, key in enumerate(keys) if matcher(key)), None)
+    if position is None:
+        raise ExcelError("#N/A")
+    return _check(rows[position][col - 1])
+
+
+def _fn_index(args):
+    if len(args) not in (2, 3):
+        raise ExcelError("#VALUE!")
+    rows = _table_rows(args[0])
+    row = int(_number(args[1]))
+    col = int(_number(args[2])) if len(args) == 3 and args[2] is not None else None
+    if col is None:
+        # 1行または1列の範囲は位置を1つだけ指定できる
+        if len(rows) == 1:
+            row, col = 1, row
+        else:
+            col = 1
+    if row == 0 or col == 0:
+        raise UnsupportedFormula("行・列全体を返すINDEX")
+    if row < 0 or col < 0 or row > len(rows) or col > len(rows[0]):
+        raise ExcelError("#REF!")
+    return _check(rows[row - 1][col - 1])
+
+
+def _fn_match(args):
+    if len(args) not in (2, 3):
+        raise ExcelError("#VALUE!")
+    lookup = _scalar(args[0])
+    if not isinstance(args[1], _Range):
+        raise ExcelError("#N/A")
+    values = args[1].vector()
+    match_type = int(_number(args[2])) if len(args) == 3 and args[2] is not None else 1
+    if match_type == 0:
+        matcher = _lookup_matcher(lookup)
+        position = next((i for i, value in enumerate(values) if matcher(value)), None)
+    else:
+        position = _approximate_position(values, lookup, descending=match_type < 0)
+    if position is None:
+        raise ExcelError("#N/A")
+    return float(position + 1)
+
+
+# 関数名 -> 評価済みの引数を受け取る関数（IF・IFERRORは評価器で遅延評価）
+_FUNCTIONS: Dict[str, Optional[Callable[[List[Any]], Any]]] = {
+    "SUM": _fn_sum, "AVERAGE": _fn_average, "MIN": _fn_min, "MAX": _fn_max,
+    "COUNT": _fn_count, "COUNTA": _fn_counta, "ROUND": _fn_round, "ABS": _fn_abs,
+    "AND": _fn_and, "OR": _fn_or, "NOT": _fn_not,
+    "VLOOKUP": _fn_vlookup, "INDEX": _fn_index, "MATCH": _fn_match,
+    "IF": None, "IFERROR": None
+}
+SUPPORTED_FUNCTIONS = tuple(sorted(_FUNCTIONS))
+
+
+# ---------------------------------------------------------------------------
+# 評価
+# ---------------------------------------------------------------------------
+
+def _arithmetic(op: str, a: Any, b: Any) -> float:
+    a, b = _number(a), _number(b)
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "/":
+        if b == 0:
+            raise ExcelError("#DIV/0!")
+        return a / b
+    try:
+        result = math.pow(a, b)
+    except (OverflowError, ValueError, ZeroDivisionError):
+        raise ExcelError("#NUM!")
+    return result
+
+
+class _Sheets:
+    """1回の再計算中に参照するシートと最終行・最終列
+
+    openpyxlのmax_row・max_columnは呼び出しのたびに全セルを走査するため、シートごとに1回だけ求める。
+    """
+
+    def __init__(self, wb):
+        self.worksheets = {ws.title: ws for ws in wb.worksheets}
+        self._bounds: Dict[str, Tuple[int, int]] = {}
+
+    def get(self, sheet: str):
+        return self.worksheets.get(sheet)
+
+    def bounds(self, ws) -> Tuple[int, int]:
+        bounds = self._bounds.get(ws.title)
+        if bounds is None:
+            bounds = self._bounds[ws.title] = (ws.max_row, ws.max_column)
+        return bounds
+
+
+class _Evaluator:
+    """構文木を評価（数式セルの値はグラフの計算結果、それ以外はワークシートの値を参照）"""
+
+    def __init__(self, sheets: _Sheets, values: Dict[Key, Any], formulas: Dict[Key, Any]):
+        self.sheets = sheets
+        self.values = values
+        self.formulas = formulas
+
+    def _worksheet(self, sheet: str):
+        ws = self.sheets.get(sheet)
+        if ws is None:
+            raise ExcelError("#REF!")
+        return ws
+
+    def cell(self, sheet: str, row: int, col: int) -> Any:
+        key = (sheet, row, col)
+        if key in self.formulas:
+            value = self.values.get(key)
+            if value is None:
+                raise _UnknownValue()
+            return value
+        cell = self._worksheet(sheet)._cells.get((row, col))
+        return None if cell is None else _cell_value(cell)
+
+    def range(self, sheet: str, row1: int, col1: int, row2: Optional[int], col2: int) -> _Range:
+        ws = self._worksheet(sheet)
+        # 使用範囲の外は空セルのため、最終行・最終列で打ち切る（列全体の参照も同様）
+        # 列は指定どおりの幅で返す（VLOOKUP・INDEXの列番号が空の列を指す場合のため）
+        max_row, max_col = self.sheets.bounds(ws)
+        last_row = min(row2 if row2 is not None else max_row, max_row)
+        last_col = min(col2, max_col)
+        padding = [None] * (col2 - max(last_col, col1 - 1)) if col2 - col1 < 256 else []
+        if last_row < row1:
+            return _Range([[None] * max(1, len(padding))])
+        return _Range([
+            [self.cell(sheet, row, col) for col in range(col1, last_col + 1)] + padding
+            for row in range(row1, last_row + 1)
+        ])
+
+    def evaluate(self, node) -> Any:
+        kind = node[0]
+        if kind == "lit":
+            return node[1]
+        if kind == "blank":
+            return None
+        if kind == "ref":
+            return self.cell(*node[1:])
+        if kind == "range":
+            return self.range(*node[1:])
+        if kind == "neg":
+            return -_number(self.evaluate(node[1]))
+        if kind == "bin":
+            op, left, right = node[1], self.evaluate(node[2]), self.evaluate(node[3])
+            if op in _COMPARISONS:
+                order = _compare(left, right)
+                return {"=": order == 0, "<>": order != 0, "<": order < 0,
+                        ">": order > 0, "<=": order <= 0, ">=": order >= 0}[op]
+            if op == "&":
+                return _text(left) + _text(right)
+            return _arithmetic(op, left, right)
+        if kind == "call":
+            return self._call(node[1], node[2])
+        raise UnsupportedFormula(f"未対応の構文: {kind}")
+
+    def _argument(self, node) -> Any:
+        # 関数の引数のセル参照は1セルの範囲として渡す（集計関数は参照先の文字列を無視するため）
+        if node[0] == "ref":
+            return _Range([[self.cell(*node[1:])]])
+        return self.evaluate(node)
+
+    def _call(self, name: str, args: List[tuple]) -> Any:
+        if name == "IF":
+            if len(args) not in (2, 3):
+                raise ExcelError("#VALUE!")
+            if _truthy(self.evaluate(args[0])):
+                branch = args[1]
+            elif len(args) == 3:
+                branch = args[2]
+            else:
+                return False
+            value = self.evaluate(branch)
+            return 0.0 if branch[0] == "blank" else value
+        if name == "IFERROR":
+            if len(args) != 2:
+                raise ExcelError("#VALUE!")
+            try:
+                return _scalar(self.evaluate(args[0]))
+            except ExcelError:
+                return self.evaluate(args[1])
+        return _FUNCTIONS[name]([self._argument(arg) for arg in args])
+
+    def result(self, node) -> Any:
+        """数式の結果（空セルの参照は0、複数セルの範囲は未対応）"""
+        try:
+            value = self.evaluate(node)
+            if isinstance(value, _Range):
+                if len(value.rows) != 1 or len(value.rows[0]) != 1:
+                    raise UnsupportedFormula("複数セルを返す数式")
+                value = value.rows[0][0]
+            _check(value)
+        except ExcelError as e:
+            return e
+        except (RecursionError, OverflowError):
+            return ExcelError("#NUM!")
+        if value is None:
+            return 0.0
+        if isinstance(value, float) and not math.isfinite(value):
+            return ExcelError("#NUM!")
+        return value
+
+
+# ---------------------------------------------------------------------------
+# 依存関係グラフ
+# ---------------------------------------------------------------------------
+
+class _Formula:
+    """数式セル1個分（数式の文字列・構文木・参照範囲・参照先の数式セル）"""
+
+    __slots__ = ("text", "node", "regions", "precedents", "error")
+
+    def __init__(self, text: str, sheet: str):
+        self.text = text
+        self.node = None
+        self.regions: List[Region] = []
+        self.precedents: List[Key] = []
+        self.error: Optional[str] = None
+        try:
+            self.node, self.regions = parse_formula(text, sheet)
+        except UnsupportedFormula as e:
+            self.error = str(e)
+        except RecursionError:
+            self.error = "数式のネストが深すぎます"
+
+
+class FormulaGraph:
+    """ワークブック内の数式セルの依存関係グラフと計算結果
+
+    書き込みのたびに変更されたシートの数式だけを読み直し、参照先の値（数式以外のセルは
+    参照範囲ごとのハッシュ、数式セルは計算結果）が変わった数式と、その下流の数式だけを
+    依存順に再計算する。計算結果が変わらなかった数式より下流は再計算しない。
+    未対応の数式・循環参照の数式とそれを参照する数式は値を持たない（None）。
+    """
+
+    def __init__(self):
+        self.formulas: Dict[Key, _Formula] = {}
+        self.values: Dict[Key, Any] = {}
+        self.order: List[Key] = []
+        self.circular: Set[Key] = set()
+        # 参照範囲 -> 前回計算時の値（数式以外のセル）のハッシュ
+        self._digests: Dict[Region, int] = {}
+        self._built = False
+        # 直前の再計算で計算結果が変わった数式を持つシート
+        self.changed_sheets: Set[str] = set()
+
+    def __len__(self):
+        return len(self.formulas)
+
+    def recalculate(self, wb, modified_sheets: Optional[Set[str]] = None,
+                    max_formulas: Optional[int] = None) -> Dict[str, Any]:
+        """変更されたシート（Noneならすべて）を反映して再計算し、統計を返す"""
+        full = not self._built or modified_sheets is None
+        names = set(wb.sheetnames)
+        sheets = names if full else {name for name in modified_sheets if name in names}
+        dirty: Set[Key] = set()
+        structure_changed = False
+
+        # 削除されたシートの数式を除く
+        for key in [key for key in self.formulas if key[0] not in names]:
+            self._remove(key)
+            structure_changed = True
+
+        for sheet in sheets:
+            current = {
+                (sheet, row, col): cell.value
+                for (row, col), cell in wb[sheet]._cells.items()
+                if cell.data_type == "f" and isinstance(cell.value, str)
+            }
+            for key in [key for key in self.formulas if key[0] == sheet and key not in current]:
+                self._remove(key)
+                structure_changed = True
+            for key, text in current.items():
+                formula = self.formulas.get(key)
+                if formula is None or formula.text != text:
+                    self.formulas[key] = _Formula(text, sheet)
+                    self.values.pop(key, None)
+                    dirty.add(key)
+                    structure_changed = True
+        self._built = True
+
+        if max_formulas is not None and len(self.formulas) > max_formulas:
+            raise ValueError(f"数式セルが多すぎるため再計算しません（{len(self.formulas)}個、上限{max_formulas}個）")
+        if structure_changed:
+            self._link()
+
+        # 依存順に、参照先が変わった数式だけを評価
+        worksheets = _Sheets(wb)
+        evaluator = _Evaluator(worksheets, self.values, self.formulas)
+        changed: Set[Key] = set()
+        digests: Dict[Region, int] = {}
+        evaluated = 0
+        for key in self.order:
+            formula = self.formulas[key]
+            needed = full or key in dirty or any(p in changed for p in formula.precedents)
+            if not needed:
+                for region in formula.regions:
+                    if region[0] in sheets or region[0] not in worksheets.worksheets:
+                        digest = digests.get(region)
+                        if digest is None:
+                            digest = digests[region] = self._digest(worksheets, region)
+                        if digest != self._digests.get(region):
+                            needed = True
+                            break
+            if not needed:
+                continue
+            for region in formula.regions:
+                if region not in digests:
+                    digests[region] = self._digest(worksheets, region)
+            evaluated += 1
+            old = self.values.get(key)
+            if formula.node is None:
+                value = None
+            else:
+                try:
+                    value = evaluator.result(formula.node)
+                except (_UnknownValue, UnsupportedFormula):
+                    value = None
+            if value is None:
+                self.values.pop(key, None)
+            else:
+                self.values[key] = value
+            if value != old or type(value) is not type(old):
+                changed.add(key)
+        self._digests.update(digests)
+        self.changed_sheets = {key[0] for key in changed}
+
+        return {
+            "formulas": len(self.formulas),
+            "evaluated": evaluated,
+            "changed": len(changed),
+            "unsupported": sum(1 for key in self.formulas if key not in self.values),
+            "circular": len(self.circular)
+        }
+
+    def _remove(self, key: Key):
+        del self.formulas[key]
+        self.values.pop(key, None)
+
+    def _link(self):
+        """参照範囲内の数式セルを参照先として結び付け、依存順（参照先が先）に並べる"""
+        by_sheet: Dict[str, List[Key]] = {}
+        for key in self.formulas:
+            by_sheet.setdefault(key[0], []).append(key)
+        for formula in self.formulas.values():
+            precedents = []
+            for sheet, row1, col1, row2, col2 in formula.regions:
+                candidates = by_sheet.get(sheet, ())
+                area = None if row2 is None else (row2 - row1 + 1) * (col2 - col1 + 1)
+                if area is not None and area <= len(candidates):
+                    precedents.extend(
+                        (sheet, row, col)
+                        for row in range(row1, row2 + 1) for col in range(col1, col2 + 1)
+                        if (sheet, row, col) in self.formulas
+                    )
+                else:
+                    precedents.extend(
+                        key for key in candidates
+                        if row1 <= key[1] <= (row2 if row2 is not None else key[1]) and col1 <= key[2] <= col2
+                    )
+            formula.precedents = list(dict.fromkeys(precedents))
+
+        # トポロジカルソート（順序を決められない数式は循環参照）
+        dependents: Dict[Key, List[Key]] = {}
+        pending = {}
+        for key, formula in self.formulas.items():
+            pending[key] = len(formula.precedents)
+            for precedent in formula.precedents:
+                dependents.setdefault(precedent, []).append(key)
+        ready = [key for key, count in pending.items() if count == 0]
+        order = []
+        while ready:
+            key = ready.pop()
+            order.append(key)
+            for dependent in dependents.get(key, ()):
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        self.circular = {key for key, count in pending.items() if count > 0}
+        for key in self.circular:
+            self.values.pop(key, None)
+        self.order = order
+
+    @staticmethod
+    def _digest(worksheets: _Sheets, region: Region) -> int:
+        """参照範囲内の数式以外のセルの値のハッシュ"""
+        sheet, row1, col1, row2, col2 = region
+        ws = worksheets.get(sheet)
+        if ws is None:
+            return 0
+        max_row, max_col = worksheets.bounds(ws)
+        last_row = min(row2 if row2 is not None else max_row, max_row)
+        cells = ws._cells
+        values = []
+        for row in range(row1, last_row + 1):
+            for col in range(col1, min(col2, max_col) + 1):
+                cell = cells.get((row, col))
+                if cell is not None and cell.data_type != "f" and cell.value is not None:
+                    values.append((row, col, cell.value))
+        try:
+            return hash(tuple(values))
+        except TypeError:
+            # 書式付きテキスト（CellRichText）などハッシュ化できない値
+            return hash(repr(values))
+
+    def sheet_values(self) -> Dict[str, Dict[str, Tuple[str, str]]]:
+        """シートごとの数式セルの計算結果を {セル番地: (セルの型, 値の文字列)} で取得（保存時に書き込む形式）"""
+        result: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        for (sheet, row, col), value in self.values.items():
+            if isinstance(value, ExcelError):
+                encoded = ("e", value.code)
+            elif isinstance(value, bool):
+                encoded = ("b", "1" if value else "0")
+            elif isinstance(value, (int, float)):
+                encoded = ("n", _number_text(value) if float(value).is_integer() else repr(float(value)))
+            else:
+                encoded = ("str", str(value))
+            result.setdefault(sheet, {})[f"{get_column_letter(col)}{row}"] = encoded
+        return result
+
+    def estimated_bytes(self) -> int:
+        return len(self.formulas) * ESTIMATED_BYTES_PER_FORMULA
@@ -0,0 +1,114 @@
+import contextlib
+from typing import Any, Dict, Optional
+from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from mcp.server.transport_security import TransportSecuritySettings
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from .config import (
+    HTTP_HOST, HTTP_PORT, HTTP_MAX_SESSIONS, HTTP_SESSION_IDLE_SECONDS, HTTP_KEEP_ALIVE_SECONDS
+)
+from .executor import executor
+from .cache import workbook_cache
+from .memory import memory_governor
+from .serialization import dumps
+from .server import server, active_sessions, start_background, stop_background, start_prewarm
+
+# ローカルで待ち受ける場合に受け付けるHost・Originヘッダー（DNSリバインディング対策）
+_LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+def _security_settings(host: str) -> Optional[TransportSecuritySettings]:
+    if host not in _LOCAL_HOSTS:
+        return None
+    return TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=["127.0.0.1:*", "localhost:*", "[::1]:*"],
+        allowed_origins=["http://127.0.0.1:*", "http://localhost:*", "http://[::1]:*"]
+    )
+
+
+class _StreamableHTTPApp:
+    """Streamable HTTPのリクエストをセッション管理に渡すASGIアプリ"""
+
+    def __init__(self, session_manager: StreamableHTTPSessionManager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope, receive, send):
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+def create_app(host: str = HTTP_HOST) -> Starlette:
+    """複数のクライアントが1つのサーバー（ワークブックキャッシュ・ワーカー）を共有するHTTPアプリを作成
+
+    /mcp       Streamable HTTP（推奨）
+    /sse       SSE（旧方式のクライアント用、メッセージは /messages/ にPOST）
+    /health    稼働状況（セッション数・実行中の操作数・キャッシュ）
+    """
+    security = _security_settings(host)
+    session_manager = StreamableHTTPSessionManager(
+        app=server,
+        security_settings=security,
+        session_idle_timeout=HTTP_SESSION_IDLE_SECONDS,
+        max_sessions=HTTP_MAX_SESSIONS
+    )
+    sse = SseServerTransport("/messages/", security_settings=security)
+    sse_connections = {"open": 0}
+
+    async def handle_sse(request: Request) -> Response:
+        if sse_connections["open"] >= HTTP_MAX_SESSIONS:
+            return Response("Too many open sessions", status_code=503)
+        sse_connections["open"] += 1
+        try:
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, server.create_initialization_options())
+        finally:
+            sse_connections["open"] -= 1
+        return Response()
+
+    async def health(request: Request) -> Response:
+        status: Dict[str, Any] = {
+            "status": "ok",
+            "sessions": active_sessions(),
+            "sse_connections": sse_connections["open"],
+            "max_sessions": HTTP_MAX_SESSIONS,
+            "executor": executor.metrics(),
+            "workbook_cache": workbook_cache.stats(),
+            "memory": memory_governor.stats()
+        }
+        return Response(dumps(status), media_type="application/json")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        # 長時間動かすサーバーのため、最初の接続を待たずに事前読み込みを開始
+        start_prewarm()
+        start_background()
+        try:
+            async with session_manager.run():
+                yield
+        finally:
+            stop_background()
+
+    return Starlette(
+        routes=[
+            Route("/mcp", endpoint=_StreamableHTTPApp(session_manager)),
+            Route("/sse", endpoint=handle_sse, methods=["GET"]),
+            Mount("/messages/", app=sse.handle_post_message),
+            Route("/health", endpoint=health, methods=["GET"])
+        ],
+        lifespan=lifespan
+    )
+
+
+def run_http(host: str = HTTP_HOST, port: int = HTTP_PORT):
+    """HTTPで待ち受けてサーバーを実行"""
+    import uvicorn
+    uvicorn.run(
+        create_app(host),
+        host=host,
+        port=port,
+        timeout_keep_alive=HTTP_KEEP_ALIVE_SECONDS,
+        log_level="warning"
+    )
@@ -0,0 +1,243 @@
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .config import LOCK_DIR_NAME, WRITE_COALESCE_WINDOW_MS, WRITE_SHARED_STRINGS
+from .metrics import metrics
+from .pagination import row_stream_registry
+from .workbook_xml import rewrite_workbook
+
+try:
+    import fcntl
+except ImportError:  # Windowsではプロセス間ロックなし（プロセス内ロックのみ）
+    fcntl = None
+
+
+class ReadWriteLock:
+    """プロセス内の読み書きロック（読み込みは並行、書き込みは排他、書き込み優先）"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class FileLockManager:
+    """ファイル単位の読み書きロック
+
+    プロセス内はReadWriteLock、プロセス間は excel/.locks/ 配下のロックファイルに
+    flock（共有/排他）をかけて、複数のサーバープロセスからの同時書き込みを防ぐ。
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, ReadWriteLock] = {}
+        self._guard = threading.Lock()
+
+    def _get_lock(self, key: str) -> ReadWriteLock:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = ReadWriteLock()
+            return lock
+
+    @staticmethod
+    def _lock_file_path(filepath: str) -> str:
+        lock_dir = os.path.join(os.path.dirname(filepath), LOCK_DIR_NAME)
+        os.makedirs(lock_dir, exist_ok=True)
+        return os.path.join(lock_dir, os.path.basename(filepath) + ".lock")
+
+    @contextmanager
+    def _process_lock(self, filepath: str, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self._lock_file_path(filepath), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)  # クローズ時にflockも解放される
+
+    @contextmanager
+    def read(self, filepath: str):
+        """共有ロック（読み込み用）"""
+        key = os.path.realpath(filepath)
+        lock = self._get_lock(key)
+        lock.acquire_read()
+        try:
+            with self._process_lock(key, exclusive=False):
+                yield
+        finally:
+            lock.release_read()
+
+    @contextmanager
+    def write(self, filepath: str):
+        """排他ロック（書き込み用）"""
+        key = os.path.realpath(filepath)
+        lock = self._get_lock(key)
+        lock.acquire_write()
+        try:
+            with self._process_lock(key, exclusive=True):
+                yield
+        finally:
+            lock.release_write()
+
+
+@metrics.timed("save")
+def atomic_save(wb, filepath: str, formula_values: Optional[Dict[str, Dict[str, Tuple[str, str]]]] = None):
+    """一時ファイルに保存してから置き換え（保存途中のクラッシュで壊れたファイルを残さない）
+    
+    WRITE_SHARED_STRINGS が有効なら、openpyxlの出力を共有文字列形式に変換してから置き換える
+    formula_values（シートごとの数式セルの計算結果）を指定すると、数式セルに計算結果を書き込む
+    """
+    directory = os.path.dirname(filepath)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".~", suffix=".xlsx.tmp")
+    raw_path = None
+    try:
+        if WRITE_SHARED_STRINGS or formula_values:
+            raw_fd, raw_path = tempfile.mkstemp(dir=directory, prefix=".~", suffix=".xlsx.raw")
+            with os.fdopen(raw_fd, "wb") as raw:
+                wb.save(raw)
+        with os.fdopen(fd, "wb") as f:
+            if raw_path is not None:
+                rewrite_workbook(raw_path, f, shared_strings=WRITE_SHARED_STRINGS, formula_values=formula_values)
+            else:
+                wb.save(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if raw_path is not None and WRITE_SHARED_STRINGS:
+            # 共有文字列への変換で減ったバイト数
+            metrics.count("shared_strings_saved_bytes", os.path.getsize(raw_path) - os.path.getsize(temp_path))
+        # mkstempは0600で作成するため、既存ファイル（なければumask準拠）の権限に合わせる
+        if os.path.exists(filepath):
+            os.chmod(temp_path, os.stat(filepath).st_mode & 0o777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        # ページ読み込み用に開いたままのファイルを閉じてから置き換える
+        row_stream_registry.close_file(filepath)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        if raw_path is not None and os.path.exists(raw_path):
+            os.remove(raw_path)
+    metrics.count_file_bytes("bytes_written", filepath)
+
+
+class PendingWrite:
+    """書き込み待ちの操作（applyがワークブックを変更し結果を返す）"""
+
+    def __init__(self, apply: Callable[[Any], Any]):
+        self.apply = apply
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class WriteCoalescer:
+    """同一ファイルへの書き込みをまとめ、1回の読み込みと1回の保存で処理する
+
+    最初に到着した書き込みが代表となり、排他ロックを取得して待ち行列の
+    操作をまとめて適用・保存する。後続の書き込みは結果を待つだけになる。
+    """
+
+    def __init__(self, file_locks: FileLockManager, window_seconds: float):
+        self.file_locks = file_locks
+        self.window_seconds = window_seconds
+        self._queues: Dict[str, List[PendingWrite]] = {}
+        self._leaders: set = set()
+        self._guard = threading.Lock()
+        self.batches = 0
+        self.coalesced = 0
+
+    def submit(self, filepath: str, apply: Callable[[Any], Any],
+               run_batch: Callable[[str, List[PendingWrite]], None]) -> Any:
+        """書き込みを登録し、保存完了まで待って結果を返す
+
+        run_batch(filepath, batch) は排他ロック下で呼ばれ、各操作の result / error を設定する。
+        """
+        key = os.path.realpath(filepath)
+        pending = PendingWrite(apply)
+        with self._guard:
+            self._queues.setdefault(key, []).append(pending)
+            is_leader = key not in self._leaders
+            if is_leader:
+                self._leaders.add(key)
+
+        if is_leader:
+            self._lead(key, filepath, run_batch)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _lead(self, key: str, filepath: str, run_batch):
+        try:
+            while True:
+                if self.window_seconds:
+                    # 短時間待って同時に届いた書き込みをまとめる
+                    time.sleep(self.window_seconds)
+                with self._guard:
+                    batch = self._queues.pop(key, [])
+                    if not batch:
+                        self._leaders.discard(key)
+                        return
+                self.batches += 1
+                self.coalesced += len(batch) - 1
+                try:
+                    with self.file_locks.write(filepath):
+                        run_batch(filepath, batch)
+                except BaseException as e:
+                    for pending in batch:
+                        if pending.result is None and pending.error is None:
+                            pending.error = e
+                finally:
+                    for pending in batch:
+                        pending.done.set()
+        except BaseException:
+            with self._guard:
+                self._leaders.discard(key)
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        """まとめ書き込みの統計を取得"""
+        return {"batches": self.batches, "coalesced_writes": self.coalesced}
+
+
+# プロセス共通のロック管理・書き込み集約
+file_locks = FileLockManager()
+write_coalescer = WriteCoalescer(file_locks, WRITE_COALESCE_WINDOW_MS / 1000)
@@ -0,0 +1,228 @@
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from .config import (
+    MAX_FILE_SIZE_MB, ESTIMATED_BYTES_PER_CELL, ESTIMATED_FRAME_BYTES_PER_CELL, ESTIMATED_XML_BYTES_PER_CELL,
+    MEMORY_OPERATION_BUDGET_MB, MEMORY_SOFT_LIMIT_MB, MEMORY_HARD_LIMIT_MB, MEMORY_QUEUE_TIMEOUT_SECONDS
+)
+from .cache import workbook_cache
+from .metrics import metrics
+from .workbook_xml import estimate_sheet_cells
+
+_MB = 1024 * 1024
+
+# 読み込み方法ごとのセル1個あたりの推定メモリ使用量
+#   frame:    シート全体をDataFrameに変換
+#   rows:     読み取り専用モードで指定範囲の行を取得
+#   workbook: 編集用にワークブック全体をopenpyxlで読み込み
+_BYTES_PER_CELL = {
+    "frame": ESTIMATED_FRAME_BYTES_PER_CELL,
+    "rows": ESTIMATED_FRAME_BYTES_PER_CELL,
+    "workbook": ESTIMATED_BYTES_PER_CELL
+}
+
+
+class MemoryLimitError(Exception):
+    """推定メモリ使用量が上限を超えるため操作を受け付けない場合の例外（decisionに判断内容）"""
+
+    def __init__(self, message: str, decision: Dict[str, Any]):
+        super().__init__(message)
+        self.decision = decision
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / _MB, 1) if value is not None else None
+
+
+class MemoryGovernor:
+    """操作ごとのメモリ使用量を読み込み前に見積もり、受け付け・縮退・拒否を判断する
+
+    見積もりはファイルサイズと各シートの使用範囲（<dimension>、なければシートXMLのサイズ）から
+    求めるため、セルデータは読まない。上限を超える読み込みは呼び出し側で一定のメモリで済む方法
+    （ページ単位の読み込み）に切り替え、切り替えられない編集は拒否する。
+    プロセスのRSSがソフト上限を超えている間は、ワークブックキャッシュを縮小したうえで、
+    実行中の他の読み込みが終わるまで新しい読み込みを待たせる。
+    """
+
+    def __init__(self, max_file_mb: float, budget_mb: float, soft_limit_mb: float,
+                 hard_limit_mb: float, queue_timeout: float):
+        self.max_file_bytes = int(max_file_mb * _MB)
+        self.budget_bytes = int(budget_mb * _MB)
+        self.soft_limit_bytes = int(soft_limit_mb * _MB)
+        self.hard_limit_bytes = int(hard_limit_mb * _MB)
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition(threading.Lock())
+        # 実行中の読み込みの推定使用量の合計と件数
+        self._reserved = 0
+        self._active = 0
+        # 判断・待機の統計
+        self.allowed = 0
+        self.downgraded = 0
+        self.rejected = 0
+        self.queued = 0
+        self.waiting = 0
+        self.queue_timeouts = 0
+        self.cache_shrinks = 0
+
+    @staticmethod
+    def rss_bytes() -> Optional[int]:
+        """プロセスの現在の常駐メモリ（取得できない環境ではNone）"""
+        return metrics.process_memory()["rss_bytes"]
+
+    def assess(self, filepath: str, sheet_name: Optional[str] = None, load: str = "frame",
+               max_cells: Optional[int] = None) -> Dict[str, Any]:
+        """読み込み前に推定メモリ使用量を求め、上限内か判断する
+
+        sheet_name: 対象シート（Noneならワークブック全体）
+        load: 読み込み方法（frame / rows / workbook）。rowsは必要な行だけを読むためファイルサイズの上限を適用しない
+        max_cells: 読み込むセル数の上限（範囲指定の読み込みなど）
+        戻り値のactionは上限内なら allow、超えていれば over_budget（縮退・拒否は呼び出し側で決める）
+        """
+        file_bytes = os.path.getsize(filepath)
+        cells = sum(estimate_sheet_cells(
+            filepath, [sheet_name] if sheet_name is not None else None, ESTIMATED_XML_BYTES_PER_CELL
+        ).values())
+        if max_cells is not None:
+            cells = min(cells, max_cells)
+        estimated = cells * _BYTES_PER_CELL[load]
+        rss = self.rss_bytes()
+
+        reasons = []
+        if load != "rows" and file_bytes > self.max_file_bytes:
+            reasons.append(f"ファイルサイズ {_mb(file_bytes)}MB が上限 {_mb(self.max_file_bytes)}MB を超えています")
+        if estimated > self.budget_bytes:
+            reasons.append(f"推定メモリ使用量 {_mb(estimated)}MB が1操作の上限 {_mb(self.budget_bytes)}MB を超えています")
+        if rss is not None and rss + estimated > self.hard_limit_bytes:
+            reasons.append(
+                f"現在の使用量 {_mb(rss)}MB と推定使用量 {_mb(estimated)}MB の合計が上限 {_mb(self.hard_limit_bytes)}MB を超えています"
+            )
+        return {
+            "action": "over_budget" if reasons else "allow",
+            "load": load,
+            "file_mb": _mb(file_bytes),
+            "estimated_cells": cells,
+            "estimated_mb": _mb(estimated),
+            "estimated_bytes": estimated,
+            "rss_mb": _mb(rss),
+            "reasons": reasons
+        }
+
+    def downgrade(self, decision: Dict[str, Any], mode: str) -> Dict[str, Any]:
+        """上限を超える読み込みを一定のメモリで済む方法（mode）に切り替えたことを記録"""
+        with self._cond:
+            self.downgraded += 1
+        return self.public(dict(decision, action="downgrade", mode=mode))
+
+    def reject(self, decision: Dict[str, Any]) -> MemoryLimitError:
+        """上限を超える操作を拒否する例外を作成"""
+        with self._cond:
+            self.rejected += 1
+        decision = self.public(dict(decision, action="reject"))
+        return MemoryLimitError("メモリ使用量の上限を超えるため実行しません: " + "、".join(decision["reasons"]), decision)
+
+    def require(self, filepath: str, sheet_name: Optional[str] = None, load: str = "workbook") -> Dict[str, Any]:
+        """縮退できない読み込み（編集など）が上限内か確認し、超えていればMemoryLimitErrorを送出"""
+        decision = self.assess(filepath, sheet_name, load)
+        if decision["action"] != "allow":
+            raise self.reject(decision)
+        return decision
+
+    @staticmethod
+    def public(decision: Dict[str, Any]) -> Dict[str, Any]:
+        """応答に含める判断内容（内部用の値を除く）"""
+        return {key: value for key, value in decision.items() if key != "estimated_bytes"}
+
+    @contextmanager
+    def reserve(self, estimated_bytes: int) -> Iterator[Dict[str, Any]]:
+        """推定使用量を確保して読み込みを実行（RSSがソフト上限を超えていれば空くまで待つ）
+
+        待った時間は yield する辞書の queued_ms に入る。待っても空かなければMemoryLimitErrorを送出。
+        """
+        info = {"queued_ms": 0.0}
+        self._wait_for_room(estimated_bytes, info)
+        with self._cond:
+            self._reserved += estimated_bytes
+            self._active += 1
+            self.allowed += 1
+        try:
+            yield info
+        finally:
+            with self._cond:
+                self._reserved -= estimated_bytes
+                self._active -= 1
+                self._cond.notify_all()
+
+    def _over_soft_limit(self, estimated_bytes: int) -> bool:
+        rss = self.rss_bytes()
+        return rss is not None and rss + estimated_bytes > self.soft_limit_bytes
+
+    def _wait_for_room(self, estimated_bytes: int, info: Dict[str, Any]):
+        if not self._over_soft_limit(estimated_bytes):
+            return
+        # 先にキャッシュを縮小（使われていないワークブックから解放）
+        cache_bytes = workbook_cache.stats()["current_bytes"]
+        if cache_bytes and workbook_cache.shrink(cache_bytes // 2):
+            gc.collect()
+            with self._cond:
+                self.cache_shrinks += 1
+
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        with self._cond:
+            queued = False
+            # 実行中の読み込みがなければ待っても空かないため、そのまま実行する
+            while self._active and self._over_soft_limit(self._reserved + estimated_bytes):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.queue_timeouts += 1
+                    self.rejected += 1
+                    raise MemoryLimitError(
+                        f"メモリ使用量がソフト上限 {_mb(self.soft_limit_bytes)}MB を超えた状態が"
+                        f"{self.queue_timeout}秒続いたため実行しません",
+                        {
+                            "action": "reject",
+                            "rss_mb": _mb(self.rss_bytes()),
+                            "queued_ms": round((time.monotonic() - started) * 1000, 1)
+                        }
+                    )
+                if not queued:
+                    queued = True
+                    self.queued += 1
+                self.waiting += 1
+                try:
+                    # 実行中の読み込みの終了を待つ（GCでRSSが減る場合もあるため定期的に確認）
+                    self._cond.wait(min(remaining, 0.1))
+                finally:
+                    self.waiting -= 1
+            if queued:
+                info["queued_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """現在の使用量・上限・判断の統計を取得"""
+        with self._cond:
+            return {
+                "rss_bytes": self.rss_bytes(),
+                "reserved_bytes": self._reserved,
+                "active": self._active,
+                "waiting": self.waiting,
+                "soft_limit_bytes": self.soft_limit_bytes,
+                "hard_limit_bytes": self.hard_limit_bytes,
+                "budget_bytes": self.budget_bytes,
+                "max_file_bytes": self.max_file_bytes,
+                "allowed": self.allowed,
+                "downgraded": self.downgraded,
+                "rejected": self.rejected,
+                "queued": self.queued,
+                "queue_timeouts": self.queue_timeouts,
+                "cache_shrinks": self.cache_shrinks
+            }
+
+
+# プロセス共通のメモリ管理
+memory_governor = MemoryGovernor(
+    MAX_FILE_SIZE_MB, MEMORY_OPERATION_BUDGET_MB, MEMORY_SOFT_LIMIT_MB,
+    MEMORY_HARD_LIMIT_MB, MEMORY_QUEUE_TIMEOUT_SECONDS
+)
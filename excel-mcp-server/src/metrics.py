@@ -0,0 +1,282 @@
+import contextvars
+import functools
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+from .config import METRICS_ENABLED, METRICS_PROMETHEUS_FILE, METRICS_DUMP_INTERVAL_SECONDS
+
+# ヒストグラムの区切り（秒）
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 実行中のツール名（ワーカースレッド内の計測値にラベルとして付ける）
+_current_tool: contextvars.ContextVar[str] = contextvars.ContextVar("excel_mcp_tool", default="-")
+
+_NULL_SPAN = nullcontext()
+
+
+class Histogram:
+    """処理時間の分布（件数・合計・最大・区切りごとの件数）"""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """区切りから分位点を概算（該当する区切りの上限値、最後の区切りは最大値）"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, bound in enumerate(BUCKETS):
+            seen += self.buckets[i]
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        p50 = self.quantile(0.5)
+        p95 = self.quantile(0.95)
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else None,
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "max_ms": round(self.max * 1000, 2)
+        }
+
+
+class Metrics:
+    """ツール単位・処理段階（span）単位の計測値を集計する
+
+    span: load（ワークブック読み込み）, parse（セル値の解析）, convert（DataFrame変換）,
+    style（書式付きセルの書き込み）, autosize（列幅計算）, save（保存）, serialise（JSON化）
+    無効時は span() が共有のダミーを返し、timed() は関数をそのまま返すため負荷はほぼない。
+    プロセスプールで実行した操作の計測値は集計されない。
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Histogram] = {}
+        self._spans: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._errors: Dict[str, int] = {}
+        self._last_dump = 0.0
+        self.started_at = time.time()
+
+    def span(self, name: str):
+        """処理段階の所要時間を計測するコンテキストマネージャ"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_span(name, time.perf_counter() - start)
+
+    def timed(self, name: str):
+        """関数全体を1つのspanとして計測するデコレータ（無効時は何もしない）"""
+        def decorator(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe_span(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def observe_span(self, name: str, seconds: float, tool: Optional[str] = None):
+        if not self.enabled:
+            return
+        key = (tool or _current_tool.get(), name)
+        with self._lock:
+            histogram = self._spans.get(key)
+            if histogram is None:
+                histogram = self._spans[key] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, value: float = 1, tool: Optional[str] = None):
+        """累積値（読み書きしたバイト数・行数など）を加算"""
+        if not self.enabled:
+            return
+        key = (tool or _current_tool.get(), name)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def count_file_bytes(self, name: str, filepath: str):
+        """ファイルサイズを累積値に加算（bytes_read / bytes_written）"""
+        if self.enabled:
+            try:
+                self.count(name, os.path.getsize(filepath))
+            except OSError:
+                pass
+
+    @contextmanager
+    def label(self, tool: str):
+        """ブロック内の計測値にツール名のラベルを付ける（ワーカースレッドにはexecutorが引き継ぐ）"""
+        token = _current_tool.set(tool)
+        try:
+            yield
+        finally:
+            _current_tool.reset(token)
+
+    def record_tool(self, tool: str, seconds: float, result: Any = None, failed: bool = False):
+        """ツール1回分の所要時間と処理した行数・セル数を記録"""
+        if not self.enabled:
+            return
+        if isinstance(result, dict):
+            failed = failed or result.get("success") is False
+            rows = result.get("rows", result.get("rows_written"))
+            columns = result.get("columns")
+            if isinstance(rows, int):
+                self.count("rows_processed", rows, tool)
+                if isinstance(columns, int):
+                    self.count("cells_processed", rows * columns, tool)
+        with self._lock:
+            histogram = self._tools.get(tool)
+            if histogram is None:
+                histogram = self._tools[tool] = Histogram()
+            histogram.observe(seconds)
+            if failed:
+                self._errors[tool] = self._errors.get(tool, 0) + 1
+        self._maybe_dump()
+
+    @staticmethod
+    def process_memory() -> Dict[str, Optional[int]]:
+        """プロセスの現在・最大の常駐メモリ（Linux以外は最大値のみ）"""
+        rss = peak = None
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss = int(line.split()[1]) * 1024
+                    elif line.startswith("VmHWM:"):
+                        peak = int(line.split()[1]) * 1024
+        except OSError:
+            try:
+                import resource
+                peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            except ImportError:
+                pass
+        return {"rss_bytes": rss, "peak_rss_bytes": peak}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """集計結果を取得"""
+        with self._lock:
+            tools = {
+                name: dict(histogram.summary(), errors=self._errors.get(name, 0))
+                for name, histogram in sorted(self._tools.items())
+            }
+            spans: Dict[str, Dict[str, Any]] = {}
+            for (tool, name), histogram in sorted(self._spans.items()):
+                spans.setdefault(tool, {})[name] = histogram.summary()
+            counters: Dict[str, Dict[str, float]] = {}
+            for (tool, name), value in sorted(self._counters.items()):
+                counters.setdefault(tool, {})[name] = value
+        return {
+            "enabled": self.enabled,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "tools": tools,
+            "spans": spans,
+            "counters": counters,
+            "process": self.process_memory()
+        }
+
+    def reset(self):
+        """計測値をすべて消去"""
+        with self._lock:
+            self._tools.clear()
+            self._spans.clear()
+            self._counters.clear()
+            self._errors.clear()
+            self.started_at = time.time()
+
+    def prometheus_text(self, gauges: Optional[Dict[str, Any]] = None) -> str:
+        """Prometheusのテキスト形式で出力（gaugesは追加の数値 {名前: 値}）"""
+        lines: List[str] = []
+
+        def histogram_lines(metric: str, labels: str, histogram: Histogram):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum{{{labels}}} {histogram.total}")
+            lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+
+        with self._lock:
+            lines.append("# TYPE excel_mcp_tool_seconds histogram")
+            for tool, histogram in sorted(self._tools.items()):
+                histogram_lines("excel_mcp_tool_seconds", f'tool="{tool}"', histogram)
+            lines.append("# TYPE excel_mcp_tool_errors_total counter")
+            for tool, count in sorted(self._errors.items()):
+                lines.append(f'excel_mcp_tool_errors_total{{tool="{tool}"}} {count}')
+            lines.append("# TYPE excel_mcp_span_seconds histogram")
+            for (tool, name), histogram in sorted(self._spans.items()):
+                histogram_lines("excel_mcp_span_seconds", f'tool="{tool}",span="{name}"', histogram)
+            for (tool, name), value in sorted(self._counters.items()):
+                lines.append(f'excel_mcp_{name}_total{{tool="{tool}"}} {value}')
+
+        memory = self.process_memory()
+        for name, value in dict(memory, **(gauges or {})).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"excel_mcp_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, path: str, gauges: Optional[Dict[str, Any]] = None):
+        """Prometheus形式のテキストファイルに書き出し（textfile collector向けに一時ファイル経由で置き換え）"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".~", suffix=".prom.tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text(gauges))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _maybe_dump(self):
+        """設定されていれば一定間隔でPrometheus形式のファイルを更新"""
+        if not METRICS_PROMETHEUS_FILE:
+            return
+        now = time.monotonic()
+        if now - self._last_dump < METRICS_DUMP_INTERVAL_SECONDS:
+            return
+        self._last_dump = now
+        try:
+            self.dump_prometheus(METRICS_PROMETHEUS_FILE)
+        except OSError:
+            pass
+
+
+# プロセス共通の計測値
+metrics = Metrics(METRICS_ENABLED)
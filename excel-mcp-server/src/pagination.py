@@ -0,0 +1,146 @@
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+from .cache import file_signature
+from .config import PAGINATION_MAX_OPEN_STREAMS, PAGINATION_STREAM_IDLE_SECONDS
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """読み込み位置を不透明なカーソル文字列に変換"""
+    raw = json.dumps(position, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """カーソル文字列を読み込み位置に復元"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise ValueError("無効なカーソルです")
+
+
+class _RowStream:
+    """読み取り専用ワークブック上の行イテレータ（次に返す行番号を保持）"""
+
+    def __init__(self, filepath: str, sheet_name: str, signature, bounds: Tuple):
+        min_row, min_col, max_row, max_col = bounds
+        import openpyxl  # 起動を速くするため初回利用時に読み込む
+        self.signature = signature
+        self.wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            if sheet_name not in self.wb.sheetnames:
+                raise ValueError(f"Worksheet named '{sheet_name}' not found")
+            ws = self.wb[sheet_name]
+            # シート全体を走査せずに寸法（<dimension>要素）から最終行を取得
+            if max_row is None or ws.max_row is None:
+                self.last_row = max_row or ws.max_row
+            else:
+                self.last_row = min(ws.max_row, max_row)
+            self.rows = ws.iter_rows(min_row=min_row, max_row=max_row,
+                                     min_col=min_col, max_col=max_col, values_only=True)
+        except Exception:
+            self.wb.close()
+            raise
+        self.next_row = min_row
+        self.last_used = time.monotonic()
+
+    def skip_to(self, row: int):
+        """指定行の直前まで読み飛ばす（値の変換は行わない）"""
+        if row > self.next_row:
+            for _ in islice(self.rows, row - self.next_row):
+                pass
+            self.next_row = row
+
+    def take(self, count: int) -> List[tuple]:
+        """現在位置から最大count行を取得"""
+        rows = list(islice(self.rows, count))
+        self.next_row += len(rows)
+        self.last_used = time.monotonic()
+        return rows
+
+    def close(self):
+        self.wb.close()
+
+
+class RowStreamRegistry:
+    """ページ読み込み用の行イテレータを保持し、続きのページで再利用する
+
+    キーは (ファイル, シート, 範囲, 次の行番号) のため、カーソルでも
+    オフセット指定でも連続したページ要求であれば先頭から読み直さない。
+    """
+
+    def __init__(self, max_streams: int, idle_seconds: float):
+        self.max_streams = max_streams
+        self.idle_seconds = idle_seconds
+        self._streams: "OrderedDict[Tuple, _RowStream]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.resumed = 0
+        self.opened = 0
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, s in self._streams.items() if now - s.last_used > self.idle_seconds]:
+            self._streams.pop(key).close()
+
+    def read_page(self, filepath: str, sheet_name: str, bounds: Tuple,
+                  start_row: int, count: int) -> Tuple[List[tuple], int, Optional[int]]:
+        """start_rowからcount行を読み込み (行データ, 次の行番号, 最終行) を返す"""
+        signature = file_signature(filepath)
+        base_key = (filepath, sheet_name, bounds)
+        with self._lock:
+            self._expire()
+            stream = self._streams.pop(base_key + (start_row,), None)
+        if stream is not None and stream.signature != signature:
+            stream.close()
+            stream = None
+
+        if stream is None:
+            stream = _RowStream(filepath, sheet_name, signature, bounds)
+            self.opened += 1
+            stream.skip_to(start_row)
+        else:
+            self.resumed += 1
+
+        try:
+            rows = stream.take(count)
+        except Exception:
+            stream.close()
+            raise
+        exhausted = len(rows) < count or (stream.last_row is not None and stream.next_row > stream.last_row)
+        if exhausted:
+            stream.close()
+        else:
+            with self._lock:
+                self._streams[base_key + (stream.next_row,)] = stream
+                while len(self._streams) > self.max_streams:
+                    _, oldest = self._streams.popitem(last=False)
+                    oldest.close()
+        return rows, stream.next_row, stream.last_row
+
+    def close_file(self, filepath: str):
+        """指定ファイルのイテレータをすべて閉じる（書き込みで置き換える前に呼ぶ）
+
+        開いたままのファイルはWindowsでは置き換えられないため、次のページは開き直して読む。
+        """
+        target = os.path.realpath(filepath)
+        with self._lock:
+            keys = [key for key in self._streams if os.path.realpath(key[0]) == target]
+            for key in keys:
+                self._streams.pop(key).close()
+
+    def close_all(self):
+        """保持中のイテレータをすべて閉じる"""
+        with self._lock:
+            for stream in self._streams.values():
+                stream.close()
+            self._streams.clear()
+
+
+# プロセス共通のレジストリ
+row_stream_registry = RowStreamRegistry(PAGINATION_MAX_OPEN_STREAMS, PAGINATION_STREAM_IDLE_SECONDS)
@@ -0,0 +1,88 @@
+import re
+from typing import NamedTuple, Optional, Tuple
+
+# セル参照（例: A1, $B$2, AA, 100）
+_CELL_PATTERN = re.compile(r"^\$?([A-Za-z]{0,3})\$?(\d*)$")
+
+
+class CellRange(NamedTuple):
+    """セル範囲（1始まり、上限Noneは終端まで）"""
+    min_row: int
+    min_col: int
+    max_row: Optional[int]
+    max_col: Optional[int]
+
+    def to_a1(self) -> str:
+        """A1形式の文字列に変換"""
+        from openpyxl.utils import get_column_letter
+        start = f"{get_column_letter(self.min_col)}{self.min_row}"
+        end_col = get_column_letter(self.max_col) if self.max_col else ""
+        end_row = str(self.max_row) if self.max_row else ""
+        return f"{start}:{end_col}{end_row}"
+
+    def cell_count(self) -> Optional[int]:
+        """範囲内のセル数（終端までの範囲はNone）"""
+        if self.max_row is None or self.max_col is None:
+            return None
+        return (self.max_row - self.min_row + 1) * (self.max_col - self.min_col + 1)
+
+
+def parse_cell(ref: str) -> Tuple[Optional[int], Optional[int]]:
+    """セル参照を (列番号, 行番号) に変換（省略部分はNone）"""
+    match = _CELL_PATTERN.match(ref.strip())
+    if not match:
+        raise ValueError(f"無効なセル参照です: '{ref}'")
+
+    letters, digits = match.groups()
+    # openpyxlは起動を速くするため初回利用時に読み込む
+    from openpyxl.utils import column_index_from_string
+    col = column_index_from_string(letters.upper()) if letters else None
+    row = int(digits) if digits else None
+    if row == 0:
+        raise ValueError(f"行番号は1以上で指定してください: '{ref}'")
+    return col, row
+
+
+def parse_start_cell(ref: str) -> Tuple[int, int]:
+    """書き込み開始セルを (列番号, 行番号) に変換"""
+    col, row = parse_cell(ref)
+    if col is None or row is None:
+        raise ValueError(f"開始セルは列と行を指定してください（例: A1）: '{ref}'")
+    return col, row
+
+
+def parse_range(ref: str) -> CellRange:
+    """A1形式の範囲を解析
+
+    対応形式: A1:C10, B2, C:F, 3:10, A100:（終端まで）, :C10（先頭から）
+    """
+    if not ref or not ref.strip():
+        raise ValueError("範囲が指定されていません")
+
+    if ":" in ref:
+        start_ref, end_ref = ref.split(":", 1)
+    else:
+        start_ref, end_ref = ref, None
+
+    start_col, start_row = parse_cell(start_ref) if start_ref.strip() else (None, None)
+
+    if end_ref is None:
+        # 単一参照: セル / 列全体 / 行全体
+        end_col, end_row = start_col, start_row
+    elif end_ref.strip():
+        end_col, end_row = parse_cell(end_ref)
+    else:
+        end_col, end_row = None, None
+
+    cell_range = CellRange(
+        min_row=start_row or 1,
+        min_col=start_col or 1,
+        max_row=end_row,
+        max_col=end_col
+    )
+
+    if cell_range.max_row is not None and cell_range.max_row < cell_range.min_row:
+        raise ValueError(f"範囲の終了行が開始行より前です: '{ref}'")
+    if cell_range.max_col is not None and cell_range.max_col < cell_range.min_col:
+        raise ValueError(f"範囲の終了列が開始列より前です: '{ref}'")
+    return cell_range
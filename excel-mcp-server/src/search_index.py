@@ -0,0 +1,347 @@
+import datetime
+import fnmatch
+import heapq
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from .config import (
+    SEARCH_INDEX_DIR_NAME, SEARCH_NGRAM, SEARCH_INDEX_NUMBERS, SEARCH_MAX_CELL_CHARS
+)
+from .locks import file_locks
+from .metrics import metrics
+from .workbook_xml import read_sheet_names
+from .xlsx_reader import XlsxReader, UnsupportedSheet
+
+_INDEX_FILE_NAME = "index.sqlite3"
+# インデックスの形式・設定（変わったら作り直す）
+_SCHEMA_VERSION = 1
+_SETTINGS = f"{_SCHEMA_VERSION}:{SEARCH_NGRAM}:{int(SEARCH_INDEX_NUMBERS)}:{SEARCH_MAX_CELL_CHARS}"
+# SQLのIN句1回あたりの値の数
+_SQL_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY, name TEXT UNIQUE, mtime_ns INTEGER, size INTEGER,
+    cells INTEGER, indexed_at REAL, error TEXT
+);
+CREATE TABLE IF NOT EXISTS cells (
+    file_id INTEGER, cell INTEGER, sheet TEXT, row INTEGER, col INTEGER, value TEXT, norm TEXT,
+    PRIMARY KEY (file_id, cell)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    gram TEXT, file_id INTEGER, cells BLOB,
+    PRIMARY KEY (gram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+"""
+
+
+def normalize(text: str) -> str:
+    """検索用に正規化（NFKCで全角・半角を統一し、大文字・小文字を区別しない）"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def ngrams(norm: str) -> set:
+    """正規化済みの文字列を空白で区切り、語ごとの文字n-gramの集合を取得"""
+    grams = set()
+    for word in norm[:SEARCH_MAX_CELL_CHARS].split():
+        grams.update(word[i:i + SEARCH_NGRAM] for i in range(len(word) - SEARCH_NGRAM + 1))
+    return grams
+
+
+def _value_text(value: Any) -> Optional[str]:
+    """openpyxlのセルの値を検索用の文字列に変換（XlsxReader.read_textsと同じ表記）"""
+    if isinstance(value, str):
+        return value
+    if value is None or not SEARCH_INDEX_NUMBERS:
+        return None
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _read_file_cells(filepath: str) -> Iterator[Tuple[str, int, int, str]]:
+    """ファイル内の空でないセルを (シート名, 行, 列, 文字列) で返す
+
+    XMLから直接読み、読めないシートはopenpyxl（読み取り専用モード）で読む。
+    """
+    wb = None
+    try:
+        with XlsxReader(filepath) as reader:
+            for sheet_name in read_sheet_names(filepath):
+                try:
+                    cells = reader.read_texts(sheet_name, SEARCH_INDEX_NUMBERS)
+                except UnsupportedSheet:
+                    if wb is None:
+                        import openpyxl
+                        wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+                    ws = wb[sheet_name]
+                    ws.reset_dimensions()
+                    cells = [
+                        (r, c, text)
+                        for r, values in enumerate(ws.iter_rows(values_only=True), start=1)
+                        for c, value in enumerate(values, start=1)
+                        if (text := _value_text(value))
+                    ]
+                for row, col, text in cells:
+                    yield sheet_name, row, col, text
+    finally:
+        if wb is not None:
+            wb.close()
+
+
+class SearchIndex:
+    """excelフォルダ内の全ブックのセルの値の転置インデックス（文字n-gram → ファイル・セル）
+
+    excel/.search/index.sqlite3 に保存し、ファイルの更新日時・サイズが変わったブックだけを
+    作り直す。n-gramごとに、ファイル内のセル番号の配列を1行として保存する。検索時は
+    検索語のn-gramの配列の共通部分を候補とし、正規化した値に検索語が含まれるかを確認する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files_indexed = 0
+        self.cells_indexed = 0
+
+    @staticmethod
+    def _connect(excel_dir: str) -> sqlite3.Connection:
+        index_dir = os.path.join(excel_dir, SEARCH_INDEX_DIR_NAME)
+        os.makedirs(index_dir, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(index_dir, _INDEX_FILE_NAME), timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'settings'").fetchone()
+        if row is None or row[0] != _SETTINGS:
+            # 形式・設定が変わったインデックスは作り直す
+            with conn:
+                for table in ("files", "cells", "postings"):
+                    conn.execute(f"DELETE FROM {table}")
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('settings', ?)", (_SETTINGS,))
+        return conn
+
+    @staticmethod
+    def _list_files(excel_dir: str, pattern: Optional[str]) -> Dict[str, os.stat_result]:
+        files = {}
+        for name in os.listdir(excel_dir):
+            if not name.endswith(".xlsx") or name.startswith("~$"):
+                continue
+            if pattern is not None and not fnmatch.fnmatchcase(name, pattern):
+                continue
+            try:
+                files[name] = os.stat(os.path.join(excel_dir, name))
+            except FileNotFoundError:
+                continue
+        return files
+
+    def refresh(self, excel_dir: str, pattern: Optional[str] = None) -> Dict[str, Any]:
+        """更新・追加されたブックを索引し、削除されたブックを除く（patternに一致するファイルのみ）"""
+        start = time.perf_counter()
+        with self._lock, metrics.span("search_refresh"):
+            conn = self._connect(excel_dir)
+            try:
+                current = self._list_files(excel_dir, pattern)
+                known = {name: (file_id, mtime_ns, size) for file_id, name, mtime_ns, size
+                         in conn.execute("SELECT id, name, mtime_ns, size FROM files")}
+                removed = [name for name in known if name not in current
+                           and (pattern is None or fnmatch.fnmatchcase(name, pattern))]
+                for name in removed:
+                    with conn:
+                        self._delete_file(conn, known[name][0])
+
+                reindexed = []
+                for name, st in sorted(current.items()):
+                    entry = known.get(name)
+                    if entry is not None and entry[1:] == (st.st_mtime_ns, st.st_size):
+                        continue
+                    try:
+                        self._index_file(conn, os.path.join(excel_dir, name), name)
+                    except FileNotFoundError:
+                        continue
+                    reindexed.append(name)
+                files = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            finally:
+                conn.close()
+        return {
+            "files": files,
+            "reindexed": reindexed,
+            "removed": removed,
+            "refresh_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    @staticmethod
+    def _delete_file(conn: sqlite3.Connection, file_id: int):
+        conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+        conn.execute("DELETE FROM cells WHERE file_id = ?", (file_id,))
+        conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _index_file(self, conn: sqlite3.Connection, filepath: str, name: str):
+        """1ファイル分のセルとn-gramを作り直す（読めないファイルはエラーを記録し、更新されるまで再試行しない）"""
+        cells = []
+        postings: Dict[str, List[int]] = {}
+        error = None
+        with file_locks.read(filepath):
+            st = os.stat(filepath)
+            try:
+                # 同じ値のセルはn-gramの計算を1回にする
+                gram_cache: Dict[str, set] = {}
+                for sheet_name, row, col, text in _read_file_cells(filepath):
+                    norm = normalize(text)
+                    grams = gram_cache.get(norm)
+                    if grams is None:
+                        grams = gram_cache[norm] = ngrams(norm)
+                    cell = len(cells)
+                    cells.append((cell, sheet_name, row, col, text, norm))
+                    for gram in grams:
+                        postings.setdefault(gram, []).append(cell)
+            except Exception as e:
+                cells, postings, error = [], {}, str(e)
+            metrics.count_file_bytes("bytes_read", filepath)
+
+        with conn:
+            row = conn.execute("SELECT id FROM files WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                self._delete_file(conn, row[0])
+            file_id = conn.execute(
+                "INSERT INTO files (name, mtime_ns, size, cells, indexed_at, error) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, st.st_mtime_ns, st.st_size, len(cells), time.time(), error)
+            ).lastrowid
+            conn.executemany("INSERT INTO cells VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             ((file_id,) + cell for cell in cells))
+            conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                             ((gram, file_id, np.asarray(ids, dtype=np.uint32).tobytes())
+                              for gram, ids in postings.items()))
+        self.files_indexed += 1
+        self.cells_indexed += len(cells)
+
+    def search(self, excel_dir: str, query: str, pattern: Optional[str] = None,
+               sheet_name: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+        """検索語（空白区切りはすべてを含むセル）に一致するセルをスコアの高い順にlimit件取得
+
+        一致したセルの総数・ファイルとシートごとの件数・読めなかったファイル名も返す。
+        """
+        terms = list(dict.fromkeys(normalize(query).split()))
+        if not terms:
+            raise ValueError("検索語を指定してください")
+
+        with metrics.span("search_query"):
+            conn = self._connect(excel_dir)
+            try:
+                files = {}
+                errors = []
+                for file_id, name, error in conn.execute("SELECT id, name, error FROM files"):
+                    if pattern is None or fnmatch.fnmatchcase(name, pattern):
+                        files[file_id] = name
+                        if error:
+                            errors.append(name)
+                grams = set()
+                for term in terms:
+                    grams |= ngrams(term)
+                if grams:
+                    rows = self._fetch_cells(conn, self._candidates(conn, grams, files))
+                else:
+                    # n-gramより短い検索語はセルの値を順に確認する
+                    rows = conn.execute(
+                        "SELECT file_id, sheet, row, col, value, norm FROM cells WHERE instr(norm, ?) > 0",
+                        (terms[0],)
+                    ).fetchall()
+            finally:
+                conn.close()
+
+            matches = []
+            sheets: Dict[Tuple[str, str], int] = {}
+            for file_id, sheet, row, col, value, norm in rows:
+                if file_id not in files or (sheet_name is not None and sheet != sheet_name):
+                    continue
+                if not all(term in norm for term in terms):
+                    continue
+                key = (files[file_id], sheet)
+                sheets[key] = sheets.get(key, 0) + 1
+                matches.append((-self._score(terms, norm), key[0], sheet, row, col, value))
+            top = heapq.nsmallest(limit, matches)
+        return {
+            "hits": [
+                {"filename": filename, "sheet_name": sheet, "row": row, "column": col,
+                 "value": value, "score": -score}
+                for score, filename, sheet, row, col, value in top
+            ],
+            "total_matches": len(matches),
+            "sheets": [
+                {"filename": filename, "sheet_name": sheet, "matches": count}
+                for (filename, sheet), count in sorted(sheets.items(), key=lambda item: -item[1])
+            ],
+            "unreadable_files": errors
+        }
+
+    @staticmethod
+    def _candidates(conn: sqlite3.Connection, grams: set, files: Dict[int, str]) -> Dict[int, np.ndarray]:
+        """すべてのn-gramを含むセルの番号をファイルごとに取得（件数の少ないn-gramから共通部分を取る）"""
+        lists: Dict[str, Dict[int, np.ndarray]] = {}
+        for gram in grams:
+            lists[gram] = {file_id: np.frombuffer(blob, dtype=np.uint32)
+                           for file_id, blob in conn.execute(
+                               "SELECT file_id, cells FROM postings WHERE gram = ?", (gram,))
+                           if file_id in files}
+            if not lists[gram]:
+                return {}
+        order = sorted(lists.values(), key=lambda entries: sum(len(ids) for ids in entries.values()))
+        candidates = order[0]
+        for entries in order[1:]:
+            candidates = {file_id: np.intersect1d(ids, entries[file_id], assume_unique=True)
+                          for file_id, ids in candidates.items() if file_id in entries}
+            candidates = {file_id: ids for file_id, ids in candidates.items() if len(ids)}
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def _fetch_cells(conn: sqlite3.Connection, candidates: Dict[int, np.ndarray]) -> List[tuple]:
+        rows = []
+        for file_id, ids in candidates.items():
+            if len(ids) > _SQL_BATCH * 4:
+                # 候補が多い場合は範囲をまとめて読み、候補以外を除く
+                wanted = np.zeros(int(ids[-1]) + 1, dtype=bool)
+                wanted[ids] = True
+                rows.extend(row[1:] for row in conn.execute(
+                    "SELECT cell, file_id, sheet, row, col, value, norm FROM cells "
+                    "WHERE file_id = ? AND cell BETWEEN ? AND ?",
+                    (file_id, int(ids[0]), int(ids[-1]))
+                ) if wanted[row[0]])
+                continue
+            ids = ids.tolist()
+            for i in range(0, len(ids), _SQL_BATCH):
+                batch = ids[i:i + _SQL_BATCH]
+                rows.extend(conn.execute(
+                    "SELECT file_id, sheet, row, col, value, norm FROM cells "
+                    f"WHERE file_id = ? AND cell IN ({','.join('?' * len(batch))})",
+                    [file_id] + batch
+                ))
+        return rows
+
+    @staticmethod
+    def _score(terms: List[str], norm: str) -> float:
+        """一致の度合い（完全一致3・前方一致2・部分一致1の平均 + 値のうち検索語が占める割合）"""
+        stripped = norm.strip()
+        if len(terms) == 1:
+            term = terms[0]
+            base = 3 if stripped == term else 2 if stripped.startswith(term) else 1
+            return round(base + min(len(term) / (len(stripped) or 1), 1.0), 3)
+        base = sum(3 if stripped == term else 2 if stripped.startswith(term) else 1 for term in terms)
+        coverage = min(sum(len(term) for term in terms) / (len(stripped) or 1), 1.0)
+        return round(base / len(terms) + coverage, 3)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"files_indexed": self.files_indexed, "cells_indexed": self.cells_indexed}
+
+
+# プロセス共通の検索インデックス
+search_index = SearchIndex()
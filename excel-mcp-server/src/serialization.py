@@ -0,0 +1,89 @@
+import datetime
+import decimal
+import json
+import sys
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from .config import RESPONSE_JSON_INDENT
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjsonがなければ標準のjsonで出力
+    orjson = None
+
+# 読み込み結果の形式
+RESPONSE_FORMATS = ("records", "columns", "values", "csv")
+
+
+def _default(value: Any) -> Any:
+    """標準のJSONで扱えない値を変換（日時はISO 8601、欠損はnull）
+    
+    pandas・NumPyの値は読み込み済みの場合のみ存在するため、未読み込みなら判定しない
+    """
+    pd = sys.modules.get("pandas")
+    np = sys.modules.get("numpy")
+    if pd is not None and value is pd.NaT:
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if pd is not None and isinstance(value, pd.Timedelta):
+        return value.isoformat()
+    if np is not None and isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return str(value)
+
+
+def dumps(obj: Any, indent: Optional[int] = RESPONSE_JSON_INDENT) -> str:
+    """応答をJSON文字列に変換（既定は空白なしの圧縮形式、orjsonがあれば使用）"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=indent, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default)
+
+
+def _column_values(series: "pd.Series") -> List[Any]:
+    """列の値をPythonの値のリストに変換（NaN・NaTはNone、日時は文字列）"""
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return [value.isoformat() if value is not pd.NaT else None
+                for value in series.to_numpy(dtype=object, na_value=pd.NaT)]
+    return series.to_numpy(dtype=object, na_value=None).tolist()
+
+
+def check_format(fmt: str):
+    """応答形式の指定を検証"""
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"formatは {', '.join(RESPONSE_FORMATS)} のいずれかで指定してください")
+
+
+@metrics.timed("convert")
+def frame_payload(df: "pd.DataFrame", fmt: str = "records", header: bool = True) -> Dict[str, Any]:
+    """DataFrameを指定形式の応答データに変換
+
+    records: 行ごとの辞書のリスト
+    columns: 列ごとの値のリスト（headersと同じ順序）
+    values:  行ごとの値のリスト（2次元配列）
+    csv:     CSV文字列（headerがTrueならヘッダー行を含む）
+    """
+    check_format(fmt)
+    if fmt == "csv":
+        return {"format": fmt, "data": df.to_csv(index=False, header=header, date_format="%Y-%m-%dT%H:%M:%S")}
+
+    headers = list(df.columns)
+    columns = [_column_values(series) for _, series in df.items()]
+    if fmt == "columns":
+        data = columns
+    elif fmt == "values":
+        data = [list(row) for row in zip(*columns)]
+    else:
+        data = [dict(zip(headers, row)) for row in zip(*columns)]
+    return {"format": fmt, "data": data}
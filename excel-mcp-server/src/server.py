@@ -1,68 +1,153 @@
 import asyncio
-import json
-from typing import Any, Sequence
+import functools
+import threading
+import time
+import weakref
+from typing import Any, Callable, Optional, Sequence
+from urllib.parse import parse_qs, quote, unquote
 from mcp.server import Server
+from mcp import types
 from mcp.types import Resource, Tool, TextContent
-from .excel_operations import ExcelOperations
-from .config import get_excel_directory
+from .executor import executor
+from .directory_index import directory_index
+from .pagination import encode_cursor, decode_cursor
+from .serialization import dumps
+from .metrics import metrics
+from .cache import workbook_cache
+from .locks import write_coalescer
+from .config import (
+    get_excel_directory, RESOURCE_PAGE_SIZE,
+    RESOURCE_LIST_PAGE_SIZE, DIRECTORY_WATCH_INTERVAL_SECONDS, METRICS_PROMETHEUS_FILE,
+    PREWARM_IMPORTS, SESSION_MAX_CONCURRENCY
+)
 
 # MCPサーバーの初期化
 server = Server("excel-mcp-server")
 
+def _call_operation(name: str, *args, **kwargs):
+    """ExcelOperationsのメソッドを実行（pandas・openpyxlを含むためワーカー内で初回のみ読み込む）"""
+    from .excel_operations import ExcelOperations
+    return getattr(ExcelOperations, name)(*args, **kwargs)
+
+def _operation(name: str) -> Callable:
+    """ワーカーで実行するExcel操作を取得（プロセスプールにも渡せるようpartialで返す）"""
+    return functools.partial(_call_operation, name)
+
+# セッション -> ツール呼び出しの同時実行数を制限するセマフォ（閉じたセッションは自動的に消える）
+_session_slots: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_prewarm_started = False
+
+def _prewarm():
+    """重い依存ライブラリを読み込んでおく（最初のツール呼び出しの待ち時間を減らす）"""
+    from . import excel_operations  # noqa: F401
+
+def start_prewarm():
+    """バックグラウンドで事前読み込みを開始（プロセスごとに1回）"""
+    global _prewarm_started
+    if PREWARM_IMPORTS and not _prewarm_started:
+        _prewarm_started = True
+        threading.Thread(target=_prewarm, name="excel-prewarm", daemon=True).start()
+
+async def _on_initialized(notification: types.InitializedNotification):
+    """初期化完了後にバックグラウンドで事前読み込みを開始（応答は待たせない）"""
+    start_prewarm()
+
+server.notification_handlers[types.InitializedNotification] = _on_initialized
+
 @server.list_resources()
-async def list_resources() -> list[Resource]:
-    """利用可能なExcelファイルをリソースとして一覧表示"""
-    result = ExcelOperations.list_excel_files()
-    resources = []
-    
-    if result["success"]:
-        for file_info in result["files"]:
-            # 各ファイルのシート情報も取得
-            sheets_result = ExcelOperations.list_sheets(file_info["filename"])
-            if sheets_result["success"]:
-                for sheet_name in sheets_result["sheets"]:
-                    resources.append(Resource(
-                        uri=f"excel://{file_info['filename']}/{sheet_name}",
-                        name=f"{file_info['filename']} - {sheet_name}",
-                        mimeType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        description=f"Excelファイル: {file_info['filename']}, シート: {sheet_name}"
-                    ))
-    
-    return resources
+async def list_resources(request: types.ListResourcesRequest) -> types.ListResourcesResult:
+    """利用可能なExcelファイルをリソースとして一覧表示（カーソルでページ分割）"""
+    cursor = request.params.cursor if request.params else None
+    return await executor.run(_collect_resources, cursor)
+
+def _collect_resources(cursor: Optional[str] = None) -> types.ListResourcesResult:
+    """シート名の索引からリソースを生成（ワーカーで実行）"""
+    if directory_index.watching:
+        files = directory_index.snapshot()
+    else:
+        files = directory_index.refresh(get_excel_directory())
+    
+    entries = [(f["filename"], sheet_name) for f in files for sheet_name in f["sheets"]]
+    start = decode_cursor(cursor)["offset"] if cursor else 0
+    page = entries[start:start + RESOURCE_LIST_PAGE_SIZE]
+    
+    resources = [
+        Resource(
+            uri=_resource_uri(filename, sheet_name),
+            name=f"{filename} - {sheet_name}",
+            mimeType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            description=f"Excelファイル: {filename}, シート: {sheet_name}"
+        )
+        for filename, sheet_name in page
+    ]
+    next_start = start + len(page)
+    next_cursor = encode_cursor({"offset": next_start}) if next_start < len(entries) else None
+    return types.ListResourcesResult(resources=resources, nextCursor=next_cursor)
+
+def _resource_uri(filename: str, sheet_name: str) -> str:
+    """ファイル名・シート名をURLエンコードしてリソースURIを作成（日本語や記号を含む名前に対応）"""
+    return f"excel://{quote(filename, safe='')}/{quote(sheet_name, safe='')}"
 
 @server.read_resource()
 async def read_resource(uri: str) -> str:
     """Excelリソースの内容を読み取り"""
     try:
-        # URI解析: excel://filename.xlsx/SheetName
+        # URI解析: excel://filename.xlsx/SheetName[?page=N | ?cursor=...]
+        uri = str(uri)
         if not uri.startswith("excel://"):
             raise ValueError("無効なURI形式です")
         
-        path = uri.replace("excel://", "")
+        path, _, query = uri.replace("excel://", "").partition("?")
         parts = path.split("/")
         if len(parts) != 2:
             raise ValueError("URI形式が正しくありません")
         
-        filename, sheet_name = parts
+        filename, sheet_name = (unquote(part) for part in parts)
+        params = parse_qs(query)
+        page = int(params.get("page", ["1"])[0])
+        if page < 1:
+            raise ValueError("pageは1以上で指定してください")
+        output_format = params.get("format", ["records"])[0]
         
-        # データ読み込み
-        result = ExcelOperations.read_excel_data(filename, sheet_name)
+        # 1ページ分のデータ読み込み
+        if "cursor" in params:
+            result = await executor.run(
+                _operation("read_excel_data"),
+                filename, sheet_name, limit=RESOURCE_PAGE_SIZE, cursor=params["cursor"][0],
+                output_format=output_format, cpu_bound=True
+            )
+        else:
+            result = await executor.run(
+                _operation("read_excel_data"),
+                filename, sheet_name, offset=(page - 1) * RESOURCE_PAGE_SIZE, limit=RESOURCE_PAGE_SIZE,
+                output_format=output_format, cpu_bound=True
+            )
         
         if result["success"]:
-            return json.dumps({
+            next_uri = None
+            if result["has_more"]:
+                next_uri = f"{_resource_uri(filename, sheet_name)}?cursor={result['next_cursor']}"
+                if output_format != "records":
+                    next_uri += f"&format={output_format}"
+            return dumps({
                 "content": result["data"],
+                "format": result["format"],
                 "summary": f"ファイル: {filename}, シート: {sheet_name}, "
-                          f"行数: {result['rows']}, 列数: {result['columns']}"
-            }, ensure_ascii=False, indent=2)
+                          f"行数: {result['rows']}, 列数: {result['columns']}, "
+                          f"総行数: {result['total_rows']}",
+                "offset": result["offset"],
+                "total_rows": result["total_rows"],
+                "next_cursor": result["next_cursor"],
+                "next_uri": next_uri
+            })
         else:
-            return json.dumps({"error": result["error"]}, ensure_ascii=False)
+            return dumps({"error": result["error"]})
             
     except Exception as e:
-        return json.dumps({"error": f"リソース読み取りエラー: {str(e)}"}, ensure_ascii=False)
+        return dumps({"error": f"リソース読み取りエラー: {str(e)}"})
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    """利用可能なツール一覧"""
+def _tool_definitions() -> list[Tool]:
+    """ツール定義を生成"""
     return [
         Tool(
             name="create_excel_file",
@@ -113,6 +198,35 @@ async def list_tools() -> list[Tool]:
                         "type": "boolean",
                         "description": "ヘッダー行を含むかどうか",
                         "default": True
+                    },
+                    "write_only": {
+                        "type": "boolean",
+                        "description": "新規ファイルを書き込み専用モードで高速に作成するかどうか（既存ファイルには無効）",
+                        "default": False
+                    },
+                    "auto_width": {
+                        "type": "string",
+                        "enum": ["auto", "full", "sample", "none"],
+                        "description": "列幅の自動調整方法（auto: 大量データは抽出行から推定、full: 全行、sample: 抽出行、none: 調整しない）",
+                        "default": "auto"
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["replace", "append", "upsert"],
+                        "description": "書き込みモード（replace: シートを置き換え、append: 末尾に追加、upsert: キー列が一致する行を更新し、なければ追加）",
+                        "default": "replace"
+                    },
+                    "key_columns": {
+                        "type": "array",
+                        "description": "upsertモードで行を特定するキー列名",
+                        "items": {
+                            "type": "string"
+                        }
+                    },
+                    "infer_types": {
+                        "type": "boolean",
+                        "description": "数値・日付を表す文字列の列（例: \"1,234\"、\"2024-01-31\"）を数値・日付として書き込むかどうか",
+                        "default": False
                     }
                 },
                 "required": ["filename", "sheet_name", "data"]
@@ -120,7 +234,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="read_excel_data",
-            description="Excelファイルから表データを読み込みます",
+            description="Excelファイルから表データを読み込みます（推定メモリ使用量が上限を超えるシートは先頭ページとnext_cursorを返し、判断内容をmemoryに含めます）",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -134,20 +248,408 @@ async def list_tools() -> list[Tool]:
                     },
                     "range": {
                         "type": "string",
-                        "description": "読み込むセル範囲（例: A1:C10、オプション）"
+                        "description": "読み込むセル範囲（例: A1:C10、C:F、A100:、オプション）"
+                    },
+                    "has_header": {
+                        "type": "boolean",
+                        "description": "ヘッダー行があるかどうか",
+                        "default": True
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "読み飛ばすデータ行数（ページ読み込み、オプション）",
+                        "default": 0
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "1ページあたりの最大行数（指定時はページ単位で読み込み、オプション）"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "前回の応答のnext_cursor（続きのページを読み込む、オプション）"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["records", "columns", "values", "csv"],
+                        "description": "結果の形式（records: 行ごとの辞書、columns: 列ごとの配列、values: 2次元配列、csv: CSV文字列）",
+                        "default": "records"
+                    }
+                },
+                "required": ["filename", "sheet_name"]
+            }
+        ),
+        Tool(
+            name="read_many",
+            description="複数のファイル・シート・範囲をまとめて読み込みます（ファイルごとに1回だけ開き、複数ファイルは並列に解析します）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "targets": {
+                        "type": "array",
+                        "description": "読み込み対象（patternと同時には指定不可）",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "filename": {"type": "string", "description": "対象のExcelファイル名"},
+                                "sheet_name": {"type": "string", "description": "対象シート名（省略時はすべてのシート）"},
+                                "range": {"type": "string", "description": "読み込むセル範囲（例: A1:C10、オプション）"}
+                            },
+                            "required": ["filename"]
+                        }
+                    },
+                    "pattern": {
+                        "type": "string",
+                        "description": "対象ファイル名のパターン（例: sales_2024_*.xlsx、targetsと同時には指定不可）"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "patternで指定したファイルから読み込むシート名（省略時はすべてのシート）"
+                    },
+                    "range": {
+                        "type": "string",
+                        "description": "patternで指定したファイルから読み込むセル範囲（オプション）"
                     },
                     "has_header": {
                         "type": "boolean",
                         "description": "ヘッダー行があるかどうか",
                         "default": True
+                    },
+                    "concat": {
+                        "type": "boolean",
+                        "description": "結果を1つの表に連結するかどうか（先頭列に「ファイル名/シート名」を追加）",
+                        "default": False
+                    },
+                    "source_column": {
+                        "type": "string",
+                        "description": "連結時に追加する列の名前",
+                        "default": "_source"
+                    },
+                    "max_cells": {
+                        "type": "integer",
+                        "description": "1回の応答に含める最大セル数（超過分はnext_cursorで取得、オプション）"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "前回の応答のnext_cursor（他の引数は前回と同じものを指定、オプション）"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["records", "columns", "values", "csv"],
+                        "description": "結果の形式（records: 行ごとの辞書、columns: 列ごとの配列、values: 2次元配列、csv: CSV文字列）",
+                        "default": "records"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="search_excel",
+            description="excelフォルダ内のすべてのブックからセルの値を検索し、一致したファイル・シート・セル位置をスコア順に返します（日本語を含む部分一致、インデックスは更新されたブックだけ作り直します）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "検索語（大文字・小文字、全角・半角を区別しない部分一致、空白区切りですべてを含むセル）"
+                    },
+                    "pattern": {
+                        "type": "string",
+                        "description": "検索対象のファイル名のパターン（例: sales_*.xlsx、オプション）"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "検索対象のシート名（オプション）"
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "返す最大件数（オプション）"
+                    },
+                    "refresh": {
+                        "type": "boolean",
+                        "description": "検索前に更新されたブックをインデックスに反映するかどうか",
+                        "default": True
+                    }
+                },
+                "required": ["query"]
+            }
+        ),
+        Tool(
+            name="query_excel_data",
+            description="シートに絞り込み・列の選択・グループ化・集計・並べ替え・上位N件の抽出をサーバー側で適用し、結果のみを返します（シート全体を読み込まずに集計できます）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "対象のExcelファイル名"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "対象シート名（先頭行をヘッダーとして扱います）"
+                    },
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "返す列（集計しない場合、省略時はすべての列）"
+                    },
+                    "filters": {
+                        "type": "array",
+                        "description": "絞り込み条件（すべて満たす行のみ対象）",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "column": {"type": "string", "description": "対象列"},
+                                "op": {
+                                    "type": "string",
+                                    "enum": ["==", "!=", ">", ">=", "<", "<=", "in", "not_in",
+                                             "contains", "startswith", "is_null", "not_null"],
+                                    "default": "=="
+                                },
+                                "value": {"description": "比較する値（in/not_inは配列）"}
+                            },
+                            "required": ["column"]
+                        }
+                    },
+                    "group_by": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "グループ化する列"
+                    },
+                    "aggregations": {
+                        "type": "array",
+                        "description": "集計（group_by指定時はグループごと、未指定時は全体）",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "func": {"type": "string", "enum": ["sum", "mean", "count", "min", "max"]},
+                                "column": {"type": "string", "description": "対象列（countで省略時は行数）"},
+                                "alias": {"type": "string", "description": "結果の列名（省略時は 列名_関数名）"}
+                            },
+                            "required": ["func"]
+                        }
+                    },
+                    "sort": {
+                        "type": "array",
+                        "description": "並べ替え（結果の列名。降順は descending: true）",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "column": {"type": "string"},
+                                "descending": {"type": "boolean", "default": False}
+                            },
+                            "required": ["column"]
+                        }
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "返す最大行数（上位N件）"
+                    },
+                    "range": {
+                        "type": "string",
+                        "description": "対象のセル範囲（例: A1:F1000、オプション）"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["records", "columns", "values", "csv"],
+                        "description": "結果の形式（records: 行ごとの辞書、columns: 列ごとの配列、values: 2次元配列、csv: CSV文字列）",
+                        "default": "records"
                     }
                 },
                 "required": ["filename", "sheet_name"]
             }
         ),
+        Tool(
+            name="batch_excel_operations",
+            description="1つのExcelファイルに対する複数の操作（シート作成・書き込み・追加・読み込み・シート一覧）を1回の読み込み・保存でまとめて実行します。1つでも失敗した場合は何も保存しません",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "対象のExcelファイル名"
+                    },
+                    "operations": {
+                        "type": "array",
+                        "description": "順番に実行する操作の一覧",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "type": {
+                                    "type": "string",
+                                    "enum": ["create_sheet", "write", "append", "read", "list_sheets"],
+                                    "description": "操作の種類"
+                                },
+                                "sheet_name": {
+                                    "type": "string",
+                                    "description": "対象シート名（list_sheets以外で必須）"
+                                },
+                                "data": {
+                                    "type": "array",
+                                    "description": "書き込むデータ（write / append）",
+                                    "items": {
+                                        "type": "object"
+                                    }
+                                },
+                                "start_cell": {
+                                    "type": "string",
+                                    "description": "開始セル位置（write / append、デフォルト: A1）"
+                                },
+                                "include_header": {
+                                    "type": "boolean",
+                                    "description": "ヘッダー行を含むかどうか（write / append）"
+                                },
+                                "mode": {
+                                    "type": "string",
+                                    "enum": ["replace", "append", "upsert"],
+                                    "description": "書き込みモード（write）"
+                                },
+                                "key_columns": {
+                                    "type": "array",
+                                    "description": "upsertモードのキー列名（write）",
+                                    "items": {
+                                        "type": "string"
+                                    }
+                                },
+                                "infer_types": {
+                                    "type": "boolean",
+                                    "description": "数値・日付を表す文字列の列を数値・日付として書き込むかどうか（write / append）"
+                                },
+                                "range": {
+                                    "type": "string",
+                                    "description": "読み込むセル範囲（read、オプション）"
+                                },
+                                "has_header": {
+                                    "type": "boolean",
+                                    "description": "ヘッダー行があるかどうか（read）"
+                                },
+                                "format": {
+                                    "type": "string",
+                                    "enum": ["records", "columns", "values", "csv"],
+                                    "description": "結果の形式（read、既定はrecords）"
+                                }
+                            },
+                            "required": ["type"]
+                        }
+                    }
+                },
+                "required": ["filename", "operations"]
+            }
+        ),
+        Tool(
+            name="recalculate_formulas",
+            description="ワークブックの数式（SUM・AVERAGE・IF・VLOOKUP・INDEX・MATCH・四則演算など）を計算し、計算結果をファイルに書き込みます。書き込み時は影響を受ける数式が自動で再計算されるため、Excel以外で作成したファイルなど数式セルに値がない場合に使います",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "対象のExcelファイル名"
+                    }
+                },
+                "required": ["filename"]
+            }
+        ),
+        Tool(
+            name="import_csv",
+            description="excelフォルダ内のCSV/NDJSONファイルを一定のメモリで少しずつ読み込み、新規Excelファイルのシートとして書き出します（大きなファイル向け、進捗を通知）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "作成するExcelファイル名"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "書き込み先シート名",
+                        "default": "Sheet1"
+                    },
+                    "source": {
+                        "type": "string",
+                        "description": "取り込むファイル名（excelフォルダ直下、.csv / .ndjson / .jsonl）"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["csv", "ndjson"],
+                        "description": "取り込むファイルの形式（省略時は拡張子から判定）"
+                    },
+                    "has_header": {
+                        "type": "boolean",
+                        "description": "CSVの先頭行がヘッダーかどうか",
+                        "default": True
+                    },
+                    "delimiter": {
+                        "type": "string",
+                        "description": "CSVの区切り文字",
+                        "default": ","
+                    },
+                    "encoding": {
+                        "type": "string",
+                        "description": "文字コード（例: utf-8、cp932）",
+                        "default": "utf-8"
+                    },
+                    "overwrite": {
+                        "type": "boolean",
+                        "description": "既存のExcelファイルを置き換えるかどうか",
+                        "default": False
+                    }
+                },
+                "required": ["filename", "source"]
+            }
+        ),
+        Tool(
+            name="export_sheet",
+            description="シートを1行ずつ読み込み、excelフォルダ内のCSV/NDJSONファイルに書き出します（大きなシート向け、進捗を通知）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "書き出し元のExcelファイル名"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "書き出し元シート名"
+                    },
+                    "destination": {
+                        "type": "string",
+                        "description": "書き出し先ファイル名（excelフォルダ直下、.csv / .ndjson / .jsonl）"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["csv", "ndjson"],
+                        "description": "書き出す形式（省略時は拡張子から判定）"
+                    },
+                    "range": {
+                        "type": "string",
+                        "description": "書き出すセル範囲（例: A1:F1000、オプション）"
+                    },
+                    "has_header": {
+                        "type": "boolean",
+                        "description": "先頭行をヘッダーとして扱うかどうか",
+                        "default": True
+                    },
+                    "delimiter": {
+                        "type": "string",
+                        "description": "CSVの区切り文字",
+                        "default": ","
+                    },
+                    "encoding": {
+                        "type": "string",
+                        "description": "文字コード（例: utf-8、cp932）",
+                        "default": "utf-8"
+                    },
+                    "overwrite": {
+                        "type": "boolean",
+                        "description": "既存のファイルを置き換えるかどうか",
+                        "default": False
+                    }
+                },
+                "required": ["filename", "sheet_name", "destination"]
+            }
+        ),
         Tool(
             name="list_sheets",
-            description="Excelファイル内のシート一覧を取得します",
+            description="Excelファイル内のシート一覧と各シートの使用範囲（行数・列数）を取得します",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -159,6 +661,29 @@ async def list_tools() -> list[Tool]:
                 "required": ["filename"]
             }
         ),
+        Tool(
+            name="get_workbook_info",
+            description="シート構成・各シートの使用範囲（行数・列数）・先頭行・ファイルのプロパティを取得します（セルデータを解析しないため大きなファイルでも高速）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "対象のExcelファイル名"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "対象シート名（省略時はすべてのシート）"
+                    },
+                    "include_header": {
+                        "type": "boolean",
+                        "description": "各シートの先頭行の値を含めるかどうか",
+                        "default": True
+                    }
+                },
+                "required": ["filename"]
+            }
+        ),
         Tool(
             name="list_excel_files",
             description="利用可能なExcelファイル一覧を取得します",
@@ -166,75 +691,320 @@ async def list_tools() -> list[Tool]:
                 "type": "object",
                 "properties": {}
             }
+        ),
+        Tool(
+            name="server_metrics",
+            description="ツール別の所要時間（p50/p95）・処理段階ごとの内訳・読み書きしたバイト数・キャッシュ等の統計を取得します",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "prometheus"],
+                        "description": "出力形式（prometheusはテキスト形式）",
+                        "default": "json"
+                    },
+                    "reset": {
+                        "type": "boolean",
+                        "description": "取得後に計測値を消去するかどうか",
+                        "default": False
+                    }
+                }
+            }
         )
     ]
 
+# ツール定義は変わらないため起動時に1回だけ生成し、list_toolsでは同じものを返す
+TOOLS = _tool_definitions()
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    """利用可能なツール一覧"""
+    return TOOLS
+
+def _session_slot() -> asyncio.Semaphore:
+    """リクエスト元のセッションの同時実行数を制限するセマフォ（1つのクライアントがワーカーを占有しないようにする）"""
+    session = server.request_context.session
+    slot = _session_slots.get(session)
+    if slot is None:
+        slot = _session_slots[session] = asyncio.Semaphore(SESSION_MAX_CONCURRENCY)
+    return slot
+
+def active_sessions() -> int:
+    """ツールを呼び出したことのある接続中のセッション数"""
+    return len(_session_slots)
+
+def _progress_reporter():
+    """progressTokenが指定されたリクエストなら、ワーカーから進捗を通知する関数を返す"""
+    ctx = server.request_context
+    token = ctx.meta.progressToken if ctx.meta is not None else None
+    if token is None:
+        return None
+    loop = asyncio.get_running_loop()
+    
+    def report(progress: float, total: Optional[float] = None):
+        # ワーカースレッドからイベントループ上で送信（完了は待たない）
+        asyncio.run_coroutine_threadsafe(
+            ctx.session.send_progress_notification(token, progress, total), loop
+        )
+    
+    return report
+
 @server.call_tool()
 async def call_tool(name: str, arguments: dict[str, Any] | None) -> Sequence[TextContent]:
-    """ツール実行"""
+    """ツール実行（所要時間・エラー数を計測）"""
     if arguments is None:
         arguments = {}
     
-    try:
-        if name == "create_excel_file":
-            result = ExcelOperations.create_excel_file(
-                filename=arguments["filename"],
-                sheet_name=arguments.get("sheet_name", "Sheet1")
-            )
-        
-        elif name == "write_excel_data":
-            result = ExcelOperations.write_excel_data(
-                filename=arguments["filename"],
-                sheet_name=arguments["sheet_name"],
-                data=arguments["data"],
-                start_cell=arguments.get("start_cell", "A1"),
-                include_header=arguments.get("include_header", True)
-            )
-        
-        elif name == "read_excel_data":
-            result = ExcelOperations.read_excel_data(
-                filename=arguments["filename"],
-                sheet_name=arguments["sheet_name"],
-                range_cells=arguments.get("range"),
-                has_header=arguments.get("has_header", True)
-            )
-        
-        elif name == "list_sheets":
-            result = ExcelOperations.list_sheets(
-                filename=arguments["filename"]
-            )
-        
-        elif name == "list_excel_files":
-            result = ExcelOperations.list_excel_files()
-        
-        else:
-            result = {"success": False, "error": f"不明なツール: {name}"}
-        
-        return [TextContent(
-            type="text",
-            text=json.dumps(result, ensure_ascii=False, indent=2)
-        )]
+    start = time.perf_counter()
+    failed = False
+    with metrics.label(name):
+        try:
+            async with _session_slot():
+                result = await _dispatch_tool(name, arguments)
+        except Exception as e:
+            failed = True
+            result = {
+                "success": False,
+                "error": f"ツール実行エラー ({name}): {str(e)}"
+            }
         
-    except Exception as e:
-        error_result = {
-            "success": False,
-            "error": f"ツール実行エラー ({name}): {str(e)}"
+        with metrics.span("serialise"):
+            text = dumps(result)
+    metrics.record_tool(name, time.perf_counter() - start, result, failed)
+    
+    return [TextContent(
+        type="text",
+        text=text
+    )]
+
+async def _dispatch_tool(name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+    """ツール名に対応する操作を実行して結果を返す"""
+    if name == "create_excel_file":
+        result = await executor.run(
+            _operation("create_excel_file"),
+            writes=True,
+            filename=arguments["filename"],
+            sheet_name=arguments.get("sheet_name", "Sheet1")
+        )
+    
+    elif name == "write_excel_data":
+        result = await executor.run(
+            _operation("write_excel_data"),
+            writes=True,
+            filename=arguments["filename"],
+            sheet_name=arguments["sheet_name"],
+            data=arguments["data"],
+            start_cell=arguments.get("start_cell", "A1"),
+            include_header=arguments.get("include_header", True),
+            write_only=arguments.get("write_only", False),
+            auto_width=arguments.get("auto_width", "auto"),
+            mode=arguments.get("mode", "replace"),
+            key_columns=arguments.get("key_columns"),
+            infer_types=arguments.get("infer_types", False)
+        )
+    
+    elif name == "read_excel_data":
+        result = await executor.run(
+            _operation("read_excel_data"),
+            cpu_bound=True,
+            filename=arguments["filename"],
+            sheet_name=arguments["sheet_name"],
+            range_cells=arguments.get("range"),
+            has_header=arguments.get("has_header", True),
+            offset=arguments.get("offset", 0),
+            limit=arguments.get("limit"),
+            cursor=arguments.get("cursor"),
+            output_format=arguments.get("format", "records")
+        )
+    
+    elif name == "read_many":
+        # ファイル単位の並列解析はread_many側のプロセスプールで行う
+        result = await executor.run(
+            _operation("read_many"),
+            targets=arguments.get("targets"),
+            pattern=arguments.get("pattern"),
+            sheet_name=arguments.get("sheet_name"),
+            range_cells=arguments.get("range"),
+            has_header=arguments.get("has_header", True),
+            concat=arguments.get("concat", False),
+            source_column=arguments.get("source_column", "_source"),
+            max_cells=arguments.get("max_cells"),
+            cursor=arguments.get("cursor"),
+            output_format=arguments.get("format", "records")
+        )
+    
+    elif name == "search_excel":
+        result = await executor.run(
+            _operation("search_excel"),
+            query=arguments["query"],
+            pattern=arguments.get("pattern"),
+            sheet_name=arguments.get("sheet_name"),
+            max_results=arguments.get("max_results"),
+            refresh=arguments.get("refresh", True)
+        )
+    
+    elif name == "query_excel_data":
+        result = await executor.run(
+            _operation("query_excel_data"),
+            cpu_bound=True,
+            filename=arguments["filename"],
+            sheet_name=arguments["sheet_name"],
+            columns=arguments.get("columns"),
+            filters=arguments.get("filters"),
+            group_by=arguments.get("group_by"),
+            aggregations=arguments.get("aggregations"),
+            sort=arguments.get("sort"),
+            limit=arguments.get("limit"),
+            range_cells=arguments.get("range"),
+            output_format=arguments.get("format", "records")
+        )
+    
+    elif name == "batch_excel_operations":
+        result = await executor.run(
+            _operation("batch_excel_operations"),
+            writes=True,
+            filename=arguments["filename"],
+            operations=arguments["operations"]
+        )
+    
+    elif name == "recalculate_formulas":
+        result = await executor.run(
+            _operation("recalculate_formulas"),
+            writes=True,
+            filename=arguments["filename"]
+        )
+    
+    elif name == "import_csv":
+        result = await executor.run(
+            _operation("import_csv"),
+            writes=True,
+            filename=arguments["filename"],
+            sheet_name=arguments.get("sheet_name", "Sheet1"),
+            source=arguments["source"],
+            source_format=arguments.get("format"),
+            has_header=arguments.get("has_header", True),
+            delimiter=arguments.get("delimiter", ","),
+            encoding=arguments.get("encoding", "utf-8"),
+            overwrite=arguments.get("overwrite", False),
+            progress=_progress_reporter()
+        )
+    
+    elif name == "export_sheet":
+        result = await executor.run(
+            _operation("export_sheet"),
+            writes=True,
+            filename=arguments["filename"],
+            sheet_name=arguments["sheet_name"],
+            destination=arguments["destination"],
+            destination_format=arguments.get("format"),
+            range_cells=arguments.get("range"),
+            has_header=arguments.get("has_header", True),
+            delimiter=arguments.get("delimiter", ","),
+            encoding=arguments.get("encoding", "utf-8"),
+            overwrite=arguments.get("overwrite", False),
+            progress=_progress_reporter()
+        )
+    
+    elif name == "list_sheets":
+        result = await executor.run(
+            _operation("list_sheets"),
+            filename=arguments["filename"]
+        )
+    
+    elif name == "get_workbook_info":
+        result = await executor.run(
+            _operation("get_workbook_info"),
+            filename=arguments["filename"],
+            sheet_name=arguments.get("sheet_name"),
+            include_header=arguments.get("include_header", True)
+        )
+    
+    elif name == "list_excel_files":
+        result = await executor.run(_operation("list_excel_files"))
+    
+    elif name == "server_metrics":
+        result = await executor.run(
+            _server_metrics,
+            output_format=arguments.get("format", "json"),
+            reset=arguments.get("reset", False)
+        )
+    
+    else:
+        result = {"success": False, "error": f"不明なツール: {name}"}
+    
+    return result
+
+def _metrics_gauges() -> dict[str, Any]:
+    """計測値と合わせて出力する各コンポーネントの統計"""
+    from .sidecar import sidecar_cache
+    from .search_index import search_index
+    from .memory import memory_governor
+    return {
+        "executor": executor.metrics(),
+        "workbook_cache": workbook_cache.stats(),
+        "sidecar_cache": sidecar_cache.stats(),
+        "search_index": search_index.stats(),
+        "memory": memory_governor.stats(),
+        "write_coalescer": write_coalescer.stats(),
+        "directory_index": directory_index.stats(),
+        "sessions": {"active": active_sessions(), "max_concurrency": SESSION_MAX_CONCURRENCY}
+    }
+
+def _flat_gauges(components: dict[str, Any]) -> dict[str, Any]:
+    """コンポーネント統計をPrometheus用の {名前: 値} に平坦化"""
+    return {
+        f"{component}_{key}": value
+        for component, values in components.items()
+        for key, value in values.items()
+    }
+
+def _server_metrics(output_format: str = "json", reset: bool = False) -> dict[str, Any]:
+    """ツール別の所要時間・処理段階の内訳・キャッシュ等の統計を取得"""
+    if output_format not in ("json", "prometheus"):
+        return {"success": False, "error": "formatは json または prometheus で指定してください"}
+    
+    components = _metrics_gauges()
+    if output_format == "prometheus":
+        result = {
+            "success": True,
+            "format": "prometheus",
+            "data": metrics.prometheus_text(_flat_gauges(components))
         }
-        return [TextContent(
-            type="text",
-            text=json.dumps(error_result, ensure_ascii=False, indent=2)
-        )]
+    else:
+        result = {"success": True, **metrics.snapshot(), **components}
+    
+    if reset:
+        metrics.reset()
+    return result
+
+def start_background():
+    """接続方式によらず共通のバックグラウンド処理を開始（フォルダ監視）"""
+    if DIRECTORY_WATCH_INTERVAL_SECONDS > 0:
+        directory_index.start_watcher(get_excel_directory(), DIRECTORY_WATCH_INTERVAL_SECONDS)
+
+def stop_background():
+    """フォルダ監視を停止し、計測値を書き出してワーカーを終了"""
+    directory_index.stop_watcher()
+    if METRICS_PROMETHEUS_FILE:
+        # 終了時点の計測値を書き出す
+        metrics.dump_prometheus(METRICS_PROMETHEUS_FILE, _flat_gauges(_metrics_gauges()))
+    executor.shutdown()
 
 async def main():
-    """メイン実行関数"""
+    """メイン実行関数（stdio接続）"""
     from mcp.server.stdio import stdio_server
     
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options()
-        )
+    start_background()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+    finally:
+        stop_background()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .cache import file_signature
+from .config import SIDECAR_CACHE_ENABLED, SIDECAR_DIR_NAME, SIDECAR_MIN_CELLS
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:  # pyarrowがなければNumPy/pickle形式で保存
+    HAS_PYARROW = False
+
+# NumPy配列としてそのまま保存できる列の型（bool・整数・浮動小数・複素数・日時）
+_NUMPY_KINDS = "biufcmM"
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class SidecarCache:
+    """シートを列指向形式で保存するディスクキャッシュ
+
+    初回読み込み時にシートを excel/.cache/<内容ハッシュ>/ 配下へ変換して保存し、
+    以降はメモリマップで読み込む（XMLを解析しない）。pyarrowがあればParquet、
+    なければ列ごとの .npy（数値・日時）と pickle（それ以外）で保存する。
+    元ファイルの内容が変わるとハッシュが変わり、古いキャッシュは削除される。
+    """
+
+    def __init__(self, enabled: bool = True, min_cells: int = 0):
+        self.enabled = enabled
+        self.min_cells = min_cells
+        # 解決済みパス -> (シグネチャ, 内容ハッシュ)  ハッシュの再計算を避ける
+        self._hashes: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    @staticmethod
+    def _cache_dir(filepath: str) -> str:
+        return os.path.join(os.path.dirname(filepath), SIDECAR_DIR_NAME)
+
+    @staticmethod
+    def _sheet_key(sheet_name: str, has_header: bool) -> str:
+        """シート名をファイル名に使える形に変換"""
+        digest = hashlib.sha1(repr((sheet_name, has_header)).encode("utf-8")).hexdigest()
+        return digest[:16]
+
+    def content_hash(self, filepath: str) -> str:
+        """ファイル内容のハッシュを取得（シグネチャが変わっていなければ再計算しない）"""
+        key = os.path.realpath(filepath)
+        signature = file_signature(filepath)
+        with self._lock:
+            cached = self._hashes.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        # 再起動後もハッシュを再計算しないよう、ファイル名ごとの記録を残す
+        record_path = os.path.join(self._cache_dir(filepath), os.path.basename(filepath) + ".hash")
+        record = self._read_pickle(record_path)
+        if record is not None and tuple(record["signature"]) == signature:
+            digest = record["hash"]
+        else:
+            hasher = hashlib.blake2b(digest_size=20)
+            with open(filepath, "rb") as f:
+                for block in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+            if file_signature(filepath) != signature:
+                # ハッシュ計算中に更新された場合は記録しない
+                return digest
+            self._write_pickle(record_path, {"signature": signature, "hash": digest})
+            if record is not None and record["hash"] != digest:
+                self._remove_unreferenced(filepath, record["hash"])
+
+        with self._lock:
+            self._hashes[key] = (signature, digest)
+        return digest
+
+    def load(self, filepath: str, sheet_name: str, has_header: bool,
+             columns: Optional[List[Any]] = None) -> Optional[pd.DataFrame]:
+        """保存済みのシートを読み込み（なければNone、columns指定時はその列のみ）"""
+        if not self.enabled:
+            return None
+        try:
+            base = os.path.join(self._cache_dir(filepath), self.content_hash(filepath),
+                                self._sheet_key(sheet_name, has_header))
+            if os.path.exists(base + ".parquet"):
+                df = self._load_parquet(base + ".parquet", columns)
+            elif os.path.isdir(base):
+                df = self._load_arrays(base, columns)
+            else:
+                df = None
+        except Exception:
+            # 壊れたキャッシュは使わずに元ファイルを解析する
+            self.errors += 1
+            df = None
+
+        if df is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return df
+
+    def store(self, filepath: str, sheet_name: str, has_header: bool, df: pd.DataFrame) -> bool:
+        """シートを列指向形式で保存（小さいシートは保存しない）"""
+        if not self.enabled or df.size < self.min_cells:
+            return False
+        try:
+            directory = os.path.join(self._cache_dir(filepath), self.content_hash(filepath))
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, self._sheet_key(sheet_name, has_header))
+            if not (HAS_PYARROW and self._store_parquet(base + ".parquet", df)):
+                self._store_arrays(base, df)
+            self.writes += 1
+            return True
+        except Exception:
+            self.errors += 1
+            return False
+
+    @staticmethod
+    def _load_parquet(path: str, columns: Optional[List[Any]]) -> Optional[pd.DataFrame]:
+        if columns is not None:
+            import pyarrow.parquet as pq
+            available = pq.read_schema(path).names
+            if any(column not in available for column in columns):
+                return None
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+
+    @staticmethod
+    def _store_parquet(path: str, df: pd.DataFrame) -> bool:
+        """Parquetで保存（列名が文字列でない・型が混在する列がある場合はFalse）"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".~", suffix=".tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(temp_path, index=False)
+            os.replace(temp_path, path)
+            return True
+        except Exception:
+            return False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _load_arrays(base: str, columns: Optional[List[Any]]) -> Optional[pd.DataFrame]:
+        meta = SidecarCache._read_pickle(os.path.join(base, "meta.pkl"))
+        names = meta["columns"]
+        if columns is None:
+            positions = range(len(names))
+        elif any(column not in names for column in columns):
+            return None
+        else:
+            positions = [names.index(column) for column in columns]
+
+        data = {}
+        for i in positions:
+            path = os.path.join(base, meta["files"][i])
+            if path.endswith(".npy"):
+                data[names[i]] = np.load(path, mmap_mode="r")
+            else:
+                data[names[i]] = SidecarCache._read_pickle(path)
+        return pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]), columns=[names[i] for i in positions])
+
+    @staticmethod
+    def _store_arrays(base: str, df: pd.DataFrame):
+        """列ごとに .npy（メモリマップ可能）または pickle で保存"""
+        temp_dir = tempfile.mkdtemp(dir=os.path.dirname(base), prefix=".~")
+        try:
+            files = []
+            for i, (_, series) in enumerate(df.items()):
+                if isinstance(series.dtype, np.dtype) and series.dtype.kind in _NUMPY_KINDS:
+                    name = f"{i}.npy"
+                    np.save(os.path.join(temp_dir, name), series.to_numpy(), allow_pickle=False)
+                else:
+                    name = f"{i}.pkl"
+                    SidecarCache._write_pickle(os.path.join(temp_dir, name), series.array)
+                files.append(name)
+            SidecarCache._write_pickle(os.path.join(temp_dir, "meta.pkl"), {
+                "columns": list(df.columns), "files": files, "rows": len(df)
+            })
+            if os.path.isdir(base):
+                shutil.rmtree(base, ignore_errors=True)
+            os.replace(temp_dir, base)
+        finally:
+            if os.path.isdir(temp_dir):
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _remove_unreferenced(self, filepath: str, digest: str):
+        """どのファイルからも参照されなくなった内容ハッシュのキャッシュを削除"""
+        cache_dir = self._cache_dir(filepath)
+        for name in os.listdir(cache_dir):
+            if name.endswith(".hash"):
+                record = self._read_pickle(os.path.join(cache_dir, name))
+                if record is not None and record["hash"] == digest:
+                    return
+        shutil.rmtree(os.path.join(cache_dir, digest), ignore_errors=True)
+
+    @staticmethod
+    def _read_pickle(path: str):
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    @staticmethod
+    def _write_pickle(path: str, value):
+        """一時ファイル経由で保存（書き込み途中の内容を読まれないようにする）"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".~", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """ディスクキャッシュの統計を取得"""
+        return {
+            "format": "parquet" if HAS_PYARROW else "npy",
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors
+        }
+
+
+# プロセス共通のディスクキャッシュ
+sidecar_cache = SidecarCache(SIDECAR_CACHE_ENABLED, SIDECAR_MIN_CELLS)
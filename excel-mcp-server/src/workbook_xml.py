@@ -0,0 +1,455 @@
+import posixpath
+import re
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape as xml_escape
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+from .ranges import CellRange, parse_cell, parse_range
+
+# Office Open XMLの名前空間
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CORE = "http://schemas.openxmlformats.org/package/2006/metadata/core-properties"
+NS_DC = "http://purl.org/dc/elements/1.1/"
+NS_DCTERMS = "http://purl.org/dc/terms/"
+NS_APP = "http://schemas.openxmlformats.org/officeDocument/2006/extended-properties"
+OFFICE_DOCUMENT_REL = NS_REL + "/officeDocument"
+SHARED_STRINGS_REL = NS_REL + "/sharedStrings"
+SHARED_STRINGS_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+
+# docProps/core.xml・app.xmlから取得するファイルのプロパティ
+_CORE_PROPERTIES = {
+    f"{{{NS_DC}}}title": "title",
+    f"{{{NS_DC}}}subject": "subject",
+    f"{{{NS_DC}}}creator": "creator",
+    f"{{{NS_DC}}}description": "description",
+    f"{{{NS_CORE}}}keywords": "keywords",
+    f"{{{NS_CORE}}}lastModifiedBy": "last_modified_by",
+    f"{{{NS_DCTERMS}}}created": "created",
+    f"{{{NS_DCTERMS}}}modified": "modified"
+}
+_APP_PROPERTIES = {
+    f"{{{NS_APP}}}Application": "application",
+    f"{{{NS_APP}}}AppVersion": "app_version"
+}
+
+# <dimension>がないシート（書き込み専用モードで作成したファイルなど）の範囲走査用
+_ROW_REF_PATTERN = re.compile(rb'<row r="(\d+)"')
+_COLUMN_REF_PATTERN = re.compile(rb'<c r="([A-Z]{1,3})\d')
+_SCAN_CHUNK_BYTES = 1024 * 1024
+# シートXMLでセル1個に必要な最小のバイト数（<c r="A1"><v>1</v></c>）
+_MIN_XML_BYTES_PER_CELL = 20
+
+# openpyxlが出力するインライン文字列セル（属性は r, s, t の順、書式付きテキストは対象外）
+_INLINE_STRING_PATTERN = re.compile(
+    rb'<c r="([A-Z]+[0-9]+)"( s="[0-9]+")? t="inlineStr"><is><t( xml:space="preserve")?>([^<]*)</t></is></c>'
+)
+# openpyxlが出力する計算結果のない数式セル（配列数式など属性付きの<f>は対象外）
+_EMPTY_FORMULA_PATTERN = re.compile(
+    rb'<c r="([A-Z]{1,3}[0-9]+)"((?: [A-Za-z:]+="[^"]*")*)><f>([^<]*)</f>(?:<v ?/>|<v></v>)?</c>'
+)
+_TYPE_ATTR_PATTERN = re.compile(rb' t="[A-Za-z]+"')
+
+
+def _workbook_part(zf: zipfile.ZipFile) -> str:
+    """_rels/.relsからworkbook.xmlのパスを取得（通常は xl/workbook.xml）"""
+    try:
+        with zf.open("_rels/.rels") as f:
+            for rel in ET.parse(f).getroot().iter(f"{{{NS_PKG_REL}}}Relationship"):
+                if rel.get("Type") == OFFICE_DOCUMENT_REL:
+                    return rel.get("Target").lstrip("/")
+    except KeyError:
+        pass
+    return "xl/workbook.xml"
+
+
+def read_sheet_names(filepath: str) -> List[str]:
+    """workbook.xmlからシート名のみを取得（セルデータは解析しない）"""
+    with zipfile.ZipFile(filepath) as zf:
+        with zf.open(_workbook_part(zf)) as f:
+            names = []
+            for _, elem in ET.iterparse(f, events=("end",)):
+                if elem.tag == f"{{{NS_MAIN}}}sheet":
+                    names.append(elem.get("name"))
+                elif elem.tag == f"{{{NS_MAIN}}}sheets":
+                    # シート一覧以降（定義名など）は読まない
+                    break
+            return names
+
+
+
+def _resolve_target(base_part: str, target: str) -> str:
+    """リレーションシップのTargetをzip内のパスに変換（相対パスは参照元の場所から解決）"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base_part), target))
+
+
+def _part_relationships(zf: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """パーツのリレーションシップを取得 {Id: (Type, zip内のパス)}"""
+    rels_path = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    try:
+        with zf.open(rels_path) as f:
+            root = ET.parse(f).getroot()
+    except KeyError:
+        return {}
+    return {
+        rel.get("Id"): (rel.get("Type"), _resolve_target(part, rel.get("Target")))
+        for rel in root.iter(f"{{{NS_PKG_REL}}}Relationship")
+        if rel.get("TargetMode") != "External"
+    }
+
+
+def _read_sheet_entries(zf: zipfile.ZipFile, workbook_part: str) -> List[Dict[str, str]]:
+    """workbook.xmlからシート名・表示状態・シートXMLのパスを取得"""
+    relationships = _part_relationships(zf, workbook_part)
+    entries = []
+    with zf.open(workbook_part) as f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag == f"{{{NS_MAIN}}}sheet":
+                rel = relationships.get(elem.get(f"{{{NS_REL}}}id"))
+                entries.append({
+                    "name": elem.get("name"),
+                    "state": elem.get("state", "visible"),
+                    "part": rel[1] if rel else None
+                })
+            elif elem.tag == f"{{{NS_MAIN}}}sheets":
+                break
+    return entries
+
+
+def _read_dimension(zf: zipfile.ZipFile, part: str) -> Optional[str]:
+    """シートXMLの<dimension>を取得（セルデータの手前で読み込みを止める）"""
+    with zf.open(part) as f:
+        for _, elem in ET.iterparse(f, events=("start",)):
+            if elem.tag == f"{{{NS_MAIN}}}dimension":
+                return elem.get("ref")
+            if elem.tag == f"{{{NS_MAIN}}}sheetData":
+                return None
+    return None
+
+
+def _scan_dimension(zf: zipfile.ZipFile, part: str) -> Optional[str]:
+    """行・セルの参照だけを走査して使用範囲を求める（XMLは解析せず、一定のメモリで処理）"""
+    first_row = last_row = None
+    columns = set()
+    tail = b""
+    with zf.open(part) as f:
+        for block in iter(lambda: f.read(_SCAN_CHUNK_BYTES), b""):
+            data = tail + block
+            # 区切り位置にまたがる参照を次のブロックで拾えるよう末尾を残す
+            tail = data[-32:]
+            found = _ROW_REF_PATTERN.findall(data)
+            if found:
+                # 行は昇順に並ぶため最初と最後のみ使う
+                if first_row is None:
+                    first_row = int(found[0])
+                last_row = int(found[-1])
+            # 列は重複を除いてから変換（通常は列数分の文字列のみ）
+            columns.update(_COLUMN_REF_PATTERN.findall(data))
+    if first_row is None or not columns:
+        return None
+    indices = [parse_cell(letters.decode("ascii"))[0] for letters in columns]
+    return CellRange(first_row, min(indices), last_row, max(indices)).to_a1()
+
+
+def estimate_sheet_cells(filepath: str, sheet_names: Optional[List[str]] = None,
+                         xml_bytes_per_cell: int = 40) -> Dict[str, int]:
+    """各シートのセル数を<dimension>とシートXMLのサイズから見積もる（セルデータは読まない）
+
+    <dimension>がないシートはXMLのサイズをxml_bytes_per_cellで割った値とする。
+    <dimension>が実際より広いシート（書式だけのセル範囲を含むものなど）で過大にならないよう、
+    XMLのサイズから求めた最大のセル数で頭打ちにする。
+    """
+    cells = {}
+    with zipfile.ZipFile(filepath) as zf:
+        entries = _read_sheet_entries(zf, _workbook_part(zf))
+        if sheet_names is not None:
+            missing = [name for name in sheet_names if name not in {e["name"] for e in entries}]
+            if missing:
+                raise ValueError(f"Worksheet named '{missing[0]}' not found")
+            entries = [e for e in entries if e["name"] in sheet_names]
+        for entry in entries:
+            part = entry["part"]
+            if part not in zf.NameToInfo:
+                cells[entry["name"]] = 0
+                continue
+            xml_bytes = zf.getinfo(part).file_size
+            info = _dimension_info(_read_dimension(zf, part), False)
+            if info["rows"] is None:
+                cells[entry["name"]] = xml_bytes // xml_bytes_per_cell
+            else:
+                cells[entry["name"]] = min(info["rows"] * info["columns"], xml_bytes // _MIN_XML_BYTES_PER_CELL)
+    return cells
+
+
+def _read_shared_strings(zf: zipfile.ZipFile, part: Optional[str], indices: Iterable[int]) -> Dict[int, str]:
+    """共有文字列のうち指定番号のものだけを取得（最大番号より後は読まない）"""
+    wanted = set(indices)
+    if not wanted or part is None or part not in zf.NameToInfo:
+        return {}
+    last = max(wanted)
+    strings = {}
+    index = 0
+    with zf.open(part) as f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag != f"{{{NS_MAIN}}}si":
+                continue
+            if index in wanted:
+                # 書式なし（<t>）または書式付き（<r><t>）のテキストを連結、ふりがな（<rPh>）は除く
+                texts = elem.findall(f"{{{NS_MAIN}}}t") + elem.findall(f"{{{NS_MAIN}}}r/{{{NS_MAIN}}}t")
+                strings[index] = "".join(t.text or "" for t in texts)
+            elem.clear()
+            if index >= last:
+                break
+            index += 1
+    return strings
+
+
+def _read_first_row(zf: zipfile.ZipFile, part: str) -> Tuple[Optional[int], List[Tuple[int, str, Optional[str]]]]:
+    """シートXMLの最初の行のみを取得 (行番号, [(列番号, 型, 値)])"""
+    with zf.open(part) as f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag != f"{{{NS_MAIN}}}row":
+                continue
+            cells = []
+            for position, c in enumerate(elem.iter(f"{{{NS_MAIN}}}c"), start=1):
+                col = parse_cell(c.get("r"))[0] if c.get("r") else position
+                cell_type = c.get("t", "n")
+                if cell_type == "inlineStr":
+                    value = "".join(t.text or "" for t in c.iter(f"{{{NS_MAIN}}}t"))
+                else:
+                    v = c.find(f"{{{NS_MAIN}}}v")
+                    value = v.text if v is not None else None
+                cells.append((col, cell_type, value))
+            return int(elem.get("r")) if elem.get("r") else 1, cells
+    return None, []
+
+
+def _cell_value(cell_type: str, value: Optional[str], shared: Dict[int, str]) -> Any:
+    """セルの型に応じて値を変換（日付書式は判定しないため数値のまま）"""
+    if value is None:
+        return None
+    if cell_type == "s":
+        return shared.get(int(value))
+    if cell_type == "b":
+        return value == "1"
+    if cell_type in ("str", "inlineStr", "e", "d"):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _read_properties(zf: zipfile.ZipFile) -> Dict[str, str]:
+    """docProps/core.xml・app.xmlからファイルのプロパティを取得"""
+    properties = {}
+    for part, names in (("docProps/core.xml", _CORE_PROPERTIES), ("docProps/app.xml", _APP_PROPERTIES)):
+        try:
+            with zf.open(part) as f:
+                root = ET.parse(f).getroot()
+        except KeyError:
+            continue
+        for child in root:
+            if child.tag in names and child.text:
+                properties[names[child.tag]] = child.text.strip()
+    return properties
+
+
+def _dimension_info(ref: Optional[str], scanned: bool) -> Dict[str, Any]:
+    """使用範囲から行数・列数を算出（範囲が不明ならNone、走査してセルがなければ0）"""
+    if not ref:
+        empty = 0 if scanned else None
+        return {"dimension": None, "rows": empty, "columns": empty}
+    cell_range = parse_range(ref)
+    max_row = cell_range.max_row or cell_range.min_row
+    max_col = cell_range.max_col or cell_range.min_col
+    return {
+        "dimension": ref,
+        "rows": max_row - cell_range.min_row + 1,
+        "columns": max_col - cell_range.min_col + 1
+    }
+
+
+def read_workbook_info(filepath: str, sheet_names: Optional[List[str]] = None,
+                       include_header: bool = True, scan_missing: bool = True) -> Dict[str, Any]:
+    """zip内のXMLからシート構成・使用範囲・先頭行・プロパティを取得（セルデータは解析しない）
+
+    使用範囲は各シートの<dimension>から取得する。<dimension>がないシートは、scan_missingが
+    Trueならセル参照のみを走査して求め、FalseならNoneを返す。
+    先頭行は最初の<row>要素のみを読み、共有文字列は必要な番号までしか読まない。
+    """
+    with zipfile.ZipFile(filepath) as zf:
+        workbook_part = _workbook_part(zf)
+        entries = _read_sheet_entries(zf, workbook_part)
+        if sheet_names is not None:
+            missing = [name for name in sheet_names if name not in {e["name"] for e in entries}]
+            if missing:
+                raise ValueError(f"Worksheet named '{missing[0]}' not found")
+            entries = [e for e in entries if e["name"] in sheet_names]
+        
+        shared_part = next((
+            target for rel_type, target in _part_relationships(zf, workbook_part).values()
+            if rel_type == SHARED_STRINGS_REL
+        ), None)
+        
+        sheets = []
+        first_rows = []
+        for entry in entries:
+            info = {"name": entry["name"], "state": entry["state"]}
+            part = entry["part"] if entry["part"] in zf.NameToInfo else None
+            ref = _read_dimension(zf, part) if part else None
+            source = "dimension"
+            if ref is None and part and scan_missing:
+                ref = _scan_dimension(zf, part)
+                source = "scan"
+            info.update(_dimension_info(ref, source == "scan" or not part), dimension_source=source if ref else None)
+            if include_header:
+                row, cells = _read_first_row(zf, part) if part else (None, [])
+                first_rows.append(cells)
+                info["header_row"] = row
+            sheets.append(info)
+        
+        if include_header:
+            shared = _read_shared_strings(zf, shared_part, (
+                int(value) for cells in first_rows for _, cell_type, value in cells
+                if cell_type == "s" and value is not None
+            ))
+            for info, cells in zip(sheets, first_rows):
+                info["header"] = [_cell_value(cell_type, value, shared) for _, cell_type, value in cells]
+                info["header_columns"] = [col for col, _, _ in cells]
+        
+        return {"sheets": sheets, "properties": _read_properties(zf)}
+
+
+def _rewrite_sheet(source: BinaryIO, dest: BinaryIO, strings: Optional[Dict[Tuple[bytes, bytes], int]],
+                   formula_values: Optional[Dict[str, Tuple[str, str]]]) -> Tuple[int, int]:
+    """シートXMLを行単位で少しずつ書き換え (共有文字列への置換数, 書き込んだ数式の計算結果の数)
+
+    stringsを指定するとインライン文字列を共有文字列の番号に置き換え、formula_valuesを指定すると
+    数式セルの空の<v>に計算結果（{セル番地: (セルの型, 値の文字列)}）を書き込む。
+    """
+    references = 0
+    filled = 0
+
+    def replace_string(match):
+        nonlocal references
+        ref, style, space, text = match.groups()
+        key = (text, space or b"")
+        index = strings.get(key)
+        if index is None:
+            index = strings[key] = len(strings)
+        references += 1
+        return b'<c r="%b"%b t="s"><v>%d</v></c>' % (ref, style or b"", index)
+
+    def replace_formula(match):
+        nonlocal filled
+        ref, attrs, formula = match.groups()
+        value = formula_values.get(ref.decode("ascii"))
+        if value is None:
+            return match.group(0)
+        cell_type, text = value
+        filled += 1
+        attrs = _TYPE_ATTR_PATTERN.sub(b"", attrs)
+        type_attr = b"" if cell_type == "n" else b' t="%b"' % cell_type.encode("ascii")
+        return b'<c r="%b"%b%b><f>%b</f><v>%b</v></c>' % (
+            ref, attrs, type_attr, formula, xml_escape(text).encode("utf-8")
+        )
+
+    def convert(data: bytes) -> bytes:
+        if strings is not None:
+            data = _INLINE_STRING_PATTERN.sub(replace_string, data)
+        if formula_values and b"<f>" in data:
+            data = _EMPTY_FORMULA_PATTERN.sub(replace_formula, data)
+        return data
+
+    buffer = b""
+    for block in iter(lambda: source.read(_SCAN_CHUNK_BYTES), b""):
+        buffer += block
+        # 行の途中で区切らないよう、最後の</row>までを変換
+        cut = buffer.rfind(b"</row>")
+        if cut < 0:
+            continue
+        cut += len(b"</row>")
+        dest.write(convert(buffer[:cut]))
+        buffer = buffer[cut:]
+    dest.write(convert(buffer))
+    return references, filled
+
+
+def rewrite_workbook(source_path: str, dest: BinaryIO, shared_strings: bool = True,
+                     formula_values: Optional[Dict[str, Dict[str, Tuple[str, str]]]] = None) -> Dict[str, int]:
+    """openpyxlが保存したxlsxのシートXMLを書き換えて出力
+
+    shared_strings: インライン文字列を共有文字列テーブル（xl/sharedStrings.xml）にまとめる。
+        openpyxlは文字列をセルごとにインラインで出力するため、同じ文字列の繰り返しが多い
+        データではファイルが大きくなる。同じ文字列は1回だけ保存し、セルからは番号で参照する。
+        既に共有文字列テーブルを持つファイルは変換しない。
+    formula_values: シートごとの数式セルの計算結果 {シート名: {セル番地: (セルの型, 値の文字列)}}。
+        openpyxlは数式の計算結果を保存できないため、Excelで開かなくても値を読めるように書き込む。
+    """
+    strings: Dict[Tuple[bytes, bytes], int] = {}
+    references = 0
+    filled = 0
+    formula_values = formula_values or {}
+    with zipfile.ZipFile(source_path) as zin, zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED) as zout:
+        workbook_part = _workbook_part(zin)
+        relationships = _part_relationships(zin, workbook_part)
+        has_shared = any(rel_type == SHARED_STRINGS_REL for rel_type, _ in relationships.values())
+        convert_strings = shared_strings and not has_shared
+        string_parts = set() if not convert_strings else {
+            target for _, target in relationships.values()
+            if target.startswith(posixpath.dirname(workbook_part) + "/worksheets/")
+        }
+        value_parts = {
+            entry["part"]: formula_values[entry["name"]]
+            for entry in (_read_sheet_entries(zin, workbook_part) if formula_values else ())
+            if entry["name"] in formula_values and entry["part"]
+        }
+        rels_part = posixpath.join(posixpath.dirname(workbook_part), "_rels",
+                                   posixpath.basename(workbook_part) + ".rels")
+        deferred = []
+        for info in zin.infolist():
+            if info.filename in string_parts or info.filename in value_parts:
+                with zin.open(info) as source, zout.open(info.filename, "w", force_zip64=True) as target:
+                    converted, written = _rewrite_sheet(
+                        source, target, strings if info.filename in string_parts else None,
+                        value_parts.get(info.filename)
+                    )
+                references += converted
+                filled += written
+            elif convert_strings and info.filename in ("[Content_Types].xml", rels_part):
+                # 共有文字列の登録が必要な部分は全シートの変換後に出力
+                deferred.append(info)
+            else:
+                with zin.open(info) as source, zout.open(info, "w") as target:
+                    shutil.copyfileobj(source, target)
+
+        shared_part = posixpath.join(posixpath.dirname(workbook_part), "sharedStrings.xml")
+        for info in deferred:
+            data = zin.read(info)
+            if strings and info.filename == "[Content_Types].xml":
+                data = data.replace(b"</Types>", (
+                    f'<Override PartName="/{shared_part}" ContentType="{SHARED_STRINGS_CONTENT_TYPE}"/></Types>'
+                ).encode())
+            elif strings:
+                data = data.replace(b"</Relationships>", (
+                    f'<Relationship Id="rIdSharedStrings" Type="{SHARED_STRINGS_REL}" '
+                    f'Target="sharedStrings.xml"/></Relationships>'
+                ).encode())
+            zout.writestr(info, data)
+
+        if strings:
+            with zout.open(shared_part, "w", force_zip64=True) as target:
+                target.write((
+                    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    f'<sst xmlns="{NS_MAIN}" count="{references}" uniqueCount="{len(strings)}">'
+                ).encode())
+                for text, space in strings:
+                    target.write(b"<si><t" + space + b">" + text + b"</t></si>")
+                target.write(b"</sst>")
+    return {"strings": references, "unique_strings": len(strings), "formula_values": filled}
+
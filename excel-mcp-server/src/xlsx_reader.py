@@ -0,0 +1,440 @@
+import html
+import re
+import zipfile
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+from .ranges import parse_cell
+from .workbook_xml import (
+    NS_REL, SHARED_STRINGS_REL, _SCAN_CHUNK_BYTES,
+    _workbook_part, _part_relationships, _read_sheet_entries
+)
+
+STYLES_REL = NS_REL + "/styles"
+
+# セル要素（r属性が先頭にあるもの、数式は計算結果の<v>のみ使用、インライン文字列は書式なしのみ）
+_CELL_PATTERN = re.compile(
+    rb'<c r="([A-Z]{1,3})([0-9]+)"((?: [A-Za-z:]+="[^"]*")*) ?'
+    rb'(?:/>|>(?:<f[^>]*/>|<f[^>]*>[^<]*</f>)?(?:<v>([^<]*)</v>|<v ?/>)?'
+    rb'(?:<is><t(?: xml:space="preserve")?>([^<]*)</t></is>)?</c>)'
+)
+_STYLE_ATTR_PATTERN = re.compile(rb' s="([0-9]+)"')
+_TYPE_ATTR_PATTERN = re.compile(rb' t="([A-Za-z]+)"')
+_DATE1904_PATTERN = re.compile(rb'date1904="(1|true)"')
+
+# セルの種類
+_BLANK, _NUMBER, _DATE, _SHARED, _TEXT, _BOOL, _ERROR = range(7)
+_CELL_KINDS = {b"n": _NUMBER, b"s": _SHARED, b"str": _TEXT, b"inlineStr": _TEXT, b"b": _BOOL, b"e": _ERROR}
+
+# pd.read_excelが欠損値とみなす文字列（pandasの既定のna_values）
+_NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+])
+# pd.read_excelが真偽値に変換する文字列
+_BOOL_STRINGS = frozenset(["True", "TRUE", "true", "False", "FALSE", "false"])
+# 浮動小数で正確に表せる整数の上限
+_MAX_EXACT_INT = 2 ** 53
+# 1900年方式の日付の基準日、openpyxlが時刻・1900年うるう年の補正を行う範囲、日付の上限（9999-12-31）
+_EXCEL_EPOCH = np.datetime64("1899-12-30", "ms")
+_MIN_PLAIN_SERIAL = 61
+_MAX_DATE_SERIAL = 2958465
+_MS_PER_DAY = 86400000
+
+
+class UnsupportedSheet(Exception):
+    """この読み込み方法では pd.read_excel と同じ結果を保証できないシート"""
+    pass
+
+
+def _text_value(raw: bytes) -> str:
+    """XMLのテキストを文字列に変換（改行の正規化・文字参照の展開）"""
+    text = raw.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+def _looks_numeric(text: str) -> bool:
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+class XlsxReader:
+    """シートXMLと共有文字列をzipから直接読み込み、列ごとにまとめて型変換してDataFrameを生成する
+
+    pd.read_excel（openpyxl）はセルごとにCellオブジェクトを作るため、大きなシートでは
+    CPU時間とメモリの大半をそこで使う。このクラスはセルの参照・属性・値を正規表現で
+    まとめて取り出し、NumPy配列として型ごとに一括変換する。結果は pd.read_excel と
+    同じになるよう型推定の規則を合わせ、合わせられないシート（1904年方式の日付、
+    書式付きインライン文字列、列ごとの型が混在して推定規則が複雑になる場合など）は
+    UnsupportedSheet を送出する（呼び出し側で従来の方法に切り替える）。
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._zf = zipfile.ZipFile(filepath)
+        self._workbook_part = _workbook_part(self._zf)
+        self._entries = None
+        self._relationships = None
+        self._shared: Optional[np.ndarray] = None
+        self._shared_na: Optional[np.ndarray] = None
+        self._styles: Optional[Tuple[Set[int], Set[int]]] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zf.close()
+
+    def _part(self, rel_type: str) -> Optional[str]:
+        """workbook.xmlから参照されるパーツのパスを取得"""
+        if self._relationships is None:
+            self._relationships = _part_relationships(self._zf, self._workbook_part)
+        return next((target for t, target in self._relationships.values()
+                     if t == rel_type and target in self._zf.NameToInfo), None)
+
+    def _sheet_part(self, sheet_name: str) -> str:
+        if self._entries is None:
+            self._entries = _read_sheet_entries(self._zf, self._workbook_part)
+            if _DATE1904_PATTERN.search(self._zf.read(self._workbook_part)):
+                raise UnsupportedSheet("1904年方式の日付")
+        for entry in self._entries:
+            if entry["name"] == sheet_name:
+                if entry["part"] is None or entry["part"] not in self._zf.NameToInfo:
+                    raise UnsupportedSheet("シートのXMLが見つかりません")
+                return entry["part"]
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+    def _shared_strings(self) -> np.ndarray:
+        """共有文字列テーブルを読み込み（ファイルごとに1回、openpyxlと同じ規則で連結）"""
+        if self._shared is None:
+            from openpyxl.reader.strings import read_string_table
+            part = self._part(SHARED_STRINGS_REL)
+            strings = []
+            if part is not None:
+                with self._zf.open(part) as f:
+                    strings = read_string_table(f)
+            self._shared = np.array(strings + [""], dtype=object)[:-1]
+            self._shared_na = np.fromiter((s in _NA_STRINGS for s in strings), dtype=bool, count=len(strings))
+        return self._shared
+
+    def _date_styles(self) -> Tuple[Set[int], Set[int]]:
+        """日付・経過時間の表示形式を持つセル書式の番号を取得"""
+        if self._styles is None:
+            part = self._part(STYLES_REL)
+            if part is None:
+                self._styles = (set(), set())
+            else:
+                from openpyxl.styles.stylesheet import Stylesheet
+                from openpyxl.xml.functions import fromstring
+                stylesheet = Stylesheet.from_tree(fromstring(self._zf.read(part)))
+                self._styles = (stylesheet.date_formats, stylesheet.timedelta_formats)
+        return self._styles
+
+    def read_frame(self, sheet_name: str, has_header: bool = True) -> pd.DataFrame:
+        """シートをDataFrameとして読み込み（pd.read_excel(header=0 / None)と同じ結果）"""
+        part = self._sheet_part(sheet_name)
+        cells = self._read_cells(part)
+        return self._build_frame(cells, has_header)
+
+    def read_texts(self, sheet_name: str, include_numbers: bool = False) -> List[Tuple[int, int, str]]:
+        """空でないセルを (行, 列, 文字列) のリストで取得（検索インデックス用、行・列の順）
+
+        include_numbersがTrueなら数値・日付（ISO形式）・真偽値（TRUE/FALSE）のセルも文字列にして含める。
+        """
+        cells = self._read_cells(self._sheet_part(sheet_name))
+        rows, cols, kinds, values = (cells[key] for key in ("rows", "cols", "kinds", "values"))
+        result: List[Tuple[int, int, str]] = []
+
+        shared = np.flatnonzero(kinds == _SHARED)
+        if len(shared):
+            strings = self._shared_strings()
+            indices = values[shared].astype(np.int64)
+            if indices.max() >= len(strings):
+                raise UnsupportedSheet("共有文字列の番号が範囲外です")
+            result.extend(zip(rows[shared].tolist(), cols[shared].tolist(), strings[indices].tolist()))
+        for position, text in cells["texts"].items():
+            result.append((int(rows[position]), int(cols[position]), text))
+
+        if include_numbers:
+            number = kinds == _NUMBER
+            date_styles, _ = self._date_styles()
+            dates = number & np.isin(cells["styles"], list(date_styles))
+            number &= ~dates
+            for row, col, value in zip(rows[number].tolist(), cols[number].tolist(), values[number].tolist()):
+                result.append((row, col, str(int(value)) if value.is_integer() else repr(value)))
+            if dates.any():
+                stamps = self._date_values(values[dates]).astype("datetime64[s]").astype(str)
+                result.extend(zip(rows[dates].tolist(), cols[dates].tolist(), stamps.tolist()))
+            flags = np.flatnonzero(kinds == _BOOL)
+            result.extend((int(rows[i]), int(cols[i]), "TRUE" if values[i] else "FALSE") for i in flags)
+
+        result = [cell for cell in result if cell[2]]
+        result.sort()
+        return result
+
+    def _read_cells(self, part: str) -> Dict[str, Any]:
+        """シートXMLからセルを読み込み、行・列・種類・値の配列にまとめる（行単位で少しずつ処理）"""
+        chunks = []
+        texts: Dict[int, str] = {}
+        offset = 0
+        buffer = b""
+        head = True
+        with self._zf.open(part) as f:
+            for block in iter(lambda: f.read(_SCAN_CHUNK_BYTES), b""):
+                buffer += block
+                if head:
+                    if b"<sheetData" not in buffer:
+                        if len(buffer) > _SCAN_CHUNK_BYTES * 4:
+                            raise UnsupportedSheet("名前空間の接頭辞付きのXML")
+                        continue
+                    head = False
+                # 行の途中で区切らないよう、最後の</row>までを処理
+                cut = buffer.rfind(b"</row>")
+                if cut < 0:
+                    continue
+                cut += len(b"</row>")
+                chunk = self._parse_chunk(buffer[:cut], offset, texts)
+                if chunk is not None:
+                    chunks.append(chunk)
+                    offset += len(chunk[0])
+                buffer = buffer[cut:]
+        if head:
+            raise UnsupportedSheet("sheetDataがありません")
+        chunk = self._parse_chunk(buffer, offset, texts)
+        if chunk is not None:
+            chunks.append(chunk)
+        if not chunks:
+            raise UnsupportedSheet("空のシート")
+
+        rows, cols, kinds, styles, values = (np.concatenate(parts) for parts in zip(*chunks))
+        return {"rows": rows, "cols": cols, "kinds": kinds, "styles": styles, "values": values, "texts": texts}
+
+    def _parse_chunk(self, data: bytes, offset: int, texts: Dict[int, str]) -> Optional[Tuple[np.ndarray, ...]]:
+        """XMLの断片からセルを取り出して配列に変換（offsetはこの断片の先頭セルの通し番号）"""
+        matches = _CELL_PATTERN.findall(data)
+        if len(matches) != data.count(b"<c ") + data.count(b"<c>"):
+            # 正規表現で扱えない形式のセル（r属性が先頭にない、書式付きテキストなど）
+            raise UnsupportedSheet("未対応の形式のセル")
+        if not matches:
+            return None
+
+        letters, row_refs, attrs, raw_values, inline_values = zip(*matches)
+        rows = np.array(row_refs).astype(np.int32)
+        unique_letters, inverse = np.unique(np.array(letters), return_inverse=True)
+        cols = np.array([parse_cell(letter.decode("ascii"))[0] for letter in unique_letters],
+                        dtype=np.int32)[inverse]
+
+        # 属性の組み合わせは少ないため、重複を除いてから種類・書式番号を判定
+        unique_attrs, inverse = np.unique(np.array(attrs), return_inverse=True)
+        attr_kinds = []
+        attr_styles = []
+        for attr in unique_attrs:
+            match = _TYPE_ATTR_PATTERN.search(attr)
+            kind = _CELL_KINDS.get(match.group(1) if match else b"n")
+            if kind is None:
+                raise UnsupportedSheet("未対応のセルの型")
+            attr_kinds.append(kind)
+            match = _STYLE_ATTR_PATTERN.search(attr)
+            attr_styles.append(int(match.group(1)) if match else 0)
+        kinds = np.array(attr_kinds, dtype=np.int8)[inverse]
+        styles = np.array(attr_styles, dtype=np.int32)[inverse]
+
+        raw = np.array(raw_values)
+        empty = raw == b""
+        values = np.full(len(matches), np.nan)
+        numeric = ~empty & ((kinds == _NUMBER) | (kinds == _SHARED))
+        values[numeric] = raw[numeric].astype(np.float64)
+        flags = ~empty & (kinds == _BOOL)
+        values[flags] = raw[flags].astype(np.int64)
+        # 値のないセル（エラーセルも含む）は空セル扱い
+        kinds[empty & (kinds != _TEXT)] = _BLANK
+
+        # 数式の文字列結果（<v>）とインライン文字列（<is>）はセルごとに文字列へ変換
+        for i in np.flatnonzero(kinds == _TEXT):
+            text = raw_values[i] or inline_values[i]
+            if text:
+                texts[offset + int(i)] = _text_value(text)
+            else:
+                kinds[i] = _BLANK
+        return rows, cols, kinds, styles, values
+
+    def _build_frame(self, cells: Dict[str, Any], has_header: bool) -> pd.DataFrame:
+        """セルの配列から pd.read_excel と同じ形・型のDataFrameを生成"""
+        rows, cols, kinds, styles, values = (cells[key] for key in ("rows", "cols", "kinds", "styles", "values"))
+        texts = cells["texts"]
+
+        # 空文字列は空セルと同じ扱い（pd.read_excelは末尾の空セル・空行を除く）
+        shared = kinds == _SHARED
+        if shared.any():
+            strings = self._shared_strings()
+            indices = values[shared].astype(np.int64)
+            if indices.max() >= len(strings):
+                raise UnsupportedSheet("共有文字列の番号が範囲外です")
+            kinds[np.flatnonzero(shared)[strings[indices] == ""]] = _BLANK
+        for position, text in texts.items():
+            if text == "":
+                kinds[position] = _BLANK
+
+        # 日付の表示形式を持つ数値セルは日時として扱う
+        date_styles, timedelta_styles = self._date_styles()
+        number = kinds == _NUMBER
+        if number.any() and (date_styles or timedelta_styles):
+            if timedelta_styles and np.isin(styles[number], list(timedelta_styles)).any():
+                raise UnsupportedSheet("経過時間の表示形式")
+            if date_styles:
+                kinds[np.flatnonzero(number)[np.isin(styles[number], list(date_styles))]] = _DATE
+
+        present = kinds != _BLANK
+        if not present.any():
+            raise UnsupportedSheet("空のシート")
+        width = int(cols[present].max())
+        last_row = int(rows[present].max())
+        if width == 1:
+            # 1列のシートは空行の扱い（skip_blank_lines）が異なるため従来の方法で読む
+            raise UnsupportedSheet("1列のシート")
+
+        first_row = 2 if has_header else 1
+        nrows = last_row - first_row + 1
+        if nrows <= 0:
+            raise UnsupportedSheet("データ行がありません")
+
+        if has_header:
+            header = np.flatnonzero(present & (rows == 1))
+            names: List[Any] = [f"Unnamed: {i}" for i in range(width)]
+            for i in header:
+                names[cols[i] - 1] = self._header_value(int(kinds[i]), values[i], texts.get(int(i)))
+            if len(set(names)) != len(names):
+                raise UnsupportedSheet("重複した列名")
+            columns = pd.Index(names)
+        else:
+            columns = pd.RangeIndex(width)
+
+        data = present & (rows >= first_row)
+        index = np.flatnonzero(data)
+        order = index[np.lexsort((rows[index], cols[index]))]
+        bounds = np.searchsorted(cols[order], np.arange(1, width + 2))
+        arrays = {}
+        for col in range(width):
+            cell = order[bounds[col]:bounds[col + 1]]
+            arrays[col] = self._column(kinds[cell], rows[cell] - first_row, values[cell], cell, texts, nrows)
+
+        df = pd.DataFrame(arrays)
+        df.columns = columns
+        return df
+
+    def _header_value(self, kind: int, value: float, text: Optional[str]) -> Any:
+        """ヘッダー行のセルの値（列名）を取得"""
+        if kind == _SHARED:
+            text = self._shared[int(value)]
+        if kind in (_SHARED, _TEXT):
+            if text in _NA_STRINGS:
+                raise UnsupportedSheet("欠損値とみなされる列名")
+            return text
+        if kind == _NUMBER:
+            return self._number_object(value)
+        raise UnsupportedSheet("文字列・数値以外の列名")
+
+    @staticmethod
+    def _number_object(value: float) -> Any:
+        """openpyxlと同じく整数値の数値はintに変換"""
+        if abs(value) >= _MAX_EXACT_INT:
+            raise UnsupportedSheet("浮動小数で正確に表せない整数")
+        return int(value) if value.is_integer() else value
+
+    def _column(self, kinds: np.ndarray, positions: np.ndarray, values: np.ndarray, cells: np.ndarray,
+                texts: Dict[int, str], nrows: int) -> np.ndarray:
+        """1列分のセルを pd.read_excel と同じ型の配列に変換"""
+        present = set(np.unique(kinds).tolist())
+        complete = len(positions) == nrows
+
+        if present <= {_NUMBER}:
+            return self._numeric_column(positions, values, nrows, complete)
+
+        if present == {_DATE}:
+            column = np.full(nrows, np.datetime64("NaT"), dtype="datetime64[us]")
+            column[positions] = self._date_values(values)
+            return column
+
+        if present == {_BOOL} and complete:
+            column = np.zeros(nrows, dtype=bool)
+            column[positions] = values != 0
+            return column
+
+        # 文字列を含む列：欠損値の文字列はNaN、すべて数値・真偽値とみなせる場合は従来の方法で読む
+        strings = np.empty(len(kinds), dtype=object)
+        na = kinds == _ERROR
+        shared = kinds == _SHARED
+        if shared.any():
+            indices = values[shared].astype(np.int64)
+            strings[shared] = self._shared[indices]
+            na[shared] = self._shared_na[indices]
+        for i in np.flatnonzero(kinds == _TEXT):
+            text = texts[int(cells[i])]
+            strings[i] = text
+            na[i] = text in _NA_STRINGS
+
+        number = kinds == _NUMBER
+        dates = kinds == _DATE
+        flags = kinds == _BOOL
+        text = (shared | (kinds == _TEXT)) & ~na
+        unique = set(strings[text].tolist())
+        if not (dates.any() or flags.any()):
+            if not text.any():
+                # 数値と欠損値のみ → 浮動小数（すべて欠損ならNaNのみの列）
+                return self._numeric_column(positions[number], values[number], nrows, False)
+            if all(_looks_numeric(value) for value in unique):
+                raise UnsupportedSheet("数値とみなされる文字列の列")
+            if not number.any() and unique <= _BOOL_STRINGS:
+                raise UnsupportedSheet("真偽値とみなされる文字列の列")
+        elif not unique or all(_looks_numeric(value) or value in _BOOL_STRINGS for value in unique):
+            # 日付・真偽値と数値などの組み合わせはpandasの型推定が複雑なため対象外
+            raise UnsupportedSheet("日付・真偽値と他の型が混在する列")
+
+        # 型が混在する列はPythonの値（openpyxlと同じ変換）を並べたobject型の配列
+        column = np.full(nrows, np.nan, dtype=object)
+        column[positions[text]] = strings[text]
+        if number.any():
+            column[positions[number]] = [self._number_object(value) for value in values[number].tolist()]
+        if dates.any():
+            column[positions[dates]] = self._date_values(values[dates]).astype("datetime64[us]").tolist()
+        if flags.any():
+            column[positions[flags]] = (values[flags] != 0).tolist()
+        return column
+
+    @staticmethod
+    def _date_values(values: np.ndarray) -> np.ndarray:
+        """シリアル値を日時に変換（openpyxlのfrom_excelと同じく小数部分をミリ秒単位に丸める）"""
+        if (values < _MIN_PLAIN_SERIAL).any() or (values > _MAX_DATE_SERIAL).any():
+            raise UnsupportedSheet("時刻のみ・1900年3月以前・範囲外の日付")
+        days = np.floor(values)
+        ms = np.round((values - days) * 86400 * 1000).astype(np.int64)
+        return _EXCEL_EPOCH + (days.astype(np.int64) * _MS_PER_DAY + ms).astype("timedelta64[ms]")
+
+    @staticmethod
+    def _numeric_column(positions: np.ndarray, values: np.ndarray, nrows: int, complete: bool) -> np.ndarray:
+        """数値の列（欠損がなくすべて整数値ならint64、それ以外はfloat64）"""
+        if len(values) and np.abs(values).max() >= _MAX_EXACT_INT:
+            raise UnsupportedSheet("浮動小数で正確に表せない整数")
+        if complete and (values == np.floor(values)).all():
+            column = np.empty(nrows, dtype=np.int64)
+            column[positions] = values.astype(np.int64)
+            return column
+        column = np.full(nrows, np.nan)
+        column[positions] = values
+        return column
+
+
+def read_sheet_frame(filepath: str, sheet_name: str, has_header: bool = True) -> pd.DataFrame:
+    """シートをDataFrameとして読み込み（未対応のシートは UnsupportedSheet を送出）"""
+    with XlsxReader(filepath) as reader:
+        return reader.read_frame(sheet_name, has_header)